@@ -0,0 +1,32 @@
+"""Composite indexes for keyset pagination of orders, ledger and positions
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+
+Tables themselves come from init_db.py / db/init.sql; the indexes are
+created only where missing, so databases built from the current models
+can run this migration too.
+"""
+from alembic import op
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_orders_user_created", "orders", ["user_id", "created_at", "id"]),
+    ("ix_ledger_wallet_timestamp", "ledger", ["wallet_id", "timestamp", "id"]),
+    ("ix_positions_user_id", "positions", ["user_id", "id"]),
+]
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, if_not_exists=True)
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
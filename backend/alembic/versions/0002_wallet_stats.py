@@ -0,0 +1,35 @@
+"""wallet_stats: running ledger totals per wallet and entry type, backfilled from the ledger
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    if "wallet_stats" in sa.inspect(bind).get_table_names():
+        return  # Built by create_all from the current models
+    op.create_table(
+        "wallet_stats",
+        sa.Column("wallet_id", sa.Integer, sa.ForeignKey("wallets.id"), primary_key=True),
+        sa.Column("type", sa.String(50), primary_key=True),  # As ledger.type
+        sa.Column("total_amount", sa.Float, nullable=False, server_default="0"),
+        sa.Column("entry_count", sa.Integer, nullable=False, server_default="0"),
+    )
+    # Same totals as app.services.wallet_stats.rebuild_wallet_stats
+    op.execute(
+        "INSERT INTO wallet_stats (wallet_id, type, total_amount, entry_count) "
+        "SELECT wallet_id, type, COALESCE(SUM(amount), 0), COUNT(*) FROM ledger GROUP BY wallet_id, type"
+    )
+
+
+def downgrade():
+    op.drop_table("wallet_stats")
@@ -0,0 +1,42 @@
+"""performance_stats: running trade statistics per user
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    if "performance_stats" not in sa.inspect(bind).get_table_names():
+        op.create_table(
+            "performance_stats",
+            sa.Column("user_id", sa.Integer, sa.ForeignKey("users.id"), primary_key=True),
+            sa.Column("total_trades", sa.Integer, nullable=False, server_default="0"),
+            sa.Column("winning_trades", sa.Integer, nullable=False, server_default="0"),
+            sa.Column("losing_trades", sa.Integer, nullable=False, server_default="0"),
+            sa.Column("realized_pnl", sa.Float, nullable=False, server_default="0"),
+            sa.Column("gross_profit", sa.Float, nullable=False, server_default="0"),
+            sa.Column("gross_loss", sa.Float, nullable=False, server_default="0"),
+            sa.Column("peak_pnl", sa.Float, nullable=False, server_default="0"),
+            sa.Column("max_drawdown", sa.Float, nullable=False, server_default="0"),
+            sa.Column("open_entries", sa.JSON),
+            sa.Column("balance_curve", sa.JSON),
+            sa.Column("last_order_id", sa.Integer),
+            sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        )
+
+    # No backfill here (it needs the current ORM models): users without a row
+    # are rebuilt from their orders on first read or fill, or all at once with
+    # python -m app.services.analytics
+
+
+def downgrade():
+    op.drop_table("performance_stats")
@@ -0,0 +1,28 @@
+"""Unique (name, version) on models so concurrent registrations cannot share a version
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+NAME = "uq_models_name_version"
+
+
+def upgrade():
+    existing = {c["name"] for c in sa.inspect(op.get_bind()).get_unique_constraints("models")}
+    if NAME in existing:
+        return  # Built by create_all from the current models
+    with op.batch_alter_table("models") as batch:
+        batch.create_unique_constraint(NAME, ["name", "version"])
+
+
+def downgrade():
+    with op.batch_alter_table("models") as batch:
+        batch.drop_constraint(NAME, type_="unique")
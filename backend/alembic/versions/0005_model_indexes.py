@@ -0,0 +1,38 @@
+"""Bring databases built by the original db/init.sql in line with the models:
+ledger.metadata -> meta_data, and the symbol indexes the models declare
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+
+Tables themselves come from init_db.py / db/init.sql (see 0001). Databases
+built from the current models or init.sql already match, so every step is
+skipped where it is not needed.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+# (name, table, columns), named as create_all names them
+INDEXES = [
+    ("ix_orders_symbol", "orders", ["symbol"]),
+    ("ix_positions_symbol", "positions", ["symbol"]),
+]
+
+
+def upgrade():
+    columns = {c["name"] for c in sa.inspect(op.get_bind()).get_columns("ledger")}
+    if "metadata" in columns and "meta_data" not in columns:
+        op.alter_column("ledger", "metadata", new_column_name="meta_data")
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, if_not_exists=True)
+
+
+def downgrade():
+    # The column keeps the models' name: renaming it back would break the app
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
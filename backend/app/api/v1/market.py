@@ -1,7 +1,11 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
 from datetime import datetime
+import numpy as np
 from app.brokers.factory import get_broker
 from app.api.v1.auth import get_current_user
+from app.core.market_hours import to_ist
+from app.services.bar_store import bar_store
+from app.services.data_cache import interval_delta
 from pydantic import BaseModel
 
 router = APIRouter()
@@ -18,7 +22,7 @@ class TickData(BaseModel):
 
 @router.get("/tick")
 async def get_tick(symbol: str, current_user = Depends(get_current_user)):
-    broker = get_broker()
+    broker = get_broker(account=current_user.id)  # Same account (and simulated market) the user's orders go to
     tick = await broker.get_tick(symbol)
     return tick
 
@@ -30,27 +34,53 @@ async def get_history(
     to_date: datetime = None,
     current_user = Depends(get_current_user)
 ):
-    broker = get_broker()
-    history = await broker.get_history(symbol, interval, from_date, to_date)
-    return history
+    # Serve from the shared bar store while a writer (BarAggregator or
+    # TradingEngine) keeps it live; the request path never writes to it.
+    # Stored bars are naive IST, so compare in IST whatever zone was sent
+    start = to_ist(from_date) if from_date is not None else None
+    end = to_ist(to_date) if to_date is not None else None
+    window = bar_store.live_window(symbol, interval, interval_delta(interval).total_seconds())
+    if window is not None and len(window) and (
+        start is None or window.timestamp[0] <= np.datetime64(start, 'ns')
+    ):
+        return window.records(start, end)
+    
+    broker = get_broker(account=current_user.id)
+    return await broker.get_history(symbol, interval, from_date, to_date)
 
 from app.services.trading_engine import TradingEngine
 from pydantic import BaseModel
+from typing import List, Optional
 
 class TradeRequest(BaseModel):
-    symbol: str
+    symbol: Optional[str] = None
+    symbols: Optional[List[str]] = None
+    universe: bool = False  # Indices plus the top-stock universe
+
+class StopRequest(BaseModel):
+    symbol: Optional[str] = None
 
 @router.post("/start")
 async def start_trading(req: TradeRequest, current_user = Depends(get_current_user)):
     engine = TradingEngine()
+    try:
+        engine.trade_for(current_user.id)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if req.universe:
+        return engine.start_universe()
+    if req.symbols:
+        return engine.start_many(req.symbols)
+    if not req.symbol:
+        raise HTTPException(status_code=400, detail="symbol, symbols or universe is required")
     return engine.start(req.symbol)
 
 @router.post("/stop")
-async def stop_trading(current_user = Depends(get_current_user)):
+async def stop_trading(req: StopRequest = None, current_user = Depends(get_current_user)):
     engine = TradingEngine()
-    return engine.stop()
+    return engine.stop(req.symbol if req else None)
 
 @router.get("/status")
-async def get_status(current_user = Depends(get_current_user)):
+async def get_status(symbol: str = None, current_user = Depends(get_current_user)):
     engine = TradingEngine()
-    return {"is_running": engine.is_running, "symbol": engine.symbol}
+    return engine.status(symbol)
@@ -1,6 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.core.database import get_db
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import get_async_db
+from app.core.pagination import MAX_PAGE_SIZE, keyset_page, with_next_cursor
 from app.api.v1.auth import get_current_user
 from app.models.order import Order, OrderSide, OrderType, OrderStatus
 from app.brokers.factory import get_broker
@@ -30,8 +34,8 @@ class OrderResponse(BaseModel):
         from_attributes = True
 
 @router.post("/", response_model=OrderResponse)
-async def create_order(order_data: OrderCreate, db: Session = Depends(get_db), current_user = Depends(get_current_user)):
-    broker = get_broker()
+async def create_order(order_data: OrderCreate, db: AsyncSession = Depends(get_async_db), current_user = Depends(get_current_user)):
+    broker = get_broker(account=current_user.id)
     
     # Place order with broker
     ext_order = await broker.place_order(
@@ -55,19 +59,28 @@ async def create_order(order_data: OrderCreate, db: Session = Depends(get_db), c
         status=OrderStatus.SUBMITTED
     )
     db.add(order)
-    db.commit()
-    db.refresh(order)
+    await db.commit()
+    await db.refresh(order)
     
     return order
 
 @router.get("/{order_id}", response_model=OrderResponse)
-async def get_order(order_id: int, db: Session = Depends(get_db), current_user = Depends(get_current_user)):
-    order = db.query(Order).filter(Order.id == order_id, Order.user_id == current_user.id).first()
+async def get_order(order_id: int, db: AsyncSession = Depends(get_async_db), current_user = Depends(get_current_user)):
+    order = await db.scalar(select(Order).where(Order.id == order_id, Order.user_id == current_user.id))
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
     return order
 
 @router.get("/")
-async def list_orders(db: Session = Depends(get_db), current_user = Depends(get_current_user)):
-    orders = db.query(Order).filter(Order.user_id == current_user.id).order_by(Order.created_at.desc()).limit(100).all()
-    return orders
+async def list_orders(
+    response: Response,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user = Depends(get_current_user)
+):
+    """Newest orders first; pass the X-Next-Cursor header back as ``cursor`` for the next page"""
+    orders = await db.scalars(keyset_page(
+        select(Order).where(Order.user_id == current_user.id), Order.id, cursor, limit, sort_col=Order.created_at
+    ))
+    return with_next_cursor(orders, limit, response)
@@ -1,12 +1,23 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from app.core.database import get_db
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import get_async_db
+from app.core.pagination import MAX_PAGE_SIZE, keyset_page, with_next_cursor
 from app.api.v1.auth import get_current_user
 from app.models.position import Position
 
 router = APIRouter()
 
 @router.get("/")
-async def get_positions(db: Session = Depends(get_db), current_user = Depends(get_current_user)):
-    positions = db.query(Position).filter(Position.user_id == current_user.id).all()
-    return positions
+async def get_positions(
+    response: Response,
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user = Depends(get_current_user)
+):
+    """Newest positions first; pass the X-Next-Cursor header back as ``cursor`` for the next page"""
+    positions = await db.scalars(keyset_page(select(Position).where(Position.user_id == current_user.id), Position.id, cursor, limit))
+    return with_next_cursor(positions, limit, response)
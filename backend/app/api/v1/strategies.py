@@ -29,6 +29,7 @@ async def deploy_strategy(strategy_id: int, db: Session = Depends(get_db), curre
 from app.services.analytics import AnalyticsService
 
 @router.get("/performance")
-async def get_performance(db: Session = Depends(get_db), current_user = Depends(get_current_user)):
+# Sync so a first-time rebuild from the orders runs in the threadpool
+def get_performance(db: Session = Depends(get_db), current_user = Depends(get_current_user)):
     analytics = AnalyticsService(db, current_user.id)
     return analytics.get_performance_metrics()
@@ -1,9 +1,11 @@
 """Enhanced wallet API with Razorpay integration"""
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.core.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import get_async_db
+from app.core.pagination import MAX_PAGE_SIZE, keyset_page, with_next_cursor
 from app.api.v1.auth import get_current_user
-from app.models.wallet import Wallet, Ledger, LedgerType
+from app.models.wallet import Wallet, Ledger, LedgerType, WalletStats
 from app.models.user import User
 from app.services.payment_service import payment_service
 from pydantic import BaseModel
@@ -51,9 +53,9 @@ class TransactionResponse(BaseModel):
         from_attributes = True
 
 @router.get("/", response_model=WalletResponse)
-async def get_wallet(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+async def get_wallet(db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user)):
     """Get wallet balance"""
-    wallet = db.query(Wallet).filter(Wallet.user_id == current_user.id).first()
+    wallet = await db.scalar(select(Wallet).where(Wallet.user_id == current_user.id))
     if not wallet:
         # Create wallet if doesn't exist
         wallet = Wallet(
@@ -63,14 +65,14 @@ async def get_wallet(db: Session = Depends(get_db), current_user: User = Depends
             available_balance=0.0
         )
         db.add(wallet)
-        db.commit()
-        db.refresh(wallet)
+        await db.commit()
+        await db.refresh(wallet)
     return wallet
 
 @router.post("/deposit/initiate", response_model=DepositResponse)
 async def initiate_deposit(
     req: DepositRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """Initiate deposit via Razorpay"""
@@ -99,7 +101,7 @@ async def initiate_deposit(
 @router.post("/deposit/verify")
 async def verify_deposit(
     req: VerifyPaymentRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """Verify and complete deposit"""
@@ -119,10 +121,11 @@ async def verify_deposit(
         amount = payment['amount'] / 100  # Convert from paise to rupees
         
         # Update wallet
-        wallet = db.query(Wallet).filter(Wallet.user_id == current_user.id).first()
+        wallet = await db.scalar(select(Wallet).where(Wallet.user_id == current_user.id))
         if not wallet:
-            wallet = Wallet(user_id=current_user.id)
+            wallet = Wallet(user_id=current_user.id, total_balance=0.0, reserved_balance=0.0, available_balance=0.0)
             db.add(wallet)
+            await db.flush()  # Ledger rows need the wallet id
         
         wallet.total_balance += amount
         wallet.available_balance += amount
@@ -141,7 +144,7 @@ async def verify_deposit(
             }
         )
         db.add(ledger)
-        db.commit()
+        await db.commit()
         
         return {
             "status": "success",
@@ -158,11 +161,11 @@ async def verify_deposit(
 @router.post("/withdraw")
 async def withdraw_funds(
     req: WithdrawRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """Withdraw funds to bank/UPI"""
-    wallet = db.query(Wallet).filter(Wallet.user_id == current_user.id).first()
+    wallet = await db.scalar(select(Wallet).where(Wallet.user_id == current_user.id))
     
     if not wallet:
         raise HTTPException(status_code=404, detail="Wallet not found")
@@ -194,7 +197,7 @@ async def withdraw_funds(
         }
     )
     db.add(ledger)
-    db.commit()
+    await db.commit()
     
     return {
         "status": "success",
@@ -205,29 +208,31 @@ async def withdraw_funds(
 
 @router.get("/transactions", response_model=List[TransactionResponse])
 async def get_transactions(
-    limit: int = 50,
-    db: Session = Depends(get_db),
+    response: Response,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Get transaction history"""
-    wallet = db.query(Wallet).filter(Wallet.user_id == current_user.id).first()
+    """Get transaction history, newest first (X-Next-Cursor header -> ``cursor`` for the next page)"""
+    wallet = await db.scalar(select(Wallet).where(Wallet.user_id == current_user.id))
     
     if not wallet:
         return []
     
-    transactions = db.query(Ledger).filter(
-        Ledger.wallet_id == wallet.id
-    ).order_by(Ledger.timestamp.desc()).limit(limit).all()
+    transactions = await db.scalars(keyset_page(
+        select(Ledger).where(Ledger.wallet_id == wallet.id), Ledger.id, cursor, limit, sort_col=Ledger.timestamp
+    ))
     
-    return transactions
+    return with_next_cursor(transactions, limit, response)
 
 @router.get("/stats")
 async def get_wallet_stats(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get wallet statistics"""
-    wallet = db.query(Wallet).filter(Wallet.user_id == current_user.id).first()
+    wallet = await db.scalar(select(Wallet).where(Wallet.user_id == current_user.id))
     
     if not wallet:
         return {
@@ -237,12 +242,17 @@ async def get_wallet_stats(
             "total_fees": 0
         }
     
-    ledger_entries = db.query(Ledger).filter(Ledger.wallet_id == wallet.id).all()
+    # Running totals maintained with each ledger insert (one row per entry type)
+    stats = await db.scalars(select(WalletStats).where(WalletStats.wallet_id == wallet.id))
+    totals = {row.type: row for row in stats}
     
-    total_deposits = sum(l.amount for l in ledger_entries if l.type == LedgerType.DEPOSIT)
-    total_withdrawals = abs(sum(l.amount for l in ledger_entries if l.type == LedgerType.WITHDRAW))
-    total_fees = abs(sum(l.amount for l in ledger_entries if l.type == LedgerType.FEE))
-    total_trades = len([l for l in ledger_entries if l.type == LedgerType.TRADE])
+    def total(type):
+        return totals[type].total_amount if type in totals else 0.0
+    
+    total_deposits = total(LedgerType.DEPOSIT)
+    total_withdrawals = abs(total(LedgerType.WITHDRAW))
+    total_fees = abs(total(LedgerType.FEE))
+    total_trades = totals[LedgerType.TRADE].entry_count if LedgerType.TRADE in totals else 0
     
     return {
         "total_deposits": total_deposits,
@@ -1,30 +1,96 @@
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import List, Dict
+from functools import partial
+from typing import Callable, List, Dict
+import asyncio
+import threading
+
+from app.core.config import settings
 
 class BaseBroker(ABC):
-    """Base broker interface for all broker adapters"""
-    
+    """
+    Base broker interface for all broker adapters
+
+    Adapters wrapping blocking SDKs (yfinance, kiteconnect) must go through
+    ``run_blocking`` so network calls run on a bounded per-broker thread
+    pool instead of stalling the event loop.
+    """
+
+    max_workers: int = None  # Defaults to settings.BROKER_IO_WORKERS
+    timeout: float = None  # Defaults to settings.BROKER_TIMEOUT
+
+    _executors: Dict[type, ThreadPoolExecutor] = {}
+    _inflight: Dict[tuple, asyncio.Future] = {}
+    _executors_lock = threading.Lock()
+
+    @classmethod
+    def executor(cls) -> ThreadPoolExecutor:
+        """Thread pool shared by every instance of this broker class"""
+        with BaseBroker._executors_lock:
+            if cls not in BaseBroker._executors:
+                BaseBroker._executors[cls] = ThreadPoolExecutor(
+                    max_workers=cls.max_workers or settings.BROKER_IO_WORKERS,
+                    thread_name_prefix=f"{cls.__name__.lower()}-io"
+                )
+            return BaseBroker._executors[cls]
+
+    @staticmethod
+    def shutdown_executors():
+        with BaseBroker._executors_lock:
+            for executor in BaseBroker._executors.values():
+                executor.shutdown(wait=False, cancel_futures=True)
+            BaseBroker._executors.clear()
+
+    async def run_blocking(self, func: Callable, *args, key=None, timeout: float = None, **kwargs):
+        """
+        Run a blocking call on the broker's thread pool, raising
+        asyncio.TimeoutError after ``timeout`` seconds. Concurrent calls
+        with the same ``key`` share a single call and its result.
+        """
+        loop = asyncio.get_running_loop()
+        timeout = timeout or self.timeout or settings.BROKER_TIMEOUT
+        call = partial(func, *args, **kwargs)
+        if key is None:
+            return await asyncio.wait_for(loop.run_in_executor(self.executor(), call), timeout)
+
+        key = (type(self), loop, key)
+        future = self._inflight.get(key)
+        if future is None:
+            future = loop.run_in_executor(self.executor(), call)
+            self._inflight[key] = future
+            future.add_done_callback(lambda f: self._inflight.pop(key, None) if self._inflight.get(key) is f else None)
+        # Shielded so one caller timing out does not cancel the call for the others
+        return await asyncio.wait_for(asyncio.shield(future), timeout)
+
+    async def health_check(self) -> Dict:
+        """{"status": "ok"} when the broker can serve requests"""
+        return {"status": "ok"}
+
     @abstractmethod
     async def get_tick(self, symbol: str) -> Dict:
-        """Get current tick data for symbol"""
+        """
+        Get current tick data for symbol: a timezone-aware ``timestamp``,
+        ``last`` price, day OHLC and ``volume`` as the cumulative day volume
+        (what BarAggregator expects)
+        """
         pass
-    
+
     @abstractmethod
     async def get_history(self, symbol: str, interval: str, from_date: datetime, to_date: datetime) -> List[Dict]:
         """Get historical OHLCV data"""
         pass
-    
+
     @abstractmethod
     async def place_order(self, symbol: str, side: str, order_type: str, qty: int, price: float = None) -> Dict:
         """Place an order and return order details"""
         pass
-    
+
     @abstractmethod
     async def cancel_order(self, order_id: str) -> Dict:
         """Cancel an order"""
         pass
-    
+
     @abstractmethod
     async def get_order_status(self, order_id: str) -> Dict:
         """Get order status"""
@@ -1,16 +1,151 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
 from app.core.config import settings
+from app.brokers.base import BaseBroker
 from app.brokers.mock import MockBroker
 
-def get_broker():
-    """Factory to return appropriate broker based on config"""
-    # print(f"DEBUG: BROKER_MODE is {settings.BROKER_MODE}")
-    if settings.BROKER_MODE == "mock":
-        return MockBroker()
-    elif settings.BROKER_MODE == "paper":
-        from app.brokers.paper import PaperBroker
-        return PaperBroker()
-    elif settings.BROKER_MODE == "zerodha":
-        from app.brokers.zerodha import ZerodhaBroker
-        return ZerodhaBroker()
-    else:
-        raise ValueError(f"Unknown broker mode: {settings.BROKER_MODE}")
+logger = logging.getLogger(__name__)
+
+DEFAULT_ACCOUNT = "default"
+
+
+class BrokerPool:
+    """
+    Long-lived broker instances, one per (mode, account).
+
+    Sharing instances keeps KiteConnect HTTP sessions alive across requests
+    and keeps the in-memory order books of the paper and mock brokers
+    consistent. Zerodha instances are keyed by API key (the credentials
+    decide the account); paper and mock accounts are whatever id the caller
+    passes, e.g. a user id. Callers that place orders or read a user's
+    prices pass the user id; without one they share the default account,
+    which is only meant for market data.
+
+    Health checks run in a background task (``start_monitor``); /health
+    only reads the last report.
+    """
+
+    def __init__(self, evict_after: int = None):
+        self.evict_after = evict_after or settings.BROKER_EVICT_AFTER
+        self._brokers: Dict[Tuple[str, str], BaseBroker] = {}
+        self._failures: Dict[Tuple[str, str], int] = {}  # Consecutive failed checks
+        self._lock = threading.Lock()
+        self._monitor: Optional[asyncio.Task] = None
+        self.report: Dict[str, Dict] = {}
+        self.checked_at: Optional[float] = None  # time.time() of the last check
+
+    @staticmethod
+    def key(mode: str = None, account=None) -> Tuple[str, str]:
+        mode = mode or settings.BROKER_MODE
+        if mode == "zerodha":
+            return mode, settings.ZERODHA_API_KEY
+        return mode, str(account if account is not None else DEFAULT_ACCOUNT)
+
+    @staticmethod
+    def create(mode: str) -> BaseBroker:
+        if mode == "mock":
+            return MockBroker()
+        elif mode == "paper":
+            from app.brokers.paper import PaperBroker
+            return PaperBroker()
+        elif mode == "zerodha":
+            from app.brokers.zerodha import ZerodhaBroker
+            return ZerodhaBroker()
+        elif mode == "replay":
+            from app.brokers.replay import shared_replay_broker
+            return shared_replay_broker()
+        else:
+            raise ValueError(f"Unknown broker mode: {mode}")
+
+    def get(self, mode: str = None, account=None) -> BaseBroker:
+        key = self.key(mode, account)
+        broker = self._brokers.get(key)
+        if broker is None:
+            with self._lock:
+                broker = self._brokers.get(key)
+                if broker is None:
+                    broker = self._brokers[key] = self.create(key[0])
+        return broker
+
+    def evict(self, mode: str = None, account=None):
+        """Drop an instance so the next ``get`` builds a fresh one"""
+        with self._lock:
+            self._brokers.pop(self.key(mode, account), None)
+
+    def clear(self):
+        with self._lock:
+            self._brokers.clear()
+
+    async def health(self, timeout: float = None) -> Dict[str, Dict]:
+        """
+        Run every pooled broker's health check concurrently. A broker is
+        evicted (and rebuilt on next use) after ``evict_after`` consecutive
+        failures, so one slow check does not throw away its session.
+        """
+        timeout = timeout or settings.BROKER_TIMEOUT
+        brokers = list(self._brokers.items())
+
+        async def check(broker):
+            try:
+                return await asyncio.wait_for(broker.health_check(), timeout)
+            except Exception as e:
+                return {"status": "failed", "error": str(e) or type(e).__name__}
+
+        results = await asyncio.gather(*[check(broker) for _, broker in brokers])
+        report = {}
+        for (key, broker), result in zip(brokers, results):
+            # Zerodha accounts are keyed by API key, which stays out of logs and the report
+            name = key[0] if key[0] == "zerodha" else ":".join(key)
+            with self._lock:
+                if result.get("status") == "ok":
+                    self._failures.pop(key, None)
+                else:
+                    failures = self._failures[key] = self._failures.get(key, 0) + 1
+                    result = {**result, "failures": failures}
+                    if failures >= self.evict_after:
+                        logger.warning(f"Broker {name} failed {failures} health checks, evicting: {result}")
+                        if self._brokers.get(key) is broker:
+                            del self._brokers[key]
+                        del self._failures[key]
+                    else:
+                        logger.warning(f"Broker {name} unhealthy ({failures}/{self.evict_after}): {result}")
+            report[name] = result
+        self.report = report
+        self.checked_at = time.time()
+        return report
+
+    def start_monitor(self, interval: float = None):
+        """Check broker health every ``interval`` seconds in the background (call from the event loop)"""
+        if self._monitor is None or self._monitor.done():
+            self._monitor = asyncio.get_running_loop().create_task(
+                self._run_monitor(interval or settings.BROKER_HEALTH_INTERVAL)
+            )
+
+    async def stop_monitor(self):
+        if self._monitor is not None:
+            self._monitor.cancel()
+            try:
+                await self._monitor
+            except asyncio.CancelledError:
+                pass
+            self._monitor = None
+
+    async def _run_monitor(self, interval: float):
+        while True:
+            try:
+                await self.health()
+            except Exception as e:
+                logger.error(f"Broker health check failed: {e}")
+            await asyncio.sleep(interval)
+
+
+broker_pool = BrokerPool()
+
+
+def get_broker(mode: str = None, account=None) -> BaseBroker:
+    """Shared broker for ``mode`` (default settings.BROKER_MODE) and account"""
+    return broker_pool.get(mode, account)
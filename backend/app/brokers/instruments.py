@@ -0,0 +1,246 @@
+"""Broker instrument master: the daily instruments dump indexed for O(1) lookups"""
+import bisect
+import logging
+import os
+import threading
+from datetime import date, datetime, time, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+from app.core.config import settings
+from app.core.files import atomic_write
+from app.core.market_hours import IST
+
+logger = logging.getLogger(__name__)
+
+# Columns of the Kite instruments dump
+COLUMNS = [
+    'instrument_token', 'exchange_token', 'tradingsymbol', 'name', 'last_price', 'expiry',
+    'strike', 'tick_size', 'lot_size', 'instrument_type', 'segment', 'exchange'
+]
+_CATEGORIES = ['name', 'instrument_type', 'segment', 'exchange']
+
+# App (yfinance-style) index symbols -> (exchange, index tradingsymbol, derivatives name, derivatives exchange)
+ALIASES = {
+    '^NSEI': ('NSE', 'NIFTY 50', 'NIFTY', 'NFO'),
+    '^NSEBANK': ('NSE', 'NIFTY BANK', 'BANKNIFTY', 'NFO'),
+    '^BSESN': ('BSE', 'SENSEX', 'SENSEX', 'BFO'),
+    # Bare index names as traders type them (the index tradingsymbols differ)
+    'NIFTY': ('NSE', 'NIFTY 50', 'NIFTY', 'NFO'),
+    'BANKNIFTY': ('NSE', 'NIFTY BANK', 'BANKNIFTY', 'NFO'),
+    'SENSEX': ('BSE', 'SENSEX', 'SENSEX', 'BFO'),
+}
+_SUFFIXES = {'.NS': 'NSE', '.BO': 'BSE'}
+_DERIVATIVE_EXCHANGES = {'NSE': 'NFO', 'BSE': 'BFO'}
+
+RETRY_AFTER = timedelta(minutes=5)
+
+
+def now_ist() -> datetime:
+    return datetime.now(IST).replace(tzinfo=None)
+
+
+class InstrumentMaster:
+    """
+    The broker's instrument list, indexed by token, tradingsymbol and
+    (underlying, expiry, strike).
+
+    The dump is fetched at most once per trading day (after
+    ``refresh_time`` IST, when the broker publishes it) and kept on disk,
+    so restarts read the local copy. Rows are held column-wise; the
+    indexes map keys to row positions.
+    """
+
+    def __init__(self, cache_dir: str = None, refresh_time: time = None):
+        self.cache_dir = cache_dir or settings.INSTRUMENT_CACHE_DIR
+        self.refresh_time = refresh_time or time.fromisoformat(settings.INSTRUMENT_REFRESH_TIME)
+        self.fetched_at: Optional[datetime] = None
+
+        self._df: Optional[pd.DataFrame] = None
+        self._columns: Dict[str, object] = {}
+        self._by_token: Dict[int, int] = {}
+        self._by_symbol: Dict[Tuple[str, str], int] = {}
+        self._contracts: Dict[Tuple, int] = {}
+        self._expiries: Dict[Tuple[str, str, str], List[date]] = {}
+        self._lock = threading.Lock()
+        self._next_attempt: Optional[datetime] = None
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.cache_dir, "instruments.parquet")
+
+    def __len__(self) -> int:
+        return 0 if self._df is None else len(self._df)
+
+    def last_refresh(self, now: datetime = None) -> datetime:
+        """Most recent publication time of the dump (naive IST)"""
+        now = now or now_ist()
+        boundary = datetime.combine(now.date(), self.refresh_time)
+        return boundary if now >= boundary else boundary - timedelta(days=1)
+
+    def is_fresh(self, now: datetime = None) -> bool:
+        return self.fetched_at is not None and self.fetched_at >= self.last_refresh(now)
+
+    def ensure(self, fetch: Callable[[], Iterable[Dict]], now: datetime = None) -> "InstrumentMaster":
+        """
+        Make sure today's dump is loaded, from memory, disk or ``fetch``
+        (e.g. ``kite.instruments``). A failed refresh keeps serving the old
+        dump and is retried after a few minutes.
+        """
+        now = now or now_ist()
+        if self.is_fresh(now):
+            return self
+        with self._lock:
+            if self._df is None and os.path.exists(self.path):
+                self.read()
+            if self.is_fresh(now) or (self._df is not None and self._next_attempt and now < self._next_attempt):
+                return self
+            try:
+                self.build(fetch(), fetched_at=now)
+                self.write()
+                logger.info(f"Loaded {len(self)} instruments")
+            except Exception as e:
+                if self._df is None:
+                    raise
+                self._next_attempt = now + RETRY_AFTER
+                logger.error(f"Instrument refresh failed, keeping the dump from {self.fetched_at}: {e}")
+        return self
+
+    def build(self, records: Iterable[Dict], fetched_at: datetime = None):
+        """Index a fresh dump (list of dicts as returned by ``kite.instruments()``)"""
+        df = pd.DataFrame.from_records(list(records), columns=COLUMNS)
+        df['expiry'] = pd.to_datetime(df['expiry'].replace('', None), errors='coerce')
+        df['strike'] = df['strike'].fillna(0).astype(float)
+        for col in _CATEGORIES:
+            df[col] = df[col].fillna('').astype(str).astype('category')
+        self._index(df, fetched_at or now_ist())
+
+    def read(self):
+        df = pd.read_parquet(self.path)
+        self._index(df, datetime.fromisoformat(df.attrs['fetched_at']))
+
+    def write(self):
+        df = self._df.copy(deep=False)
+        df.attrs = {'fetched_at': self.fetched_at.isoformat()}
+        with atomic_write(self.path) as tmp_path:
+            df.to_parquet(tmp_path, index=False)
+
+    def _index(self, df: pd.DataFrame, fetched_at: datetime):
+        df = df.reset_index(drop=True)
+        positions = range(len(df))
+        by_token = dict(zip(df['instrument_token'].tolist(), positions))
+        by_symbol = dict(zip(zip(df['exchange'].astype(str), df['tradingsymbol']), positions))
+
+        contracts = {}
+        expiries = {}
+        derivatives = df.index[df['expiry'].notna()]
+        for pos, exchange, name, instrument_type, expiry, strike in zip(
+            derivatives,
+            df['exchange'].astype(str)[derivatives],
+            df['name'].astype(str)[derivatives],
+            df['instrument_type'].astype(str)[derivatives],
+            df['expiry'][derivatives].dt.date,
+            df['strike'][derivatives]
+        ):
+            key = (exchange, name, instrument_type)
+            contracts[key + (expiry, float(strike))] = pos
+            expiries.setdefault(key, set()).add(expiry)
+
+        # Swap everything in at once so concurrent readers see a consistent master
+        self._df = df
+        self._columns = {col: df[col].to_numpy() for col in df.columns}
+        self._by_token = by_token
+        self._by_symbol = by_symbol
+        self._contracts = contracts
+        self._expiries = {key: sorted(dates) for key, dates in expiries.items()}
+        self.fetched_at = fetched_at
+        self._next_attempt = None
+
+    def _row(self, pos: int) -> Dict:
+        row = {col: values[pos] for col, values in self._columns.items()}
+        row = {col: value.item() if hasattr(value, 'item') else value for col, value in row.items()}
+        expiry = pd.Timestamp(self._columns['expiry'][pos])
+        row['expiry'] = None if pd.isna(expiry) else expiry.date()
+        return row
+
+    def by_token(self, token: int) -> Optional[Dict]:
+        pos = self._by_token.get(token)
+        return None if pos is None else self._row(pos)
+
+    def get(self, exchange: str, tradingsymbol: str) -> Optional[Dict]:
+        pos = self._by_symbol.get((exchange, tradingsymbol))
+        return None if pos is None else self._row(pos)
+
+    @staticmethod
+    def _split(symbol: str) -> Tuple[str, str, str, str]:
+        """(exchange, tradingsymbol, derivatives name, derivatives exchange) for an app symbol"""
+        if symbol in ALIASES:
+            return ALIASES[symbol]
+        if ':' in symbol:
+            exchange, tradingsymbol = symbol.split(':', 1)
+        else:
+            exchange, tradingsymbol = 'NSE', symbol
+            for suffix, suffix_exchange in _SUFFIXES.items():
+                if symbol.endswith(suffix):
+                    exchange, tradingsymbol = suffix_exchange, symbol[:-len(suffix)]
+        return exchange, tradingsymbol, tradingsymbol, _DERIVATIVE_EXCHANGES.get(exchange, exchange)
+
+    def resolve(self, symbol: str) -> Dict:
+        """
+        Instrument for an app symbol: index aliases ('^NSEI', 'NIFTY'), yfinance
+        suffixes ('RELIANCE.NS'), 'EXCHANGE:TRADINGSYMBOL' or a bare NSE symbol.
+        """
+        exchange, tradingsymbol, _, _ = self._split(symbol)
+        instrument = self.get(exchange, tradingsymbol)
+        if instrument is None:
+            raise KeyError(f"Unknown instrument: {symbol}")
+        return instrument
+
+    def expiries(self, symbol: str, instrument_type: str = 'FUT') -> List[date]:
+        _, _, name, exchange = self._split(symbol)
+        return self._expiries.get((exchange, name, instrument_type), [])
+
+    def contract(self, symbol: str, expiry: date, strike: float = 0.0, instrument_type: str = 'FUT') -> Dict:
+        """Derivative on ``symbol``'s underlying by expiry (and strike for 'CE'/'PE')"""
+        _, _, name, exchange = self._split(symbol)
+        pos = self._contracts.get((exchange, name, instrument_type, expiry, float(strike)))
+        if pos is None:
+            raise KeyError(f"No {instrument_type} contract for {symbol} expiring {expiry} at {strike}")
+        return self._row(pos)
+
+    def next_expiry(self, symbol: str, instrument_type: str = 'FUT', on: date = None) -> date:
+        """First expiry on or after ``on`` (rolls over once a contract has expired)"""
+        dates = self.expiries(symbol, instrument_type)
+        i = bisect.bisect_left(dates, on or now_ist().date())
+        if i == len(dates):
+            raise KeyError(f"No live {instrument_type} expiries for {symbol}")
+        return dates[i]
+
+    def current_future(self, symbol: str, on: date = None) -> Dict:
+        """Near-month futures contract for ``symbol``"""
+        return self.contract(symbol, self.next_expiry(symbol, 'FUT', on))
+
+    def order_instrument(self, symbol: str, on: date = None) -> Dict:
+        """
+        Instrument that orders for ``symbol`` are placed on: the symbol itself
+        (NSE/BSE cash for equities, or an explicit 'NFO:...' contract), or the
+        near-month future for indices, which cannot be traded directly.
+        """
+        instrument = self.resolve(symbol)
+        if instrument['segment'] == 'INDICES':
+            return self.current_future(symbol, on)
+        return instrument
+
+    def option(self, symbol: str, strike: float, option_type: str, expiry: date = None) -> Dict:
+        """Option contract ('CE' or 'PE'), nearest expiry by default"""
+        return self.contract(symbol, expiry or self.next_expiry(symbol, option_type), strike, option_type)
+
+
+def lot_quantity(qty: int, lot_size: int) -> int:
+    """``qty`` rounded to the nearest whole number of lots (at least one)"""
+    lot_size = max(int(lot_size or 1), 1)
+    return max(round(qty / lot_size), 1) * lot_size
+
+
+instrument_master = InstrumentMaster()
@@ -0,0 +1,168 @@
+"""Local stand-in for the Kite WebSocket feed that replays recorded quotes"""
+import base64
+import hashlib
+import json
+import logging
+import socket
+import struct
+import threading
+import time
+from typing import Dict, List
+
+from app.brokers.kite_stream import encode_binary
+
+logger = logging.getLogger(__name__)
+
+_WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+OP_TEXT = 0x1
+OP_BINARY = 0x2
+OP_CLOSE = 0x8
+OP_PING = 0x9
+OP_PONG = 0xA
+
+
+class KiteReplayServer:
+    """
+    Minimal WebSocket server speaking the Kite quote protocol.
+
+    Every client that subscribes gets ``quotes`` (dicts as returned by
+    parse_packet) for its subscribed tokens, in order, one binary message
+    each, ``interval`` seconds apart. Point KiteStream (or ZERODHA_WS_URL)
+    at ``url`` to run the streaming code paths without a live session.
+    """
+
+    def __init__(self, quotes: List[Dict], host: str = "127.0.0.1", port: int = 0, interval: float = 0.0):
+        self.quotes = quotes
+        self.interval = interval
+        self._server = socket.create_server((host, port))
+        self.host, self.port = self._server.getsockname()[:2]
+        self._stopped = threading.Event()
+        self._threads = []
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}"
+
+    def start(self) -> "KiteReplayServer":
+        thread = threading.Thread(target=self._accept, name="kite-replay", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        self._server.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _accept(self):
+        while not self._stopped.is_set():
+            try:
+                conn, _ = self._server.accept()
+            except OSError:
+                break
+            thread = threading.Thread(target=self._serve, args=(conn,), daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _serve(self, conn: socket.socket):
+        try:
+            self._handshake(conn)
+            tokens = set()
+            subscribed = threading.Event()
+            closed = threading.Event()
+
+            def read_client():
+                while not closed.is_set():
+                    frame = self._read_frame(conn)
+                    if frame is None or frame[0] == OP_CLOSE:
+                        closed.set()
+                        break
+                    opcode, payload = frame
+                    if opcode == OP_PING:
+                        self._send_frame(conn, OP_PONG, payload)
+                    elif opcode == OP_TEXT:
+                        message = json.loads(payload)
+                        if message.get("a") == "subscribe":
+                            tokens.update(message["v"])
+                        elif message.get("a") == "mode":
+                            subscribed.set()
+
+            threading.Thread(target=read_client, daemon=True).start()
+            subscribed.wait(timeout=10)
+            for quote in self.quotes:
+                if closed.is_set() or self._stopped.is_set():
+                    break
+                if quote['instrument_token'] in tokens:
+                    self._send_frame(conn, OP_BINARY, encode_binary([quote]))
+                    if self.interval:
+                        time.sleep(self.interval)
+            closed.wait()
+        except OSError:
+            pass
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _handshake(conn: socket.socket):
+        request = b""
+        while b"\r\n\r\n" not in request:
+            chunk = conn.recv(4096)
+            if not chunk:
+                raise OSError("Connection closed during handshake")
+            request += chunk
+        headers = {}
+        for line in request.decode().split("\r\n")[1:]:
+            if ":" in line:
+                key, value = line.split(":", 1)
+                headers[key.strip().lower()] = value.strip()
+        accept = base64.b64encode(hashlib.sha1((headers["sec-websocket-key"] + _WS_GUID).encode()).digest())
+        conn.sendall(
+            b"HTTP/1.1 101 Switching Protocols\r\n"
+            b"Upgrade: websocket\r\n"
+            b"Connection: Upgrade\r\n"
+            b"Sec-WebSocket-Accept: " + accept + b"\r\n\r\n"
+        )
+
+    @staticmethod
+    def _recv_exact(conn: socket.socket, n: int) -> bytes:
+        data = b""
+        while len(data) < n:
+            chunk = conn.recv(n - len(data))
+            if not chunk:
+                raise OSError("Connection closed")
+            data += chunk
+        return data
+
+    @classmethod
+    def _read_frame(cls, conn: socket.socket):
+        """(opcode, payload) of the next client frame (client frames are always masked)"""
+        try:
+            first, second = cls._recv_exact(conn, 2)
+            length = second & 0x7f
+            if length == 126:
+                length = struct.unpack(">H", cls._recv_exact(conn, 2))[0]
+            elif length == 127:
+                length = struct.unpack(">Q", cls._recv_exact(conn, 8))[0]
+            mask = cls._recv_exact(conn, 4) if second & 0x80 else b"\x00" * 4
+            payload = cls._recv_exact(conn, length)
+        except OSError:
+            return None
+        return first & 0x0f, bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+
+    @staticmethod
+    def _send_frame(conn: socket.socket, opcode: int, payload: bytes):
+        header = bytes([0x80 | opcode])
+        length = len(payload)
+        if length < 126:
+            header += bytes([length])
+        elif length < 1 << 16:
+            header += bytes([126]) + struct.pack(">H", length)
+        else:
+            header += bytes([127]) + struct.pack(">Q", length)
+        conn.sendall(header + payload)
@@ -0,0 +1,256 @@
+"""Kite Connect WebSocket market data (binary quote protocol) on websocket-client"""
+import json
+import logging
+import struct
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+KITE_WS_URL = "wss://ws.kite.trade"
+
+MODE_LTP = "ltp"
+MODE_QUOTE = "quote"
+MODE_FULL = "full"
+
+# Exchange segment = low byte of the instrument token
+SEGMENT_CDS = 3
+SEGMENT_BCD = 6
+SEGMENT_INDICES = 9
+
+# Packet lengths per mode
+LTP_LENGTH = 8
+INDEX_QUOTE_LENGTH = 28
+INDEX_FULL_LENGTH = 32
+QUOTE_LENGTH = 44
+FULL_LENGTH = 184
+
+
+def _divisor(token: int) -> float:
+    segment = token & 0xff
+    if segment == SEGMENT_CDS:
+        return 10000000.0
+    if segment == SEGMENT_BCD:
+        return 10000.0
+    return 100.0
+
+
+def _timestamp(epoch: int) -> datetime:
+    return datetime.fromtimestamp(epoch, timezone.utc)
+
+
+def parse_packet(packet: bytes) -> Optional[Dict]:
+    """Decode one quote packet (market depth in full mode is skipped)"""
+    length = len(packet)
+    if length < LTP_LENGTH:
+        return None
+    fields = struct.unpack(f">{length // 4}i", packet[:length - length % 4])
+    token = fields[0]
+    divisor = _divisor(token)
+    quote = {
+        'instrument_token': token,
+        'tradable': (token & 0xff) != SEGMENT_INDICES,
+        'last_price': fields[1] / divisor
+    }
+    if length == LTP_LENGTH:
+        quote['mode'] = MODE_LTP
+    elif length in (INDEX_QUOTE_LENGTH, INDEX_FULL_LENGTH):
+        quote['mode'] = MODE_FULL if length == INDEX_FULL_LENGTH else MODE_QUOTE
+        quote['ohlc'] = {
+            'high': fields[2] / divisor,
+            'low': fields[3] / divisor,
+            'open': fields[4] / divisor,
+            'close': fields[5] / divisor
+        }
+        if length == INDEX_FULL_LENGTH:
+            quote['exchange_timestamp'] = _timestamp(fields[7])
+    elif length in (QUOTE_LENGTH, FULL_LENGTH):
+        quote['mode'] = MODE_FULL if length == FULL_LENGTH else MODE_QUOTE
+        quote.update({
+            'last_traded_quantity': fields[2],
+            'average_traded_price': fields[3] / divisor,
+            'volume_traded': fields[4],
+            'total_buy_quantity': fields[5],
+            'total_sell_quantity': fields[6],
+            'ohlc': {
+                'open': fields[7] / divisor,
+                'high': fields[8] / divisor,
+                'low': fields[9] / divisor,
+                'close': fields[10] / divisor
+            }
+        })
+        if length == FULL_LENGTH:
+            quote.update({
+                'last_trade_time': _timestamp(fields[11]),
+                'oi': fields[12],
+                'oi_day_high': fields[13],
+                'oi_day_low': fields[14],
+                'exchange_timestamp': _timestamp(fields[15])
+            })
+    else:
+        return None
+    return quote
+
+
+def parse_binary(message: bytes) -> List[Dict]:
+    """Split a binary message (count + length-prefixed packets) into quotes"""
+    if len(message) < 2:
+        return []  # 1-byte heartbeat
+    count = struct.unpack(">H", message[:2])[0]
+    quotes = []
+    offset = 2
+    for _ in range(count):
+        length = struct.unpack(">H", message[offset:offset + 2])[0]
+        quote = parse_packet(message[offset + 2:offset + 2 + length])
+        if quote:
+            quotes.append(quote)
+        offset += 2 + length
+    return quotes
+
+
+def encode_packet(quote: Dict) -> bytes:
+    """Inverse of parse_packet for quote-mode/full-mode quotes (used by the replay server)"""
+    token = quote['instrument_token']
+    divisor = _divisor(token)
+    price = lambda value: int(round(value * divisor))
+    ohlc = quote.get('ohlc', {})
+    timestamp = int((quote.get('exchange_timestamp') or datetime.now(timezone.utc)).timestamp())
+
+    if (token & 0xff) == SEGMENT_INDICES:
+        last = price(quote['last_price'])
+        close = price(ohlc.get('close', 0))
+        return struct.pack(
+            ">8i", token, last, price(ohlc.get('high', 0)), price(ohlc.get('low', 0)),
+            price(ohlc.get('open', 0)), close, last - close, timestamp
+        )
+
+    fields = struct.pack(
+        ">11i", token, price(quote['last_price']), quote.get('last_traded_quantity', 0),
+        price(quote.get('average_traded_price', 0)), quote.get('volume_traded', 0),
+        quote.get('total_buy_quantity', 0), quote.get('total_sell_quantity', 0),
+        price(ohlc.get('open', 0)), price(ohlc.get('high', 0)),
+        price(ohlc.get('low', 0)), price(ohlc.get('close', 0))
+    )
+    extra = struct.pack(
+        ">5i", timestamp, quote.get('oi', 0), quote.get('oi_day_high', 0),
+        quote.get('oi_day_low', 0), timestamp
+    )
+    return fields + extra + bytes(FULL_LENGTH - QUOTE_LENGTH - len(extra))
+
+
+def encode_binary(quotes: Iterable[Dict]) -> bytes:
+    packets = [encode_packet(quote) for quote in quotes]
+    return struct.pack(">H", len(packets)) + b"".join(struct.pack(">H", len(p)) + p for p in packets)
+
+
+class KiteStream:
+    """
+    Background WebSocket connection keeping the latest quote per instrument.
+
+    The socket runs on its own thread and replaces ``quotes[token]`` with a
+    new dict for every packet, so readers just look the token up (a single
+    dict read, no lock). Subscriptions are re-sent after reconnects.
+    """
+
+    def __init__(self, api_key: str, access_token: str, url: str = None, mode: str = MODE_FULL,
+                 reconnect_delay: float = 2.0):
+        self.url = f"{url or KITE_WS_URL}?api_key={api_key}&access_token={access_token}"
+        self.mode = mode
+        self.reconnect_delay = reconnect_delay
+        self.quotes: Dict[int, Dict] = {}
+        self.connected = threading.Event()
+
+        self._tokens = set()
+        self._listeners: List[Callable[[Dict], None]] = []
+        self._ws = None
+        self._thread = None
+        self._stopped = threading.Event()
+
+    def add_listener(self, callback: Callable[[Dict], None]):
+        """Call ``callback(quote)`` (on the socket thread) for every packet"""
+        self._listeners.append(callback)
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="kite-stream", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._ws:
+            self._ws.close()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def subscribe(self, tokens: Iterable[int]):
+        new = set(tokens) - self._tokens
+        if not new:
+            return
+        self._tokens = self._tokens | new  # Copy, the socket thread may be iterating it
+        if self.connected.is_set():
+            self._send_subscription(new)
+
+    def latest(self, token: int) -> Optional[Dict]:
+        return self.quotes.get(token)
+
+    def _run(self):
+        import websocket
+
+        while not self._stopped.is_set():
+            self._ws = websocket.WebSocketApp(
+                self.url,
+                on_open=self._on_open,
+                on_message=self._on_message,
+                on_error=lambda ws, error: logger.error(f"Kite stream error: {error}"),
+                on_close=self._on_close
+            )
+            self._ws.run_forever(ping_interval=30, ping_timeout=10)
+            if not self._stopped.is_set():
+                time.sleep(self.reconnect_delay)
+
+    def _on_open(self, ws):
+        logger.info("Kite stream connected")
+        self.connected.set()
+        if self._tokens:
+            self._send_subscription(self._tokens)
+
+    def _on_close(self, ws, status_code, message):
+        self.connected.clear()
+        logger.info(f"Kite stream closed ({status_code})")
+
+    def _send_subscription(self, tokens):
+        tokens = sorted(tokens)
+        self._ws.send(json.dumps({"a": "subscribe", "v": tokens}))
+        self._ws.send(json.dumps({"a": "mode", "v": [self.mode, tokens]}))
+
+    def _on_message(self, ws, message):
+        if not isinstance(message, bytes):
+            # Text frames carry order updates and errors
+            logger.debug(f"Kite stream message: {message}")
+            return
+        received_at = datetime.now(timezone.utc)
+        for quote in parse_binary(message):
+            quote['received_at'] = received_at
+            self.quotes[quote['instrument_token']] = quote
+            for callback in self._listeners:
+                try:
+                    callback(quote)
+                except Exception as e:
+                    logger.error(f"Kite stream listener error: {e}")
+
+
+_streams: Dict[tuple, KiteStream] = {}
+_streams_lock = threading.Lock()
+
+
+def shared_stream(api_key: str, access_token: str, url: str = None) -> KiteStream:
+    """The process-wide stream for these credentials (created on first use, started by the caller)"""
+    key = (api_key, access_token, url)
+    with _streams_lock:
+        if key not in _streams:
+            _streams[key] = KiteStream(api_key, access_token, url=url)
+        return _streams[key]
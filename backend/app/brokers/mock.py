@@ -1,44 +1,40 @@
 from app.brokers.base import BaseBroker
+from app.brokers.simulator import MarketSimulator
+from app.core.config import settings
+from app.core.market_hours import to_ist
+from app.services.clock import VirtualClock
 from datetime import datetime, timedelta
-import random
 import uuid
 
 class MockBroker(BaseBroker):
-    """Mock broker for testing and paper trading"""
+    """
+    Mock broker for testing and paper trading
     
-    def __init__(self):
+    Quotes and history come from a seeded MarketSimulator read at a
+    virtual clock (MOCK_START, advancing MOCK_SPEED times faster than
+    real time, or as fast as the loops run with MOCK_SPEED=0), so runs
+    are reproducible and need no network.
+    """
+    
+    def __init__(self, simulator: MarketSimulator = None, clock: VirtualClock = None):
         self.orders = {}
         self.base_price = 19500  # NIFTY base price
+        self.simulator = simulator or MarketSimulator(seed=settings.MOCK_SEED, base_price=self.base_price)
+        self.clock = clock or VirtualClock(
+            start=datetime.fromisoformat(settings.MOCK_START) if settings.MOCK_START else None,
+            speed=settings.MOCK_SPEED
+        )
     
     async def get_tick(self, symbol: str):
-        price = self.base_price + random.uniform(-50, 50)
-        return {
-            "symbol": symbol,
-            "timestamp": datetime.utcnow(),
-            "last": price,
-            "open": price - 10,
-            "high": price + 20,
-            "low": price - 30,
-            "close": price,
-            "volume": random.randint(1000, 10000)
-        }
+        return self.simulator.tick(symbol, self.clock.now())
     
     async def get_history(self, symbol: str, interval: str, from_date: datetime, to_date: datetime):
-        # Return mock historical data
-        data = []
-        current = from_date
-        while current < to_date:
-            price = self.base_price + random.uniform(-100, 100)
-            data.append({
-                "timestamp": current,
-                "open": price,
-                "high": price + 20,
-                "low": price - 20,
-                "close": price + random.uniform(-10, 10),
-                "volume": random.randint(1000, 10000)
-            })
-            current = current + timedelta(minutes=1)
-        return data
+        # Never return bars past the simulated present
+        now = self.clock.now()
+        to_date = min(to_ist(to_date), now) if to_date else now
+        from_date = to_ist(from_date) if from_date else to_date - timedelta(days=5)
+        bars = self.simulator.bars(symbol, from_date, to_date, interval)
+        return bars.to_dict("records")
     
     async def place_order(self, symbol: str, side: str, order_type: str, qty: int, price: float = None):
         order_id = str(uuid.uuid4())
@@ -58,7 +54,7 @@ class MockBroker(BaseBroker):
         if order_type == "market":
             order["status"] = "filled"
             order["filled_qty"] = qty
-            order["avg_price"] = self.base_price + random.uniform(-5, 5)
+            order["avg_price"] = (await self.get_tick(symbol))["last"]
         
         return order
     
@@ -1,14 +1,45 @@
 from app.brokers.base import BaseBroker
+from app.core.market_hours import IST, ist_aware
 from app.services.data_loader import DataLoader
 from datetime import datetime
 import uuid
-import asyncio
-import yfinance as yf
 
 class PaperBroker(BaseBroker):
     """Paper trading broker using yfinance data"""
     
     def __init__(self):
+        self.orders = {}
+        self.positions = {}
+        self.balance = 100000.0  # Virtual cash
+    
+    async def get_tick(self, symbol: str):
+        try:
+            # Latest 1-minute bar (served from the local cache when fresh)
+            df = await self.run_blocking(
+                DataLoader.fetch_history, symbol, period="1d", interval="1m",
+                key=("tick", symbol)
+            )
+            last = df.iloc[-1]
+            # Bars carry their own volume; ticks report the session total so far
+            session = df[df['timestamp'].dt.normalize() == last['timestamp'].normalize()]
+            return {
+                "symbol": symbol,
+                "timestamp": ist_aware(last['timestamp'].to_pydatetime()),
+                "last": float(last['close']),
+                "open": float(last['open']),
+                "high": float(last['high']),
+                "low": float(last['low']),
+                "close": float(last['close']),
+                "volume": int(session['volume'].sum())
+            }
+        except Exception as e:
+            print(f"Paper tick error: {e}")
+            return {
+                "symbol": symbol,
+                "timestamp": datetime.now(IST),
+                "last": 0.0,
+                "open": 0.0,
+                "high": 0.0,
                 "low": 0.0,
                 "close": 0.0,
                 "volume": 0
@@ -27,21 +58,13 @@ class PaperBroker(BaseBroker):
         if interval == "1m": period = "5d"
         if interval == "5m": period = "1mo"
         
-        df = DataLoader.fetch_history(symbol, period=period, interval=yf_interval)
+        df = await self.run_blocking(
+            DataLoader.fetch_history, symbol, period=period, interval=yf_interval,
+            key=("history", symbol, period, yf_interval)
+        )
         
         # Convert to list of dicts
-        data = []
-        for _, row in df.iterrows():
-            data.append({
-                "timestamp": row['timestamp'],
-                "open": row['open'],
-                "high": row['high'],
-                "low": row['low'],
-                "close": row['close'],
-                "volume": row['volume']
-            })
-            
-        return data
+        return df[["timestamp", "open", "high", "low", "close", "volume"]].to_dict("records")
 
     async def place_order(self, symbol: str, side: str, order_type: str, qty: int, price: float = None):
         order_id = str(uuid.uuid4())
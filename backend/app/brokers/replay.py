@@ -0,0 +1,251 @@
+"""Broker replaying stored OHLCV bars on a virtual clock"""
+import asyncio
+import logging
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.brokers.base import BaseBroker
+from app.core.config import settings
+from app.core.market_hours import SESSION_OPEN, ist_aware, to_ist
+from app.services.clock import VirtualClock
+from app.services.data_cache import OHLCVCache, interval_delta, period_start
+
+logger = logging.getLogger(__name__)
+
+BAR_COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+
+
+class ReplayBroker(BaseBroker):
+    """
+    Paper broker over recorded bars instead of live data.
+
+    Bars come from ``bars`` (symbol -> DataFrame) or, for any other
+    symbol, from the Parquet files DataLoader caches in ``data_dir``.
+    Everything is read at ``clock.now()``: ticks show the last completed
+    bar, history stops at the present and the forming bar only shows its
+    open, so strategies never see the future. By default the clock starts
+    at the open of the last session in the data (earlier sessions serve as
+    warm-up history) and runs as fast as the trading loops allow.
+    """
+
+    def __init__(self, bars: Dict[str, pd.DataFrame] = None, start: datetime = None, speed: float = None,
+                 clock: VirtualClock = None, data_dir: str = None, interval: str = "1m"):
+        self.data_dir = data_dir or settings.REPLAY_DATA_DIR or settings.DATA_CACHE_DIR
+        self.interval = interval
+        self.bar_length = interval_delta(interval)
+        self._frames: Dict[str, Dict] = {}
+        for symbol, df in (bars or {}).items():
+            self.add(symbol, df)
+
+        self.orders = {}
+        self.positions = {}
+        self.balance = 100000.0  # Virtual cash
+
+        if clock is None:
+            if start is None:
+                if not self._frames:
+                    raise ValueError("ReplayBroker needs a start time or preloaded bars")
+                start = self.default_start()
+            clock = VirtualClock(start, speed)
+        self.clock = clock
+
+    @staticmethod
+    def _normalize(symbol: str) -> str:
+        # Same naming as DataLoader's cache
+        if not symbol.startswith("^") and not symbol.endswith(".NS"):
+            return f"{symbol}.NS"
+        return symbol
+
+    def add(self, symbol: str, df: pd.DataFrame):
+        """Register bars for ``symbol`` (columns timestamp, open, high, low, close, volume)"""
+        df = df[BAR_COLUMNS].sort_values('timestamp').reset_index(drop=True)
+        timestamps = df['timestamp'].to_numpy(dtype='datetime64[ns]')
+        days = timestamps.astype('datetime64[D]')
+        # Cumulative day volume, as broker ticks report it
+        day_volume = df['volume'].groupby(days).cumsum().to_numpy()
+        self._frames[symbol] = {'bars': df, 'timestamps': timestamps, 'day_volume': day_volume}
+
+    def _frame(self, symbol: str) -> Dict:
+        if symbol not in self._frames:
+            key = self._normalize(symbol)
+            cached = OHLCVCache(self.data_dir).read(key, self.interval)
+            if cached is None or cached.empty:
+                raise ValueError(f"No {self.interval} bars to replay for {symbol} in {self.data_dir}")
+            self.add(symbol, cached)
+        return self._frames[symbol]
+
+    def default_start(self) -> datetime:
+        last = max(frame['timestamps'][-1] for frame in self._frames.values())
+        return datetime.combine(pd.Timestamp(last).date(), SESSION_OPEN)
+
+    @property
+    def end(self) -> datetime:
+        """When the last loaded bar completes"""
+        last = max(frame['timestamps'][-1] for frame in self._frames.values())
+        return pd.Timestamp(last).to_pydatetime() + self.bar_length
+
+    def _position(self, frame: Dict) -> int:
+        """Index of the last bar completed at the current virtual time (-1 if none)"""
+        cutoff = np.datetime64(self.clock.now() - self.bar_length, 'ns')
+        return int(np.searchsorted(frame['timestamps'], cutoff, side='right')) - 1
+
+    def fetch_history(self, symbol: str, period: str = "5d", interval: str = "1m", use_cache: bool = True) -> pd.DataFrame:
+        """
+        DataLoader.fetch_history over the replayed bars: the bars of
+        ``period`` up to now, the last one still forming.
+        """
+        if interval != self.interval:
+            raise ValueError(f"Replaying {self.interval} bars, cannot serve {interval}")
+        frame = self._frame(symbol)
+        now = self.clock.now()
+        start = period_start(period, now)
+        timestamps = frame['timestamps']
+        lo = 0 if start is None else int(np.searchsorted(timestamps, np.datetime64(start, 'ns')))
+        hi = int(np.searchsorted(timestamps, np.datetime64(now, 'ns'), side='right'))
+        df = frame['bars'].iloc[lo:hi].copy()
+
+        if not df.empty and df['timestamp'].iloc[-1] + self.bar_length > now:
+            # Only the open of the forming bar is known yet
+            last = df.index[-1]
+            df.loc[last, ['high', 'low', 'close']] = df.loc[last, 'open']
+            df.loc[last, 'volume'] = 0
+        return df.reset_index(drop=True)
+
+    async def get_tick(self, symbol: str):
+        frame = self._frame(symbol)
+        i = self._position(frame)
+        if i < 0:
+            return None
+        bar = frame['bars'].iloc[i]
+        return {
+            "symbol": symbol,
+            "timestamp": ist_aware(self.clock.now()),
+            "last": float(bar['close']),
+            "open": float(bar['open']),
+            "high": float(bar['high']),
+            "low": float(bar['low']),
+            "close": float(bar['close']),
+            "volume": int(frame['day_volume'][i])
+        }
+
+    async def get_history(self, symbol: str, interval: str, from_date: datetime, to_date: datetime):
+        frame = self._frame(symbol)
+        bars = frame['bars'].iloc[:self._position(frame) + 1]
+        if from_date is not None:
+            bars = bars[bars['timestamp'] >= to_ist(from_date)]
+        if to_date is not None:
+            bars = bars[bars['timestamp'] < to_ist(to_date)]
+
+        if interval != self.interval:
+            # Session-aligned (9:15) buckets, as BarAggregator builds them
+            rule = "1D" if interval == "1d" else f"{int(interval_delta(interval).total_seconds() // 60)}min"
+            bars = bars.set_index('timestamp').resample(
+                rule, offset=None if interval == "1d" else f"{SESSION_OPEN.minute}min"
+            ).agg({'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'})
+            bars = bars.dropna(subset=['open']).reset_index()
+        return bars.to_dict("records")
+
+    async def place_order(self, symbol: str, side: str, order_type: str, qty: int, price: float = None):
+        tick = await self.get_tick(symbol)
+        if tick is None:
+            raise ValueError(f"No replayed price for {symbol} at {self.clock.now()}")
+        current_price = tick['last'] if order_type == "market" or price is None else price
+
+        order_id = str(uuid.uuid4())
+        order = {
+            "order_id": order_id,
+            "symbol": symbol,
+            "side": side,
+            "type": order_type,
+            "qty": qty,
+            "price": current_price,
+            "status": "filled", # Auto-fill, as in paper trading
+            "filled_qty": qty,
+            "avg_price": current_price,
+            "timestamp": self.clock.now()
+        }
+        self.orders[order_id] = order
+
+        pos = self.positions.setdefault(symbol, {"qty": 0, "avg_price": 0.0})
+        if side == "buy":
+            total_cost = (pos['qty'] * pos['avg_price']) + (qty * current_price)
+            pos['qty'] += qty
+            pos['avg_price'] = total_cost / pos['qty'] if pos['qty'] > 0 else 0
+            self.balance -= (qty * current_price)
+        else:
+            pos['qty'] -= qty
+            self.balance += (qty * current_price)
+        return order
+
+    async def cancel_order(self, order_id: str):
+        if order_id in self.orders:
+            self.orders[order_id]["status"] = "cancelled"
+            return self.orders[order_id]
+        return {"error": "Order not found"}
+
+    async def get_order_status(self, order_id: str):
+        return self.orders.get(order_id, {"error": "Order not found"})
+
+
+async def run_replay(broker: ReplayBroker, symbols: List[str], until: datetime = None, user_id: int = None) -> Dict:
+    """
+    Trade ``symbols`` with the real TradingEngine against ``broker`` until
+    ``until`` (default: the end of the data), recording the orders for
+    ``user_id`` (default: the demo user); returns the engine status and the
+    orders filled.
+    """
+    from app.services.trading_engine import DEFAULT_USER_ID, TradingEngine
+
+    engine = TradingEngine()
+    engine.use_broker(broker, user_id or DEFAULT_USER_ID)
+    engine.start_many(symbols)
+    try:
+        await broker.clock.sleep_until(until or broker.end)
+    finally:
+        engine.stop()
+        await asyncio.sleep(0)
+    return {"status": engine.status(), "orders": list(broker.orders.values()), "balance": broker.balance}
+
+
+_clock: Optional[VirtualClock] = None
+
+
+def shared_replay_broker() -> ReplayBroker:
+    """
+    ReplayBroker for BROKER_MODE=replay. Every account shares one clock so
+    the engine, analyzers and API requests see the same moment.
+    """
+    global _clock
+    if _clock is None:
+        if not settings.REPLAY_START:
+            raise ValueError("BROKER_MODE=replay needs REPLAY_START")
+        broker = ReplayBroker(start=datetime.fromisoformat(settings.REPLAY_START), speed=settings.REPLAY_SPEED)
+        _clock = broker.clock
+        return broker
+    return ReplayBroker(clock=_clock)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Replay cached 1m bars through TradingEngine")
+    parser.add_argument("symbols", nargs="+")
+    parser.add_argument("--start", help="Virtual start (ISO, IST); default: open of the last cached session")
+    parser.add_argument("--speed", type=float, default=None, help="Times real time; default: as fast as possible")
+    args = parser.parse_args()
+
+    bars = {}
+    for symbol in args.symbols:
+        cached = OHLCVCache(settings.REPLAY_DATA_DIR or settings.DATA_CACHE_DIR).read(ReplayBroker._normalize(symbol), "1m")
+        if cached is None:
+            raise SystemExit(f"No cached 1m bars for {symbol}; fetch them with DataLoader first")
+        bars[symbol] = cached
+    start = datetime.fromisoformat(args.start) if args.start else None
+    result = asyncio.run(run_replay(ReplayBroker(bars, start=start, speed=args.speed), args.symbols))
+    for order in result["orders"]:
+        print(f"{order['timestamp']} {order['side']:4} {order['qty']} {order['symbol']} @ {order['avg_price']:.2f}")
+    print(f"Orders: {len(result['orders'])}  Balance: {result['balance']:.2f}")
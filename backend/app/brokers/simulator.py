@@ -0,0 +1,207 @@
+"""
+Seeded, vectorized market simulator behind MockBroker.
+
+Prices follow a regime-switching GBM. A day-level Markov chain picks a
+calm or volatile regime; each day draws its return and overnight gap from
+the regime's volatility. Minute bars inside the 9:15-15:30 IST session are
+a Brownian bridge ending at the day's return, with a U-shaped intraday
+volatility and volume curve. Every day is generated from
+(seed, symbol, day) alone, so history, live ticks and reruns agree, and
+any range can be generated directly without simulating from the origin.
+"""
+import zlib
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.core.market_hours import INTERVALS, SESSION_OPEN, ist_aware
+
+SESSION_MINUTES = 375  # 9:15 to 15:30
+TRADING_DAYS = 252
+ORIGIN = np.datetime64('2000-01-03', 'D')  # Day 0 of every simulated path
+HORIZON = 30000  # Business days simulated from the origin (into the 2110s)
+ANCHOR = np.datetime64('2024-01-01', 'D')  # Day on which a symbol opens at its base price
+
+BAR_FIELDS = ('open', 'high', 'low', 'close', 'volume')
+
+
+def intraday_curve(minutes: int = SESSION_MINUTES, depth: float = 2.5) -> np.ndarray:
+    """U-shaped weights (heavy at the open and close) summing to 1"""
+    x = (np.arange(minutes) + 0.5) / minutes
+    curve = 1 + depth * (2 * x - 1) ** 2
+    return curve / curve.sum()
+
+
+class MarketSimulator:
+    """
+    Deterministic OHLCV generator.
+
+    ``vols`` and ``switch`` are per regime (calm, volatile): annualized
+    volatility and the daily probability of leaving the regime. Volatile
+    days also trade ``volume_boost`` times more.
+    """
+
+    def __init__(self, seed: int = 0, base_price: float = 19500.0, base_prices: Dict[str, float] = None,
+                 drift: float = 0.08, vols: Tuple[float, float] = (0.12, 0.30),
+                 switch: Tuple[float, float] = (0.03, 0.15), gap_vol: float = 0.25,
+                 base_volume: float = 50000.0, volume_boost: float = 1.6, cache_days: int = 64):
+        self.seed = seed
+        self.base_price = base_price
+        self.base_prices = base_prices or {}
+        self.drift = drift
+        self.vols = np.asarray(vols, dtype=float)
+        self.switch = np.asarray(switch, dtype=float)
+        self.gap_vol = gap_vol
+        self.base_volume = base_volume
+        self.volume_boost = volume_boost
+        self.curve = intraday_curve()
+        self.cum_curve = np.cumsum(self.curve)
+
+        self._daily: Dict[str, Dict[str, np.ndarray]] = {}
+        self._days: OrderedDict = OrderedDict()  # (symbol, day) -> bars, for repeated tick reads
+        self._cache_days = cache_days
+
+    def _rng(self, symbol: str, *keys) -> np.random.Generator:
+        return np.random.default_rng([self.seed, zlib.crc32(symbol.encode()), *keys])
+
+    def daily(self, symbol: str) -> Dict[str, np.ndarray]:
+        """Regime, return, gap and open price for every simulated day"""
+        if symbol not in self._daily:
+            rng = self._rng(symbol, 0xDA11)
+
+            # Markov regimes as alternating geometric run lengths
+            state = rng.integers(2)
+            runs = rng.geometric(self.switch[np.arange(HORIZON) % 2 ^ state])
+            regime = np.repeat(np.arange(len(runs)) % 2 ^ state, runs)[:HORIZON]
+
+            sigma = self.vols[regime] / np.sqrt(TRADING_DAYS)
+            returns = (self.drift / TRADING_DAYS - 0.5 * sigma ** 2) + sigma * rng.standard_normal(HORIZON)
+            gaps = self.gap_vol * sigma * rng.standard_normal(HORIZON)
+            gaps[0] = 0.0
+            log_open = np.cumsum(gaps) + np.concatenate(([0.0], np.cumsum(returns[:-1])))
+            log_open += np.log(self.base_prices.get(symbol, self.base_price)) - log_open[np.busday_count(ORIGIN, ANCHOR)]
+            self._daily[symbol] = {'regime': regime, 'sigma': sigma, 'return': returns, 'open': np.exp(log_open)}
+        return self._daily[symbol]
+
+    @staticmethod
+    def day_index(ts) -> np.ndarray:
+        """Business-day index (from ORIGIN) of the dates in ``ts``"""
+        dates = np.asarray(ts, dtype='datetime64[D]')
+        return np.busday_count(ORIGIN, dates)
+
+    def day_bars(self, symbol: str, days: np.ndarray) -> Dict[str, np.ndarray]:
+        """1-minute bars for each day index in ``days``, as (len(days), 375) arrays"""
+        days = np.asarray(days, dtype=np.int64)
+        if days.size and (days.min() < 0 or days.max() >= HORIZON):
+            raise ValueError(f"Simulated days must be within {HORIZON} business days of {ORIGIN}")
+        daily = self.daily(symbol)
+        n = len(days)
+
+        # Per-day draws come from a (seed, symbol, day) stream so days are independent of the query range
+        shocks = np.empty((n, 3, SESSION_MINUTES))
+        noise = np.empty(n)
+        for i, day in enumerate(days):
+            rng = self._rng(symbol, int(day))
+            shocks[i] = rng.standard_normal((3, SESSION_MINUTES))
+            noise[i] = rng.standard_normal()
+
+        sigma = daily['sigma'][days][:, None]
+        step = sigma * np.sqrt(self.curve)
+        walk = np.cumsum(shocks[:, 0] * step, axis=1)
+        # Bridge: bend the walk so the session ends exactly on the day's return
+        path = walk - self.cum_curve * (walk[:, -1:] - daily['return'][days][:, None])
+
+        day_open = daily['open'][days][:, None]
+        close = day_open * np.exp(path)
+        open_ = np.concatenate((day_open, close[:, :-1]), axis=1)
+        high = np.maximum(open_, close) * np.exp(0.5 * step * np.abs(shocks[:, 1]))
+        low = np.minimum(open_, close) * np.exp(-0.5 * step * np.abs(shocks[:, 2]))
+
+        boost = np.where(daily['regime'][days] == 1, self.volume_boost, 1.0) * np.exp(0.3 * noise)
+        volume = np.rint(
+            self.base_volume * SESSION_MINUTES * self.curve * boost[:, None] * np.exp(0.3 * shocks[:, 1] * shocks[:, 2])
+        )
+        return {'open': open_, 'high': high, 'low': low, 'close': close, 'volume': volume}
+
+    def bars(self, symbol: str, start: datetime, end: datetime, interval: str = '1m') -> pd.DataFrame:
+        """Session-aligned bars with timestamps (naive IST) in [start, end)"""
+        start_day = np.datetime64(pd.Timestamp(start).normalize().date(), 'D')
+        end_day = np.datetime64(pd.Timestamp(end).date(), 'D')
+        dates = np.arange(start_day, end_day + 1)
+        dates = dates[np.is_busday(dates)]
+        if not len(dates):
+            return pd.DataFrame(columns=['timestamp', *BAR_FIELDS])
+
+        minute = self.day_bars(symbol, self.day_index(dates))
+        if interval == '1d':
+            starts = np.array([0])
+        else:
+            starts = np.arange(0, SESSION_MINUTES, INTERVALS[interval])
+        ends = np.append(starts[1:], SESSION_MINUTES)
+
+        cols = {
+            'open': minute['open'][:, starts],
+            'high': np.maximum.reduceat(minute['high'], starts, axis=1),
+            'low': np.minimum.reduceat(minute['low'], starts, axis=1),
+            'close': minute['close'][:, ends - 1],
+            'volume': np.add.reduceat(minute['volume'], starts, axis=1),
+        }
+        # Daily bars are stamped at midnight, intraday bars at their session-aligned start
+        lower = pd.Timestamp(start).normalize() if interval == '1d' else pd.Timestamp(start)
+        open_offset = 0 if interval == '1d' else SESSION_OPEN.hour * 60 + SESSION_OPEN.minute
+        timestamps = dates.astype('datetime64[m]')[:, None] + (open_offset + starts).astype('timedelta64[m]')
+
+        df = pd.DataFrame({
+            'timestamp': timestamps.ravel().astype('datetime64[ns]'),
+            **{field: values.ravel() for field, values in cols.items()}
+        })
+        mask = (df['timestamp'] >= lower) & (df['timestamp'] < pd.Timestamp(end))
+        return df[mask].reset_index(drop=True)
+
+    def _day(self, symbol: str, day: int) -> Dict[str, np.ndarray]:
+        key = (symbol, day)
+        if key in self._days:
+            self._days.move_to_end(key)
+            return self._days[key]
+        bars = {k: v[0] for k, v in self.day_bars(symbol, np.array([day])).items()}
+        self._days[key] = bars
+        if len(self._days) > self._cache_days:
+            self._days.popitem(last=False)
+        return bars
+
+    def tick(self, symbol: str, now: datetime) -> Optional[Dict]:
+        """
+        Quote at ``now`` (naive IST): the forming minute bar interpolated
+        to the second, with cumulative day volume and an IST-aware
+        timestamp. Outside the session the last close of the most recent
+        session is returned.
+        """
+        date = np.datetime64(now.date(), 'D')
+        minutes = (now - datetime.combine(now.date(), SESSION_OPEN)).total_seconds() / 60
+        if not np.is_busday(date):
+            # Weekend: stay on the previous session's close
+            date, minutes = np.busday_offset(date, 0, roll='backward'), SESSION_MINUTES
+        elif minutes < 0:
+            date, minutes = np.busday_offset(date, -1), SESSION_MINUTES
+        day = int(self.day_index(date))
+        bars = self._day(symbol, day)
+
+        if minutes >= SESSION_MINUTES:
+            i, frac = SESSION_MINUTES - 1, 1.0
+        else:
+            i, frac = int(minutes), minutes - int(minutes)
+        open_, close = bars['open'][i], bars['close'][i]
+        last = open_ + (close - open_) * frac
+        return {
+            'symbol': symbol,
+            'timestamp': ist_aware(now),
+            'last': float(last),
+            'open': float(bars['open'][0]),
+            'high': float(max(bars['high'][:i].max(initial=open_), max(open_, last))),
+            'low': float(min(bars['low'][:i].min(initial=open_), min(open_, last))),
+            'close': float(last),
+            'volume': int(bars['volume'][:i].sum() + bars['volume'][i] * frac)
+        }
@@ -1,37 +1,121 @@
 from app.brokers.base import BaseBroker
+from app.brokers.instruments import instrument_master, lot_quantity
+from app.core.market_hours import IST, ist_aware
 from datetime import datetime
 
+# The full instruments dump is several MB
+INSTRUMENTS_TIMEOUT = 60.0
+
 class ZerodhaBroker(BaseBroker):
     """
     Zerodha Kite Connect Broker Implementation.
     Requires 'kiteconnect' package and valid API keys.
+    
+    With ZERODHA_STREAMING on, quotes come from a Kite WebSocket stream:
+    get_tick subscribes the instrument and then just reads the latest
+    streamed quote from memory, falling back to a REST quote until the
+    first packet arrives.
     """
     
     def __init__(self):
+        from app.core.config import settings
+        
+        self.stream = None
         try:
             from kiteconnect import KiteConnect
-            from app.core.config import settings
             
-            self.kite = KiteConnect(api_key=settings.ZERODHA_API_KEY)
+            # Keep-alive connections for as many calls as the broker pool runs at once
+            workers = self.max_workers or settings.BROKER_IO_WORKERS
+            self.kite = KiteConnect(
+                api_key=settings.ZERODHA_API_KEY,
+                timeout=settings.BROKER_TIMEOUT,
+                pool={"pool_connections": workers, "pool_maxsize": workers}
+            )
             self.kite.set_access_token(settings.ZERODHA_ACCESS_TOKEN)
             print("Zerodha Broker Initialized")
         except ImportError:
             print("KiteConnect not installed. pip install kiteconnect")
         except Exception as e:
             print(f"Failed to initialize Zerodha broker: {e}")
+        
+        if settings.ZERODHA_STREAMING:
+            from app.brokers.kite_stream import shared_stream
+            
+            # One socket per session, however many broker objects get created
+            self.stream = shared_stream(
+                settings.ZERODHA_API_KEY,
+                settings.ZERODHA_ACCESS_TOKEN,
+                url=settings.ZERODHA_WS_URL
+            )
+
+    async def _instruments(self):
+        """Today's instrument master (downloaded at most once a day, then read from memory)"""
+        if instrument_master.is_fresh():
+            return instrument_master
+        return await self.run_blocking(
+            instrument_master.ensure, self.kite.instruments, key="instruments", timeout=INSTRUMENTS_TIMEOUT
+        )
+
+    async def _token(self, symbol: str) -> int:
+        return (await self._instruments()).resolve(symbol)['instrument_token']
+
+    def add_tick_listener(self, callback):
+        """Call ``callback(quote)`` with every raw streamed quote (on the stream thread)"""
+        if self.stream is None:
+            raise RuntimeError("Streaming is disabled (ZERODHA_STREAMING=false)")
+        self.stream.add_listener(callback)
+        self.stream.start()
+
+    async def health_check(self):
+        """Session check against the profile endpoint, plus the stream's connection state"""
+        if not hasattr(self, "kite"):
+            return {"status": "failed", "error": "KiteConnect not initialized"}
+        try:
+            profile = await self.run_blocking(self.kite.profile)
+        except Exception as e:
+            return {"status": "failed", "error": str(e) or type(e).__name__}
+        return {
+            "status": "ok",
+            "user_id": profile.get("user_id"),
+            "streaming": self.stream is not None and self.stream.connected.is_set()
+        }
+
+    @staticmethod
+    def _stream_tick(symbol: str, quote: dict):
+        ohlc = quote.get('ohlc', {})
+        return {
+            "symbol": symbol,
+            "timestamp": quote.get('exchange_timestamp') or quote['received_at'],  # UTC-aware
+            "last": quote['last_price'],
+            "open": ohlc.get('open'),
+            "high": ohlc.get('high'),
+            "low": ohlc.get('low'),
+            "close": ohlc.get('close'),
+            "volume": quote.get('volume_traded', 0)
+        }
 
     async def get_tick(self, symbol: str):
-        # Map symbol to instrument token
-        # This is a simplified example. You need a mapping logic.
-        # e.g., ^NSEI -> 256265 (NIFTY 50)
-        token = 256265 if symbol == "^NSEI" else 260105 # BANKNIFTY
+        try:
+            instrument = (await self._instruments()).resolve(symbol)
+        except Exception as e:
+            print(f"Zerodha tick error: {e}")
+            return None
+        token = instrument['instrument_token']
+        
+        if self.stream is not None:
+            self.stream.start()
+            self.stream.subscribe([token])
+            quote = self.stream.latest(token)
+            if quote is not None:
+                return self._stream_tick(symbol, quote)
         
         try:
-            ticks = self.kite.quote([f"NSE:{token}"])
-            tick = ticks[f"NSE:{token}"]
+            key = f"{instrument['exchange']}:{instrument['tradingsymbol']}"
+            tick = (await self.run_blocking(self.kite.quote, [key], key=("quote", key)))[key]
             return {
                 "symbol": symbol,
-                "timestamp": datetime.now(), # Kite gives timestamp
+                # Kite sends naive exchange (IST) times
+                "timestamp": ist_aware(tick.get('timestamp') or tick.get('last_trade_time') or datetime.now(IST)),
                 "last": tick['last_price'],
                 "open": tick['ohlc']['open'],
                 "high": tick['ohlc']['high'],
@@ -44,9 +128,6 @@ class ZerodhaBroker(BaseBroker):
             return None
 
     async def get_history(self, symbol: str, interval: str, from_date: datetime, to_date: datetime):
-        # Map symbol to token
-        token = 256265 if symbol == "^NSEI" else 260105
-        
         # Map interval
         # Kite intervals: minute, day, 3minute, 5minute...
         kite_interval = "minute"
@@ -56,8 +137,9 @@ class ZerodhaBroker(BaseBroker):
         elif interval == "1d": kite_interval = "day"
         
         try:
-            records = self.kite.historical_data(
-                instrument_token=token,
+            records = await self.run_blocking(
+                self.kite.historical_data,
+                instrument_token=await self._token(symbol),
                 from_date=from_date,
                 to_date=to_date,
                 interval=kite_interval
@@ -83,18 +165,24 @@ class ZerodhaBroker(BaseBroker):
         try:
             from kiteconnect import KiteConnect
             
-            # Map Index to Futures Symbol (Dynamic based on current date ideally)
-            # For 2025-11-23, we assume Nov Futures
-            tradingsymbol = "NIFTY25NOVFUT" if symbol == "^NSEI" else "BANKNIFTY25NOVFUT"
+            # Equities trade in the cash segment; indices through their
+            # near-month future (rolls over after expiry), in whole lots
+            instrument = (await self._instruments()).order_instrument(symbol)
+            tradingsymbol = instrument['tradingsymbol']
+            lots = lot_quantity(qty, instrument['lot_size'])
+            if lots != qty:
+                print(f"Rounded {qty} {tradingsymbol} to {lots} (lot size {instrument['lot_size']})")
+                qty = lots
             
             transaction_type = KiteConnect.TRANSACTION_TYPE_BUY if side == "buy" else KiteConnect.TRANSACTION_TYPE_SELL
             order_type_kite = KiteConnect.ORDER_TYPE_MARKET if order_type == "market" else KiteConnect.ORDER_TYPE_LIMIT
             
             print(f"Placing Real Order: {side} {qty} {tradingsymbol}")
             
-            order_id = self.kite.place_order(
+            order_id = await self.run_blocking(
+                self.kite.place_order,
                 tradingsymbol=tradingsymbol,
-                exchange=KiteConnect.EXCHANGE_NFO,
+                exchange=instrument['exchange'],
                 transaction_type=transaction_type,
                 quantity=qty,
                 variety=KiteConnect.VARIETY_REGULAR,
@@ -109,7 +197,7 @@ class ZerodhaBroker(BaseBroker):
 
     async def cancel_order(self, order_id: str):
         try:
-            self.kite.cancel_order(variety=self.kite.VARIETY_REGULAR, order_id=order_id)
+            await self.run_blocking(self.kite.cancel_order, variety=self.kite.VARIETY_REGULAR, order_id=order_id)
             return {"status": "cancelled"}
         except Exception as e:
             print(f"Zerodha cancel error: {e}")
@@ -117,7 +205,7 @@ class ZerodhaBroker(BaseBroker):
 
     async def get_order_status(self, order_id: str):
         try:
-            history = self.kite.order_history(order_id=order_id)
+            history = await self.run_blocking(self.kite.order_history, order_id=order_id)
             if history:
                 return {"status": history[-1]['status']}
             return {"status": "unknown"}
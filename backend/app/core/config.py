@@ -3,14 +3,35 @@ from typing import Optional
 
 class Settings(BaseSettings):
     DATABASE_URL: str = "sqlite:///./autotrader.db"
+    DB_POOL_SIZE: int = 10  # Connections kept open per engine (sync and async)
+    DB_MAX_OVERFLOW: int = 20  # Extra connections allowed under burst load
+    DB_POOL_TIMEOUT: float = 30.0  # Seconds to wait for a free connection
+    DB_POOL_RECYCLE: int = 1800  # Seconds before a pooled connection is replaced
     REDIS_URL: Optional[str] = None
     SECRET_KEY: str = "dev_secret_key_change_in_production_min_32_chars"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    AUTH_CACHE_TTL: float = 30.0  # Seconds verified tokens/users are reused (0 = off); shared via REDIS_URL if set
+    AUTH_CACHE_MAX_ENTRIES: int = 10000  # In-process cache size
     
     BROKER_MODE: str = "paper"
+    BROKER_IO_WORKERS: int = 8  # Threads per broker for blocking SDK calls
+    BROKER_TIMEOUT: float = 10.0  # Seconds before a broker network call is abandoned
+    BROKER_HEALTH_INTERVAL: float = 30.0  # Seconds between background broker health checks
+    BROKER_EVICT_AFTER: int = 3  # Consecutive failed health checks before a broker is rebuilt
+    MOCK_SEED: int = 42  # Market simulator seed for BROKER_MODE=mock
+    MOCK_SPEED: float = 1.0  # Simulated seconds per wall-clock second (0 = as fast as possible)
+    MOCK_START: str = ""  # Simulated start time (ISO, IST); empty = now
+    REPLAY_DATA_DIR: str = ""  # Parquet bars for BROKER_MODE=replay (empty = DATA_CACHE_DIR)
+    REPLAY_START: str = ""  # Virtual start time (ISO, IST), required for BROKER_MODE=replay
+    REPLAY_SPEED: float = 0.0  # Times real time (0 = as fast as possible)
     ZERODHA_API_KEY: str = ""
     ZERODHA_API_SECRET: str = ""
+    ZERODHA_ACCESS_TOKEN: str = ""
+    ZERODHA_STREAMING: bool = True  # Quotes from the Kite WebSocket instead of REST polling
+    ZERODHA_WS_URL: str = "wss://ws.kite.trade"
+    INSTRUMENT_CACHE_DIR: str = "./instrument_cache"
+    INSTRUMENT_REFRESH_TIME: str = "08:30"  # IST, when the daily instruments dump is published
     
     # Razorpay Payment Gateway
     RAZORPAY_KEY_ID: str = ""
@@ -18,6 +39,42 @@ class Settings(BaseSettings):
     
     MLFLOW_TRACKING_URI: str = "http://localhost:5000"
     
+    # Local OHLCV cache (Parquet files per symbol/interval)
+    DATA_CACHE_ENABLED: bool = True
+    DATA_CACHE_DIR: str = "./data_cache"
+    DATA_OFFLINE: bool = False  # Serve history only from the cache
+    
+    # Indicator implementation used by FeatureEngine: "pandas_ta" or "numpy"
+    INDICATOR_BACKEND: str = "pandas_ta"
+    
+    # Engineered feature matrices keyed by input data + indicator config
+    FEATURE_CACHE_ENABLED: bool = True
+    FEATURE_CACHE_DIR: str = "./feature_cache"
+    FEATURE_CACHE_MAX_ENTRIES: int = 50
+    
+    # Bars kept in memory per symbol/interval by the shared bar store
+    BAR_STORE_CAPACITY: int = 10000
+    
+    # TradingEngine workers (per-symbol loops share these pools)
+    ENGINE_POLL_SECONDS: int = 15
+    ENGINE_IO_WORKERS: int = 16
+    ENGINE_CPU_WORKERS: int = 0  # 0 = one process per CPU
+    INFERENCE_BATCH_WINDOW: float = 0.05  # Seconds to collect rows from all symbols
+    INFERENCE_MAX_BATCH: int = 256
+    
+    # Write-behind order/position persistence
+    ORDER_WRITER_BATCH: int = 100  # Writes per transaction
+    ORDER_WRITER_INTERVAL: float = 0.2  # Seconds a write may wait for its batch
+    ORDER_JOURNAL_PATH: str = "./order_journal.jsonl"  # Queued writes not yet committed, replayed on start
+    
+    # Model registry (artifacts on disk, versions in the models table)
+    MODEL_NAME: str = "nifty_trading"
+    MODEL_REGISTRY_DIR: str = "./model_registry"
+    MODEL_CACHE_SIZE: int = 4  # Loaded models kept per process
+    MODEL_RELOAD_SECONDS: int = 60  # How often running engines check for a new version
+    MODEL_LEARNER: str = "gbm"  # gbm, hist, xgboost or lightgbm
+    TRAIN_WORKERS: int = 0  # Processes for CV folds + final fit (0 = one per CPU)
+    
     MAX_POSITION_SIZE: int = 100000
     MAX_DAILY_LOSS: int = 50000
     MAX_LEVERAGE: int = 5
@@ -0,0 +1,29 @@
+"""File helpers shared by the on-disk caches and the model registry"""
+import os
+import tempfile
+from contextlib import contextmanager
+from typing import Iterator
+
+
+@contextmanager
+def atomic_write(path: str) -> Iterator[str]:
+    """
+    Yield a temporary path next to ``path``; once the block succeeds it is
+    renamed over ``path``, so readers never see a half-written file.
+
+    Each writer gets its own uniquely named temp file, so concurrent writers
+    of the same path cannot clobber each other's partial output (the last
+    rename wins). The temp file is removed if the block raises.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=directory, prefix=f".{os.path.basename(path)}.",
+                                     suffix=".tmp", delete=False) as tmp:
+        tmp_path = tmp.name
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
@@ -0,0 +1,23 @@
+"""NSE session hours and the IST conversions shared by brokers, caches and services"""
+from datetime import datetime, time, timedelta, timezone
+
+IST = timezone(timedelta(hours=5, minutes=30))
+SESSION_OPEN = time(9, 15)
+SESSION_CLOSE = time(15, 30)
+
+# Bar lengths in minutes; every bar is aligned to the 9:15 session open
+INTERVALS = {'1m': 1, '5m': 5, '15m': 15, '1h': 60}
+
+
+def to_ist(ts: datetime, naive_tz=IST) -> datetime:
+    """Naive IST datetime for a tick timestamp (naive input is taken to be in ``naive_tz``)"""
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=naive_tz)
+    return ts.astimezone(IST).replace(tzinfo=None)
+
+
+def ist_aware(ts: datetime) -> datetime:
+    """Timezone-aware IST datetime (naive input is taken to be IST, as broker bars are)"""
+    if ts.tzinfo is None:
+        return ts.replace(tzinfo=IST)
+    return ts.astimezone(IST)
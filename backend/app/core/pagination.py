@@ -0,0 +1,33 @@
+"""Keyset (cursor) pagination for newest-first listings"""
+from typing import List, Optional
+
+from fastapi import Response
+from sqlalchemy import and_, or_, select
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+MAX_PAGE_SIZE = 500
+
+def keyset_page(stmt, id_col, cursor: Optional[int], limit: int, sort_col=None):
+    """
+    Order ``stmt`` newest first by (sort_col, id_col) and start after the
+    row whose id is ``cursor``. The cursor row's sort value is read in a
+    subquery, so pages never compare against a re-serialized timestamp and
+    each page is one range scan of the (owner, sort_col, id) index.
+    Fetches one extra row to tell whether another page exists.
+    """
+    if cursor is not None:
+        if sort_col is None:
+            stmt = stmt.where(id_col < cursor)
+        else:
+            anchor = select(sort_col).where(id_col == cursor).scalar_subquery()
+            stmt = stmt.where(or_(sort_col < anchor, and_(sort_col == anchor, id_col < cursor)))
+    order = [id_col.desc()] if sort_col is None else [sort_col.desc(), id_col.desc()]
+    return stmt.order_by(*order).limit(limit + 1)
+
+def with_next_cursor(rows: List, limit: int, response: Response) -> List:
+    """Trim the look-ahead row and advertise the next cursor in a response header"""
+    rows = list(rows)
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = str(rows[-1].id)
+    return rows
@@ -0,0 +1,234 @@
+"""Short-lived cache of verified access tokens and the users they belong to"""
+import hashlib
+import json
+import logging
+import queue
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+
+from pydantic import BaseModel
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from app.core.config import settings
+from app.models.user import User, UserRole
+
+logger = logging.getLogger(__name__)
+
+
+class Principal(BaseModel):
+    """
+    The authenticated user as handed to request handlers (get_current_user).
+
+    A plain read-only value, not an ORM object: it is not attached to any
+    session, carries no password hash and cannot be used to lazy-load or
+    write the user. Handlers that need to change the user load the row.
+    """
+    id: int
+    email: str
+    name: str
+    role: Optional[UserRole] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+        frozen = True
+
+
+def snapshot(user) -> Dict:
+    """JSON-safe copy of a User's (or Principal's) public columns"""
+    return Principal.model_validate(user).model_dump(mode="json")
+
+
+def from_snapshot(data: Dict) -> Principal:
+    return Principal(**data)
+
+
+class UserCache:
+    """
+    token -> user id and user id -> user snapshot, each kept ``ttl`` seconds
+    (tokens never beyond their own expiry).
+
+    In-process by default; with REDIS_URL set the entries live in Redis so
+    every worker shares them and sees invalidations. Users changed through
+    an ORM session are invalidated once the session commits (see the
+    listeners below), so a role change applies on the next request instead
+    of after the TTL. Redis deletes are queued to a background thread, never
+    run inside the commit. Changes made outside ORM sessions (raw SQL, Core
+    ``connection.execute``) must call ``invalidate`` or ``clear`` themselves.
+    """
+
+    def __init__(self, ttl: float = None, max_entries: int = None, redis_url: str = None):
+        self.ttl = settings.AUTH_CACHE_TTL if ttl is None else ttl
+        self.max_entries = max_entries or settings.AUTH_CACHE_MAX_ENTRIES
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._redis = None
+        self._redis_sync = None
+        self._invalidations: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._invalidator: Optional[threading.Thread] = None
+        redis_url = settings.REDIS_URL if redis_url is None else redis_url
+        if redis_url and self.ttl > 0:
+            try:
+                import redis
+                import redis.asyncio
+                self._redis = redis.asyncio.from_url(redis_url)
+                self._redis_sync = redis.from_url(redis_url)  # Used by the invalidation thread only
+            except ImportError:
+                logger.warning("redis is not installed; caching users in process")
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    @staticmethod
+    def _token_key(token: str) -> str:
+        # Hashed so raw tokens are never stored
+        return "auth:token:" + hashlib.sha256(token.encode()).hexdigest()
+
+    @staticmethod
+    def _user_key(user_id) -> str:
+        return f"auth:user:{user_id}"
+
+    # Backend
+
+    async def _get(self, key: str):
+        if self._redis is not None:
+            try:
+                value = await self._redis.get(key)
+                return json.loads(value) if value is not None else None
+            except Exception as e:
+                logger.warning(f"Auth cache read failed: {e}")
+                return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    async def _set(self, key: str, value, ttl: float):
+        if ttl <= 0:
+            return
+        if self._redis is not None:
+            try:
+                await self._redis.set(key, json.dumps(value), px=int(ttl * 1000))
+            except Exception as e:
+                logger.warning(f"Auth cache write failed: {e}")
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    # API
+
+    async def token_user_id(self, token: str) -> Optional[str]:
+        """User id of an already verified token"""
+        if not self.enabled:
+            return None
+        return await self._get(self._token_key(token))
+
+    async def put_token(self, token: str, user_id, expires_at: Optional[float] = None):
+        """Remember a verified token until min(ttl, its ``exp``)"""
+        if not self.enabled:
+            return
+        ttl = self.ttl if expires_at is None else min(self.ttl, expires_at - time.time())
+        await self._set(self._token_key(token), user_id, ttl)
+
+    async def get_user(self, user_id) -> Optional[Principal]:
+        if not self.enabled:
+            return None
+        data = await self._get(self._user_key(user_id))
+        return from_snapshot(data) if data is not None else None
+
+    async def put_user(self, user) -> Principal:
+        """Cache a User row; returns the Principal handlers get"""
+        data = snapshot(user)
+        if self.enabled:
+            await self._set(self._user_key(user.id), data, self.ttl)
+        return from_snapshot(data)
+
+    def invalidate(self, user_ids: Iterable = None):
+        """
+        Drop cached users (every user when ``user_ids`` is None). Safe to call
+        from ORM events: Redis deletes are queued, not run on the caller
+        """
+        if self._redis_sync is not None:
+            self._invalidations.put(None if user_ids is None else [self._user_key(u) for u in user_ids])
+            self._start_invalidator()
+            return
+        with self._lock:
+            if user_ids is None:
+                for key in [k for k in self._entries if k.startswith("auth:user:")]:
+                    del self._entries[key]
+            else:
+                for user_id in user_ids:
+                    self._entries.pop(self._user_key(user_id), None)
+
+    def _start_invalidator(self):
+        with self._lock:
+            if self._invalidator is None or not self._invalidator.is_alive():
+                self._invalidator = threading.Thread(target=self._run_invalidator, name="auth-cache-invalidator",
+                                                     daemon=True)
+                self._invalidator.start()
+
+    def _run_invalidator(self):
+        while True:
+            keys = self._invalidations.get()
+            try:
+                if keys is None:
+                    keys = list(self._redis_sync.scan_iter(match="auth:user:*"))
+                if keys:
+                    self._redis_sync.delete(*keys)
+            except Exception as e:
+                logger.warning(f"Auth cache invalidation failed: {e}")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+user_cache = UserCache()
+
+
+# Invalidation: flushes record which users changed, the commit hands them to the cache
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _user_changed(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("changed_users", set()).add(target.id)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _bulk_user_change(orm_execute_state):
+    # update(User) / delete(User) statements skip the mapper events and name no rows
+    if (orm_execute_state.is_update or orm_execute_state.is_delete) and any(
+        mapper.class_ is User for mapper in orm_execute_state.all_mappers
+    ):
+        orm_execute_state.session.info["all_users_changed"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_users(session):
+    changed = session.info.pop("changed_users", None)
+    if session.info.pop("all_users_changed", False):
+        user_cache.invalidate()
+    elif changed:
+        user_cache.invalidate(changed)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back_users(session):
+    session.info.pop("changed_users", None)
+    session.info.pop("all_users_changed", None)
@@ -1,3 +1,4 @@
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.v1 import auth, market, orders, positions, strategies, trading, wallet_v2, oauth
@@ -15,6 +16,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],  # Keyset pagination cursor for list endpoints
 )
 
 # Include routers
@@ -27,13 +29,35 @@ app.include_router(strategies.router, prefix="/api/v1/strategies", tags=["strate
 app.include_router(trading.router, prefix="/api/v1/trading", tags=["trading"])
 app.include_router(wallet_v2.router, prefix="/api/v1/wallet", tags=["wallet"])
 
+@app.on_event("startup")
+async def startup():
+    from app.services.order_writer import order_writer
+    from app.brokers.factory import broker_pool
+    order_writer.start()  # Replays order writes a crash left in the journal
+    broker_pool.start_monitor()  # Broker health for /health, checked off the request path
+
+@app.on_event("shutdown")
+async def shutdown():
+    from app.services.trading_engine import TradingEngine
+    from app.brokers.base import BaseBroker
+    from app.core.database import dispose_async_engine
+    from app.services.order_writer import order_writer
+    from app.brokers.factory import broker_pool
+    await broker_pool.stop_monitor()
+    TradingEngine().shutdown()
+    BaseBroker.shutdown_executors()
+    await asyncio.to_thread(order_writer.close, 10)  # Commit queued order writes
+    await dispose_async_engine()
+
 @app.get("/")
 async def root():
     return {"status": "ok", "mode": settings.BROKER_MODE, "version": "2.0.0"}
 
 @app.get("/health")
 async def health():
-    return {"status": "healthy"}
+    """Liveness plus the last background broker check (never calls a broker)"""
+    from app.brokers.factory import broker_pool
+    return {"status": "healthy", "brokers": broker_pool.report, "brokers_checked_at": broker_pool.checked_at}
 
 @app.get("/api/v1/indices")
 async def get_indices():
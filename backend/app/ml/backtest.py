@@ -13,10 +13,10 @@ class Backtester:
         self.capital = initial_capital
         self.position = 0
         self.trades = []
-        self.equity_curve = []
+        self.equity_curve = pd.Series(dtype=float, name='equity')  # Equity after each bar of the last run
     
     def calculate_costs(self, price: float, qty: int) -> float:
-        """Calculate transaction costs"""
+        """Calculate transaction costs (also accepts NumPy arrays)"""
         notional = price * qty
         comm = notional * self.commission
         slip = notional * self.slippage
@@ -55,29 +55,110 @@ class Backtester:
                 'pnl': pnl
             })
     
-    def run(self, df: pd.DataFrame, signals: pd.Series) -> Dict:
-        """Run backtest"""
+    def run(self, df: pd.DataFrame, signals: pd.Series, qty: int = 1) -> Dict:
+        """
+        Run backtest on NumPy arrays.
+        
+        Produces the same trades, equity and metrics as run_event_driven:
+        a buy signal opens a position when flat, a sell signal closes it when
+        long, so the position after each bar only depends on the most recent
+        buy/sell signal. Cash flows are accumulated in bar order, so capital
+        matches the event loop to the last bit.
+        """
+        close = df['close'].to_numpy(dtype=float)
+        sig = signals.loc[df.index].to_numpy()
+        return self.run_arrays(close, sig, df.index, qty)
+    
+    def run_arrays(self, close: np.ndarray, sig: np.ndarray, index: pd.Index, qty: int = 1) -> Dict:
+        """Run backtest on aligned close-price and signal arrays (see run)"""
+        n = len(close)
+        
+        # Long/flat state after each bar: forward-fill the last buy (1) / sell (0) signal
+        state = np.where(sig == 1, 1, np.where(sig == -1, 0, -1))
+        last = np.maximum.accumulate(np.where(state >= 0, np.arange(n), -1))
+        start_qty = self.position
+        long = np.where(last >= 0, state[np.maximum(last, 0)] == 1, start_qty > 0)
+        position = np.where(last >= 0, np.where(long, qty, 0), start_qty)
+        
+        prev_position = np.concatenate(([start_qty], position[:-1]))
+        buys = (position > 0) & (prev_position == 0)
+        sells = (position == 0) & (prev_position > 0)
+        
+        # Cash flow per bar, applied on top of the running capital in order
+        flows = np.zeros(n)
+        buy_costs = self.calculate_costs(close[buys], qty)
+        flows[buys] = -(close[buys] * qty + buy_costs)
+        sell_qty = prev_position[sells]
+        sell_costs = self.calculate_costs(close[sells], sell_qty)
+        flows[sells] = close[sells] * sell_qty - sell_costs
+        capital = np.cumsum(np.concatenate(([self.capital], flows)))[1:]
+        
+        equity = capital + np.where(position > 0, position * close, 0)
+        
+        # Entry price for every sell is the close of the preceding buy
+        entry_idx = np.maximum.accumulate(np.where(buys, np.arange(n), -1))
+        carried_entry = self.trades[-1]['price'] if start_qty > 0 else np.nan
+        entry_price = np.where(entry_idx >= 0, close[np.maximum(entry_idx, 0)], carried_entry)
+        sell_pnl = (close[sells] - entry_price[sells]) * sell_qty - sell_costs
+        
+        buy_iter = iter(buy_costs)
+        sell_iter = iter(zip(sell_costs, sell_pnl))
+        trade_idx = np.flatnonzero(buys | sells)
+        for i, timestamp in zip(trade_idx, index[trade_idx]):
+            if buys[i]:
+                self.trades.append({
+                    'timestamp': timestamp,
+                    'action': 'BUY',
+                    'price': close[i],
+                    'qty': qty,
+                    'cost': next(buy_iter)
+                })
+            else:
+                cost, pnl = next(sell_iter)
+                self.trades.append({
+                    'timestamp': timestamp,
+                    'action': 'SELL',
+                    'price': close[i],
+                    'qty': 0,
+                    'cost': cost,
+                    'pnl': pnl
+                })
+        
+        self.capital = capital[-1]
+        self.position = int(position[-1])
+        self.equity_curve = pd.Series(equity, index=index, name='equity')
+        
+        return self._results(equity)
+    
+    def run_event_driven(self, df: pd.DataFrame, signals: pd.Series) -> Dict:
+        """Run backtest bar by bar (reference implementation for run)"""
+        curve = []
         for idx, row in df.iterrows():
             signal = signals.loc[idx]
             self.execute_trade(idx, row['close'], signal, qty=1)
             
             # Track equity
-            equity = self.capital + (self.position * row['close'] if self.position > 0 else 0)
-            self.equity_curve.append({'timestamp': idx, 'equity': equity})
+            curve.append(self.capital + (self.position * row['close'] if self.position > 0 else 0))
         
-        # Calculate metrics
-        equity_df = pd.DataFrame(self.equity_curve).set_index('timestamp')
-        returns = equity_df['equity'].pct_change().dropna()
+        equity = np.array(curve, dtype=float)
+        self.equity_curve = pd.Series(equity, index=df.index, name='equity')
+        return self._results(equity)
+    
+    def _results(self, equity: np.ndarray) -> Dict:
+        """Calculate metrics from the equity curve"""
+        returns = equity[1:] / equity[:-1] - 1
+        returns = returns[~np.isnan(returns)]
+        std = returns.std(ddof=1) if len(returns) > 1 else 0
         
-        total_return = (equity_df['equity'].iloc[-1] / self.initial_capital - 1) * 100
-        sharpe = returns.mean() / returns.std() * np.sqrt(252) if returns.std() > 0 else 0
-        max_dd = (equity_df['equity'] / equity_df['equity'].cummax() - 1).min() * 100
+        total_return = (equity[-1] / self.initial_capital - 1) * 100
+        sharpe = returns.mean() / std * np.sqrt(252) if std > 0 else 0
+        max_dd = (equity / np.maximum.accumulate(equity) - 1).min() * 100
         
         return {
             'total_return': total_return,
             'sharpe_ratio': sharpe,
             'max_drawdown': max_dd,
             'num_trades': len(self.trades),
-            'final_equity': equity_df['equity'].iloc[-1],
+            'final_equity': equity[-1],
             'trades': self.trades
         }
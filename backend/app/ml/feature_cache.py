@@ -0,0 +1,92 @@
+"""Content-addressed cache of engineered feature matrices"""
+import hashlib
+import json
+import os
+from typing import Optional
+
+import pandas as pd
+
+from app.core.config import settings
+from app.core.files import atomic_write
+from app.ml.features import FeatureEngine
+
+
+class FeatureCache:
+    """
+    Parquet files of FeatureEngine.prepare_features output, keyed by a hash
+    of the input OHLCV frame (values, index and column names) and the
+    indicator configuration. Any change to the data or to the pipeline
+    produces a new key, so entries never need invalidating; the least
+    recently used files beyond ``max_entries`` are removed.
+    """
+
+    def __init__(self, cache_dir: str = None, max_entries: int = None):
+        self.cache_dir = cache_dir or settings.FEATURE_CACHE_DIR
+        self.max_entries = max_entries or settings.FEATURE_CACHE_MAX_ENTRIES
+
+    @staticmethod
+    def config_fingerprint() -> str:
+        try:
+            import pandas_ta
+            ta_version = getattr(pandas_ta, 'version', None)
+        except ImportError:
+            ta_version = None
+        config = {
+            'version': FeatureEngine.VERSION,
+            'config': FeatureEngine.CONFIG,
+            'backend': settings.INDICATOR_BACKEND,
+            'pandas_ta': ta_version
+        }
+        return json.dumps(config, sort_keys=True, default=str)
+
+    @classmethod
+    def key(cls, df: pd.DataFrame) -> str:
+        """Fingerprint of the input frame plus the indicator configuration"""
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(cls.config_fingerprint().encode())
+        digest.update(json.dumps([str(c) for c in df.columns]).encode())
+        digest.update(json.dumps([str(t) for t in df.dtypes]).encode())
+        digest.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+        return digest.hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.parquet")
+
+    def load(self, key: str) -> Optional[pd.DataFrame]:
+        path = self.path(key)
+        if not os.path.exists(path):
+            return None
+        os.utime(path)  # Mark as recently used
+        return pd.read_parquet(path)
+
+    def save(self, key: str, features: pd.DataFrame):
+        with atomic_write(self.path(key)) as tmp_path:
+            features.to_parquet(tmp_path)
+        self._prune()
+
+    def prepare(self, df: pd.DataFrame) -> pd.DataFrame:
+        """prepare_features(df), served from the cache when this exact input was seen before"""
+        key = self.key(df)
+        features = self.load(key)
+        if features is None:
+            features = FeatureEngine.prepare_features(df)
+            self.save(key, features)
+        return features
+
+    def _prune(self):
+        entries = [
+            os.path.join(self.cache_dir, name)
+            for name in os.listdir(self.cache_dir) if name.endswith('.parquet')
+        ]
+        if len(entries) <= self.max_entries:
+            return
+        entries.sort(key=os.path.getmtime)
+        for path in entries[:len(entries) - self.max_entries]:
+            os.remove(path)
+
+
+def prepare_features(df: pd.DataFrame) -> pd.DataFrame:
+    """FeatureEngine.prepare_features through the cache (if FEATURE_CACHE_ENABLED)"""
+    if not settings.FEATURE_CACHE_ENABLED:
+        return FeatureEngine.prepare_features(df)
+    return FeatureCache().prepare(df)
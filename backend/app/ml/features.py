@@ -1,164 +1,235 @@
 import pandas as pd
 import numpy as np
-import pandas_ta as ta
+from typing import Dict
+from app.core.config import settings
 
 class FeatureEngine:
     """Feature engineering for ML models"""
     
+    # Indicator configuration of the pipeline below. It is part of the feature
+    # cache key, so bump VERSION whenever the feature definitions change.
+    VERSION = 1
+    CONFIG = {
+        'sma': [20, 50],
+        'ema': [9, 21],
+        'macd': [12, 26, 9],
+        'adx': 14,
+        'rsi': 14,
+        'stoch': [14, 3, 3],
+        'cci': 20,
+        'bbands': [20, 2],
+        'atr': 14,
+        'supertrend': [7, 3],
+        'lags': [1, 5, 15],
+        'label_horizon': 5,
+        'label_threshold': 0.0015
+    }
+    
     @staticmethod
-    def add_technical_indicators(df: pd.DataFrame) -> pd.DataFrame:
-        df = df.copy()
+    def indicator_columns(df: pd.DataFrame, backend: str = None) -> Dict[str, pd.Series]:
+        """
+        Technical indicator columns for an OHLCV frame, in output order (df is not modified).
+        
+        ``backend`` is "pandas_ta" or "numpy" (app.ml.indicators); defaults to
+        settings.INDICATOR_BACKEND.
+        """
+        backend = backend or settings.INDICATOR_BACKEND
+        if backend == "numpy":
+            from app.ml import indicators
+            return indicators.indicator_columns(df)
+        if backend != "pandas_ta":
+            raise ValueError(f"Unknown indicator backend: {backend}")
         
         # Ensure pandas-ta is available
         try:
             import pandas_ta as ta
         except ImportError:
             raise ImportError("pandas-ta is required. pip install pandas-ta")
-
+        
+        cols = {}
+        
+        def add_frame(frame):
+            if frame is not None:
+                for name in frame.columns:
+                    cols[name] = frame[name]
+        
         # 1. Trend Indicators
-        df['sma_20'] = df.ta.sma(length=20)
-        df['sma_50'] = df.ta.sma(length=50)
-        df['ema_9'] = df.ta.ema(length=9)
-        df['ema_21'] = df.ta.ema(length=21)
+        cols['sma_20'] = df.ta.sma(length=20)
+        cols['sma_50'] = df.ta.sma(length=50)
+        cols['ema_9'] = df.ta.ema(length=9)
+        cols['ema_21'] = df.ta.ema(length=21)
         
         # MACD
-        macd = df.ta.macd(fast=12, slow=26, signal=9)
-        if macd is not None:
-            df = pd.concat([df, macd], axis=1)
+        add_frame(df.ta.macd(fast=12, slow=26, signal=9))
             
         # ADX (Trend Strength)
-        adx = df.ta.adx(length=14)
-        if adx is not None:
-            df = pd.concat([df, adx], axis=1)
-
+        add_frame(df.ta.adx(length=14))
+        
         # 2. Momentum Indicators
-        df['rsi'] = df.ta.rsi(length=14)
-        df['stoch_k'] = df.ta.stoch(k=14, d=3, smooth_k=3)['STOCHk_14_3_3']
-        df['stoch_d'] = df.ta.stoch(k=14, d=3, smooth_k=3)['STOCHd_14_3_3']
+        cols['rsi'] = df.ta.rsi(length=14)
+        stoch = df.ta.stoch(k=14, d=3, smooth_k=3)
+        cols['stoch_k'] = stoch['STOCHk_14_3_3']
+        cols['stoch_d'] = stoch['STOCHd_14_3_3']
         
         # CCI (Commodity Channel Index)
-        df['cci'] = df.ta.cci(length=20)
-
+        cols['cci'] = df.ta.cci(length=20)
+        
         # 3. Volatility Indicators
         # Bollinger Bands
-        bbands = df.ta.bbands(length=20, std=2)
-        if bbands is not None:
-            df = pd.concat([df, bbands], axis=1)
+        add_frame(df.ta.bbands(length=20, std=2))
             
         # ATR (Average True Range)
-        df['atr'] = df.ta.atr(length=14)
+        cols['atr'] = df.ta.atr(length=14)
         
         # 4. Volume Indicators
         # VWAP (Volume Weighted Average Price) - Requires 'volume'
         if 'volume' in df.columns:
             # VWAP requires datetime index
-            df.ta.vwap(append=True)
+            vwap = df.ta.vwap()
+            cols[vwap.name] = vwap
             
             # OBV (On Balance Volume)
-            df['obv'] = df.ta.obv()
-
+            cols['obv'] = df.ta.obv()
+        
         # 5. Custom Features
         # Distance from SMA
-        df['dist_sma20'] = (df['close'] - df['sma_20']) / df['sma_20']
+        cols['dist_sma20'] = (df['close'] - cols['sma_20']) / cols['sma_20']
         
         # RSI Divergence (Simplified: RSI slope vs Price slope)
-        df['rsi_slope'] = df['rsi'].diff(3)
-        df['price_slope'] = df['close'].diff(3)
+        cols['rsi_slope'] = cols['rsi'].diff(3)
+        cols['price_slope'] = df['close'].diff(3)
         
         # Supertrend
-        supertrend = df.ta.supertrend(length=7, multiplier=3)
-        if supertrend is not None:
-            df = pd.concat([df, supertrend], axis=1)
-
-        return df
-
+        add_frame(df.ta.supertrend(length=7, multiplier=3))
+        
+        return cols
+    
+    @staticmethod
+    def lag_columns(close: pd.Series, lags=[1, 5, 15]) -> Dict[str, pd.Series]:
+        """Return and lagged return columns"""
+        returns = close.pct_change()
+        cols = {'returns': returns}
+        for lag in lags:
+            cols[f'return_lag_{lag}'] = returns.shift(lag)
+        return cols
+    
+    @staticmethod
+    def time_columns(index: pd.Index) -> Dict[str, np.ndarray]:
+        """Time-of-day / session columns (zeros without a DatetimeIndex)"""
+        if not isinstance(index, pd.DatetimeIndex):
+            # Fallback if no datetime info
+            zeros = np.zeros(len(index), dtype=np.int64)
+            return {name: zeros for name in ['hour', 'minute', 'day_of_week', 'is_opening', 'is_closing']}
+        
+        hour = index.hour.to_numpy()
+        minute = index.minute.to_numpy()
+        return {
+            'hour': hour,
+            'minute': minute,
+            'day_of_week': index.dayofweek.to_numpy(),
+            # Market session (Indian market: 9:15 AM - 3:30 PM)
+            'is_opening': ((hour == 9) & (minute < 30)).astype(int),
+            'is_closing': ((hour == 15) & (minute > 0)).astype(int)
+        }
+    
+    @staticmethod
+    def label_columns(close: pd.Series, horizon=5, threshold=0.0015) -> Dict[str, pd.Series]:
+        """Label columns for classification/regression"""
+        # Future return (5 candles ahead)
+        future_return = close.pct_change(horizon).shift(-horizon)
+        return {
+            'future_return': future_return,
+            # Binary label: 1 if return > threshold, 0 otherwise
+            'label_binary': (future_return > threshold).astype(int),
+            # Regression label
+            'label_regression': future_return
+        }
+    
+    @staticmethod
+    def add_technical_indicators(df: pd.DataFrame) -> pd.DataFrame:
+        df = df.copy()
+        cols = FeatureEngine.indicator_columns(df)
+        # Existing columns with the same name are overwritten in place, as with df[col] = ...
+        for name in [c for c in cols if c in df.columns]:
+            df[name] = cols.pop(name)
+        return pd.concat([df, pd.DataFrame(cols, index=df.index)], axis=1)
+    
     @staticmethod
     def add_lag_features(df: pd.DataFrame, lags=[1, 5, 15]) -> pd.DataFrame:
         """Add lagged return features"""
-        df = df.copy()
-        df['returns'] = df['close'].pct_change()
-        
-        for lag in lags:
-            df[f'return_lag_{lag}'] = df['returns'].shift(lag)
-        
-        return df
+        return df.assign(**FeatureEngine.lag_columns(df['close'], lags))
     
     @staticmethod
     def add_time_features(df: pd.DataFrame) -> pd.DataFrame:
         """Add time-based features"""
-        df = df.copy()
-        
-        # Ensure index is datetime
-        if not isinstance(df.index, pd.DatetimeIndex):
-            if 'timestamp' in df.columns:
-                df.set_index('timestamp', inplace=True)
-            elif 'date' in df.columns:
-                df.set_index('date', inplace=True)
-        
-        if isinstance(df.index, pd.DatetimeIndex):
-            df['hour'] = df.index.hour
-            df['minute'] = df.index.minute
-            df['day_of_week'] = df.index.dayofweek
-            
-            # Market session (Indian market: 9:15 AM - 3:30 PM)
-            df['is_opening'] = ((df['hour'] == 9) & (df['minute'] < 30)).astype(int)
-            df['is_closing'] = ((df['hour'] == 15) & (df['minute'] > 0)).astype(int)
-        else:
-            # Fallback if no datetime info
-            df['hour'] = 0
-            df['minute'] = 0
-            df['day_of_week'] = 0
-            df['is_opening'] = 0
-            df['is_closing'] = 0
-        
-        return df
+        df = FeatureEngine._with_datetime_index(df)
+        return df.assign(**FeatureEngine.time_columns(df.index))
     
     @staticmethod
     def create_labels(df: pd.DataFrame, horizon=5, threshold=0.0015) -> pd.DataFrame:
         """Create labels for classification/regression"""
-        df = df.copy()
-        
-        # Future return (5 candles ahead)
-        df['future_return'] = df['close'].pct_change(horizon).shift(-horizon)
-        
-        # Binary label: 1 if return > threshold, 0 otherwise
-        df['label_binary'] = (df['future_return'] > threshold).astype(int)
-        
-        # Regression label
-        df['label_regression'] = df['future_return']
-        
-        return df
+        return df.assign(**FeatureEngine.label_columns(df['close'], horizon, threshold))
     
     @staticmethod
-    def prepare_features(df: pd.DataFrame) -> pd.DataFrame:
-        """Full feature pipeline"""
-        df = df.copy()
-        
-        # Ensure index is datetime for technical indicators (VWAP needs it)
+    def _with_datetime_index(df: pd.DataFrame) -> pd.DataFrame:
+        """Use the timestamp/date column as index (VWAP and time features need it)"""
         if not isinstance(df.index, pd.DatetimeIndex):
             if 'timestamp' in df.columns:
-                df.set_index('timestamp', inplace=True)
+                return df.set_index('timestamp')
             elif 'date' in df.columns:
-                df.set_index('date', inplace=True)
-
-        df = FeatureEngine.add_technical_indicators(df)
-        df = FeatureEngine.add_lag_features(df)
-        df = FeatureEngine.add_time_features(df)
-        df = FeatureEngine.create_labels(df)
-        
-        # Drop NaN rows
-        
-        # Check if any column is all NaN
-        all_nan_cols = df.columns[df.isnull().all()].tolist()
-        if all_nan_cols:
-            # print(f"WARNING: Columns with all NaN: {all_nan_cols}")
-            df = df.drop(columns=all_nan_cols)
-            
-        # Drop sparse columns from Supertrend if they exist (contain 'SUPERTl' or 'SUPERTs')
-        sparse_cols = [c for c in df.columns if 'SUPERTl' in c or 'SUPERTs' in c]
-        if sparse_cols:
-            df = df.drop(columns=sparse_cols)
-            
-        df = df.dropna()
-        
+                return df.set_index('date')
         return df
+    
+    @staticmethod
+    def prepare_features(df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Full feature pipeline.
+        
+        Every feature column is computed once from the OHLCV frame into a
+        column store; columns that are entirely NaN or sparse Supertrend
+        bands are skipped, rows with any NaN are masked out, and the
+        DataFrame is assembled a single time at the end. The output is the
+        same as chaining the add_* steps and dropping NaN rows.
+        """
+        # Ensure index is datetime for technical indicators (VWAP needs it)
+        base = FeatureEngine._with_datetime_index(df)
+        
+        store = {name: base[name] for name in base.columns}
+        store.update(FeatureEngine.indicator_columns(base))
+        store.update(FeatureEngine.lag_columns(base['close']))
+        store.update(FeatureEngine.time_columns(base.index))
+        store.update(FeatureEngine.label_columns(base['close']))
+        
+        columns = {}
+        keep = np.ones(len(base), dtype=bool)
+        for name in list(store):
+            values = store.pop(name)
+            # Drop sparse columns from Supertrend (contain 'SUPERTl' or 'SUPERTs')
+            if 'SUPERTl' in name or 'SUPERTs' in name:
+                continue
+            if isinstance(values, pd.Series):
+                # Some indicators (Stoch) start at their first valid value
+                if not values.index.equals(base.index):
+                    values = values.reindex(base.index)
+                # Keep extension dtypes (e.g. nullable ints); plain columns become NumPy arrays
+                values = values.array if isinstance(values.dtype, pd.api.extensions.ExtensionDtype) else values.to_numpy()
+            missing = pd.isna(values)
+            # Drop columns that are all NaN
+            if missing.all():
+                continue
+            keep &= ~missing
+            columns[name] = values
+        
+        # Drop NaN rows while filling one preallocated float block, which
+        # pandas keeps as-is; other dtypes are inserted as separate columns
+        order = list(columns)
+        float_cols = [name for name in order if columns[name].dtype == np.float64]
+        block = np.empty((len(float_cols), int(keep.sum())))
+        for i, name in enumerate(float_cols):
+            block[i] = columns.pop(name)[keep]
+        
+        out = pd.DataFrame(block.T, columns=float_cols, index=base.index[keep], copy=False)
+        for loc, name in enumerate(order):
+            if name in columns:
+                out.insert(loc, name, columns.pop(name)[keep])
+        return out
@@ -0,0 +1,396 @@
+"""Incremental (streaming) version of FeatureEngine.prepare_features"""
+import math
+from collections import deque
+from sys import float_info
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+NAN = float('nan')
+EPSILON = float_info.epsilon
+
+
+def _isnan(x) -> bool:
+    return x != x
+
+
+def _div(a: float, b: float) -> float:
+    """Float division with pandas semantics (x/0 -> inf, 0/0 -> NaN)"""
+    if b == 0:
+        return NAN if a == 0 or _isnan(a) else math.copysign(math.inf, a)
+    return a / b
+
+
+def _non_zero(diff: float) -> float:
+    """Mirror pandas-ta non_zero_range: avoid dividing by an exact zero range"""
+    return diff + EPSILON if diff == 0 else diff
+
+
+class _EWM:
+    """One step of pandas ``Series.ewm(...).mean()`` (ignore_na=False)"""
+
+    def __init__(self, alpha: float, adjust: bool = True, min_periods: int = 0):
+        self.old_wt_factor = 1.0 - alpha
+        self.new_wt = 1.0 if adjust else alpha
+        self.adjust = adjust
+        self.min_periods = max(min_periods, 1)
+        self.weighted = NAN
+        self.old_wt = 1.0
+        self.nobs = 0
+
+    def update(self, x: float) -> float:
+        is_obs = not _isnan(x)
+        self.nobs += is_obs
+        if not _isnan(self.weighted):
+            self.old_wt *= self.old_wt_factor
+            if is_obs:
+                if self.weighted != x:
+                    self.weighted = (self.old_wt * self.weighted + self.new_wt * x) / (self.old_wt + self.new_wt)
+                self.old_wt = self.old_wt + self.new_wt if self.adjust else 1.0
+        elif is_obs:
+            self.weighted = x
+        return self.weighted if self.nobs >= self.min_periods else NAN
+
+
+class _RMA(_EWM):
+    """Wilder's moving average as computed by pandas-ta (adjusted ewm, min_periods=length)"""
+
+    def __init__(self, length: int):
+        super().__init__(alpha=1.0 / length, adjust=True, min_periods=length)
+
+
+class _EMA:
+    """SMA-seeded EMA as computed by pandas-ta; leading NaN inputs are skipped"""
+
+    def __init__(self, length: int):
+        self.length = length
+        self.seed = []
+        self.ewm = _EWM(alpha=2.0 / (length + 1), adjust=False)
+
+    def update(self, x: float) -> float:
+        if self.seed is not None:
+            if _isnan(x) and not self.seed:
+                return NAN
+            self.seed.append(x)
+            if len(self.seed) < self.length:
+                return NAN
+            x = sum(self.seed) / self.length
+            self.seed = None
+        return self.ewm.update(x)
+
+
+class _Window:
+    """Fixed-length rolling window with a running sum"""
+
+    def __init__(self, length: int):
+        self.length = length
+        self.values = deque(maxlen=length)
+        self.total = 0.0
+
+    def update(self, x: float):
+        if len(self.values) == self.length:
+            self.total -= self.values[0]
+        self.values.append(x)
+        self.total += x
+
+    @property
+    def full(self) -> bool:
+        return len(self.values) == self.length
+
+    def mean(self) -> float:
+        return self.total / self.length if self.full else NAN
+
+    def std(self) -> float:
+        """Population standard deviation (ddof=0), as used by pandas-ta bbands"""
+        return float(np.std(self.values)) if self.full else NAN
+
+    def mad(self) -> float:
+        """Mean absolute deviation around the window mean"""
+        if not self.full:
+            return NAN
+        arr = np.fromiter(self.values, dtype=float, count=self.length)
+        return float(np.fabs(arr - arr.mean()).mean())
+
+
+class _SMA:
+    """Rolling mean that starts at the first non-NaN input"""
+
+    def __init__(self, length: int):
+        self.window = _Window(length)
+
+    def update(self, x: float) -> float:
+        if _isnan(x) and not self.window.values:
+            return NAN
+        self.window.update(x)
+        return self.window.mean()
+
+
+class _Extreme:
+    """Rolling max (or min) over a fixed window using a monotonic deque"""
+
+    def __init__(self, length: int, is_max: bool):
+        self.length = length
+        self.is_max = is_max
+        self.items = deque()
+        self.count = 0
+
+    def update(self, x: float) -> float:
+        while self.items and (self.items[-1][1] <= x if self.is_max else self.items[-1][1] >= x):
+            self.items.pop()
+        self.items.append((self.count, x))
+        if self.items[0][0] <= self.count - self.length:
+            self.items.popleft()
+        self.count += 1
+        return self.items[0][1] if self.count >= self.length else NAN
+
+
+class _Lag:
+    """Value seen ``n`` updates ago"""
+
+    def __init__(self, n: int):
+        self.values = deque([NAN] * (n + 1), maxlen=n + 1)
+
+    def update(self, x: float) -> float:
+        self.values.append(x)
+        return self.values[0]
+
+
+class IncrementalFeatureEngine:
+    """
+    Stateful counterpart of FeatureEngine.prepare_features.
+
+    Each call to ``update`` consumes one OHLCV bar and returns the feature row
+    for that bar, with the same columns (and column order) that
+    ``prepare_features`` produces for a full frame. Every indicator keeps only
+    its own lookback window, so the cost per bar does not grow with history.
+
+    Label columns describe the future and are always NaN here.
+    """
+
+    LABEL_COLS = ['future_return', 'label_binary', 'label_regression']
+    EXCLUDE_COLS = ['label_binary', 'label_regression', 'future_return', 'returns']
+
+    def __init__(self):
+        self.last_timestamp = None
+        self.bar_count = 0
+        self.columns: Optional[List[str]] = None
+
+        # Trend
+        self._sma_20 = _Window(20)
+        self._sma_50 = _Window(50)
+        self._ema_9 = _EMA(9)
+        self._ema_21 = _EMA(21)
+        self._ema_12 = _EMA(12)
+        self._ema_26 = _EMA(26)
+        self._macd_signal = _EMA(9)
+
+        # True range / ATR (ATR 14 also feeds ADX, ATR 7 feeds Supertrend)
+        self._prev_high = NAN
+        self._prev_low = NAN
+        self._prev_close = NAN
+        self._atr_14 = _RMA(14)
+        self._atr_7 = _RMA(7)
+        self._dm_pos = _RMA(14)
+        self._dm_neg = _RMA(14)
+        self._adx = _RMA(14)
+
+        # Momentum
+        self._rsi_gain = _RMA(14)
+        self._rsi_loss = _RMA(14)
+        self._stoch_low = _Extreme(14, is_max=False)
+        self._stoch_high = _Extreme(14, is_max=True)
+        self._stoch_k = _SMA(3)
+        self._stoch_d = _SMA(3)
+        self._typical = _Window(20)
+
+        # Volatility
+        self._bb = _Window(20)
+
+        # Volume
+        self._vwap_day = None
+        self._vwap_pv = 0.0
+        self._vwap_vol = 0.0
+        self._obv = 0.0
+
+        # Supertrend
+        self._st_dir = 1
+        self._st_upper = NAN
+        self._st_lower = NAN
+
+        # Slopes and lags
+        self._rsi_lag = _Lag(3)
+        self._close_lag = _Lag(3)
+        self._returns_lag = {lag: _Lag(lag) for lag in (1, 5, 15)}
+
+    @classmethod
+    def from_history(cls, df: pd.DataFrame) -> "IncrementalFeatureEngine":
+        """Build an engine warmed up on a DataLoader-style frame"""
+        engine = cls()
+        engine.warm_up(df)
+        return engine
+
+    def warm_up(self, df: pd.DataFrame) -> Optional[Dict]:
+        """Feed every bar of ``df`` in order and return the last feature row"""
+        if 'timestamp' in df.columns:
+            df = df.set_index('timestamp')
+        row = None
+        for values in zip(df.index, *(df[col].to_numpy() for col in df.columns)):
+            bar = dict(zip(df.columns, values[1:]))
+            bar['timestamp'] = values[0]
+            row = self.update(bar)
+        return row
+
+    def update(self, bar: Dict) -> Dict:
+        """Consume one bar (dict with 'timestamp' and OHLCV keys) and return its feature row"""
+        timestamp = pd.Timestamp(bar['timestamp'])
+        if self.last_timestamp is not None and timestamp <= self.last_timestamp:
+            raise ValueError(f"Bar at {timestamp} is not newer than {self.last_timestamp}")
+
+        high = float(bar['high'])
+        low = float(bar['low'])
+        close = float(bar['close'])
+        volume = float(bar['volume']) if 'volume' in bar else None
+        prev_high, prev_low, prev_close = self._prev_high, self._prev_low, self._prev_close
+
+        row = {k: v for k, v in bar.items() if k != 'timestamp'}
+
+        # 1. Trend Indicators
+        self._sma_20.update(close)
+        self._sma_50.update(close)
+        row['sma_20'] = sma_20 = self._sma_20.mean()
+        row['sma_50'] = self._sma_50.mean()
+        row['ema_9'] = self._ema_9.update(close)
+        row['ema_21'] = self._ema_21.update(close)
+
+        macd = self._ema_12.update(close) - self._ema_26.update(close)
+        signal = self._macd_signal.update(macd)
+        row['MACD_12_26_9'] = macd
+        row['MACDh_12_26_9'] = macd - signal
+        row['MACDs_12_26_9'] = signal
+
+        if self.bar_count == 0:
+            true_range = NAN
+        else:
+            true_range = max(abs(_non_zero(high - low)), abs(high - prev_close), abs(prev_close - low))
+        atr_14 = self._atr_14.update(true_range)
+        atr_7 = self._atr_7.update(true_range)
+
+        up = high - prev_high
+        down = prev_low - low
+        pos = up if (up > down and up > 0) else (NAN if _isnan(up) else 0.0)
+        neg = down if (down > up and down > 0) else (NAN if _isnan(down) else 0.0)
+        pos = 0.0 if abs(pos) < EPSILON else pos
+        neg = 0.0 if abs(neg) < EPSILON else neg
+        dmp = _div(100, atr_14) * self._dm_pos.update(pos)
+        dmn = _div(100, atr_14) * self._dm_neg.update(neg)
+        dx = _div(100 * abs(dmp - dmn), dmp + dmn)
+        row['ADX_14'] = self._adx.update(dx)
+        row['DMP_14'] = dmp
+        row['DMN_14'] = dmn
+
+        # 2. Momentum Indicators
+        change = close - prev_close
+        gain = self._rsi_gain.update(change if _isnan(change) else max(change, 0.0))
+        loss = self._rsi_loss.update(change if _isnan(change) else min(change, 0.0))
+        row['rsi'] = rsi = _div(100 * gain, gain + abs(loss))
+
+        lowest = self._stoch_low.update(low)
+        highest = self._stoch_high.update(high)
+        raw_k = _div(100 * (close - lowest), _non_zero(highest - lowest))
+        stoch_k = self._stoch_k.update(raw_k)
+        row['stoch_k'] = stoch_k
+        row['stoch_d'] = self._stoch_d.update(stoch_k)
+
+        typical = (high + low + close) / 3
+        self._typical.update(typical)
+        row['cci'] = _div(typical - self._typical.mean(), 0.015 * self._typical.mad())
+
+        # 3. Volatility Indicators
+        self._bb.update(close)
+        mid = self._bb.mean()
+        deviation = 2.0 * self._bb.std()
+        lower, upper = mid - deviation, mid + deviation
+        band = _non_zero(upper - lower)
+        row['BBL_20_2.0'] = lower
+        row['BBM_20_2.0'] = mid
+        row['BBU_20_2.0'] = upper
+        row['BBB_20_2.0'] = _div(100 * band, mid)
+        row['BBP_20_2.0'] = _div(_non_zero(close - lower), band)
+        row['atr'] = atr_14
+
+        # 4. Volume Indicators
+        if volume is not None:
+            day = timestamp.normalize()
+            if day != self._vwap_day:
+                self._vwap_day, self._vwap_pv, self._vwap_vol = day, 0.0, 0.0
+            self._vwap_pv += typical * volume
+            self._vwap_vol += volume
+            row['VWAP_D'] = _div(self._vwap_pv, self._vwap_vol)
+
+            if self.bar_count == 0 or change > 0:
+                self._obv += volume
+            elif change < 0:
+                self._obv -= volume
+            row['obv'] = self._obv
+
+        # 5. Custom Features
+        row['dist_sma20'] = _div(close - sma_20, sma_20)
+        row['rsi_slope'] = rsi - self._rsi_lag.update(rsi)
+        row['price_slope'] = close - self._close_lag.update(close)
+
+        # Supertrend (7, 3)
+        hl2 = (high + low) / 2
+        upper_band = hl2 + 3.0 * atr_7
+        lower_band = hl2 - 3.0 * atr_7
+        if self.bar_count == 0:
+            row['SUPERT_7_3.0'] = NAN
+        else:
+            if close > self._st_upper:
+                self._st_dir = 1
+            elif close < self._st_lower:
+                self._st_dir = -1
+            else:
+                if self._st_dir > 0 and lower_band < self._st_lower:
+                    lower_band = self._st_lower
+                if self._st_dir < 0 and upper_band > self._st_upper:
+                    upper_band = self._st_upper
+            row['SUPERT_7_3.0'] = lower_band if self._st_dir > 0 else upper_band
+        row['SUPERTd_7_3.0'] = self._st_dir
+        self._st_upper, self._st_lower = upper_band, lower_band
+
+        # Lag features
+        returns = _div(change, prev_close)
+        row['returns'] = returns
+        for lag, tracker in self._returns_lag.items():
+            row[f'return_lag_{lag}'] = tracker.update(returns)
+
+        # Time features
+        row['hour'] = timestamp.hour
+        row['minute'] = timestamp.minute
+        row['day_of_week'] = timestamp.dayofweek
+        row['is_opening'] = int(timestamp.hour == 9 and timestamp.minute < 30)
+        row['is_closing'] = int(timestamp.hour == 15 and timestamp.minute > 0)
+
+        for col in self.LABEL_COLS:
+            row[col] = NAN
+
+        self._prev_high, self._prev_low, self._prev_close = high, low, close
+        self.last_timestamp = timestamp
+        self.bar_count += 1
+        if self.columns is None:
+            self.columns = list(row.keys())
+        return row
+
+    @property
+    def feature_cols(self) -> List[str]:
+        """Model input columns, matching the exclusion list used by ModelTrainer"""
+        return [c for c in (self.columns or []) if c not in self.EXCLUDE_COLS]
+
+    def is_ready(self, row: Dict) -> bool:
+        """True once every model input in ``row`` is warmed up (no NaN)"""
+        return all(not (isinstance(row[c], float) and math.isnan(row[c])) for c in self.feature_cols)
+
+    def to_frame(self, row: Dict) -> pd.DataFrame:
+        """Wrap a feature row as a one-row DataFrame indexed by its timestamp"""
+        return pd.DataFrame([row], index=pd.DatetimeIndex([self.last_timestamp], name='timestamp'))
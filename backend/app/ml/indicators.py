@@ -0,0 +1,268 @@
+"""
+NumPy implementations of the indicators FeatureEngine takes from pandas-ta.
+
+Each function follows the pandas-ta 0.3.14b0 definition (SMA-seeded EMA,
+Wilder RMA, epsilon-padded ranges, ...), so ``indicator_columns`` is a
+drop-in replacement for the pandas-ta backend. Rolling windows use NumPy
+sliding-window views; exponential smoothing uses pandas' compiled ewm so
+the recursions match pandas-ta exactly; the Supertrend loop is compiled
+with Numba when it is installed.
+"""
+from sys import float_info
+from typing import Dict, Tuple
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+EPSILON = float_info.epsilon
+
+
+def _nan(n: int) -> np.ndarray:
+    return np.full(n, np.nan)
+
+
+def _rolling(x: np.ndarray, length: int, func) -> np.ndarray:
+    """``func`` over every full window (NaN for the first length-1 bars or any NaN in the window)"""
+    out = _nan(len(x))
+    if len(x) >= length:
+        out[length - 1:] = func(sliding_window_view(x, length), axis=1)
+    return out
+
+
+def _ewm(x: np.ndarray, **kwargs) -> np.ndarray:
+    return pd.Series(x).ewm(**kwargs).mean().to_numpy()
+
+
+def _shift(x: np.ndarray, n: int = 1) -> np.ndarray:
+    out = _nan(len(x))
+    if n < len(x):
+        out[n:] = x[:-n]
+    return out
+
+
+def _diff(x: np.ndarray, n: int = 1) -> np.ndarray:
+    return x - _shift(x, n)
+
+
+def _first_valid(x: np.ndarray) -> int:
+    valid = np.flatnonzero(~np.isnan(x))
+    return int(valid[0]) if valid.size else len(x)
+
+
+def non_zero_range(high: np.ndarray, low: np.ndarray) -> np.ndarray:
+    """high - low, shifted by epsilon when any bar has a zero range"""
+    diff = high - low
+    if (diff == 0).any():
+        diff = diff + EPSILON
+    return diff
+
+
+def sma(close: np.ndarray, length: int) -> np.ndarray:
+    return _rolling(close, length, np.mean)
+
+
+def ema(close: np.ndarray, length: int) -> np.ndarray:
+    """EMA seeded with the SMA of the first ``length`` bars (from the first valid bar)"""
+    n = len(close)
+    start = _first_valid(close)
+    out = _nan(n)
+    if n - start < length:
+        return out
+    seeded = close[start:].copy()
+    seeded[length - 1] = seeded[:length].mean()
+    seeded[:length - 1] = np.nan
+    out[start:] = _ewm(seeded, span=length, adjust=False)
+    return out
+
+
+def rma(x: np.ndarray, length: int) -> np.ndarray:
+    """Wilder's moving average"""
+    return _ewm(x, alpha=1.0 / length, min_periods=length)
+
+
+def true_range(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    prev_close = _shift(close)
+    tr = np.fmax(np.abs(non_zero_range(high, low)), np.fmax(np.abs(high - prev_close), np.abs(prev_close - low)))
+    tr[:1] = np.nan
+    return tr
+
+
+def atr(high: np.ndarray, low: np.ndarray, close: np.ndarray, length: int = 14) -> np.ndarray:
+    return rma(true_range(high, low, close), length)
+
+
+def macd(close: np.ndarray, fast: int = 12, slow: int = 26, signal: int = 9) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """MACD line, histogram and signal line"""
+    line = ema(close, fast) - ema(close, slow)
+    signal_line = ema(line, signal)
+    return line, line - signal_line, signal_line
+
+
+def adx(high: np.ndarray, low: np.ndarray, close: np.ndarray, length: int = 14) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """ADX, +DI and -DI"""
+    atr_ = atr(high, low, close, length)
+    up = _diff(high)
+    dn = _shift(low) - low
+    pos = ((up > dn) & (up > 0)) * up
+    neg = ((dn > up) & (dn > 0)) * dn
+    pos[np.abs(pos) < EPSILON] = 0
+    neg[np.abs(neg) < EPSILON] = 0
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        k = 100 / atr_
+        dmp = k * rma(pos, length)
+        dmn = k * rma(neg, length)
+        dx = 100 * np.abs(dmp - dmn) / (dmp + dmn)
+    return rma(dx, length), dmp, dmn
+
+
+def rsi(close: np.ndarray, length: int = 14) -> np.ndarray:
+    change = _diff(close)
+    gain = rma(np.where(change < 0, 0, change), length)
+    loss = rma(np.where(change > 0, 0, change), length)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return 100 * gain / (gain + np.abs(loss))
+
+
+def stoch(high: np.ndarray, low: np.ndarray, close: np.ndarray,
+          k: int = 14, d: int = 3, smooth_k: int = 3) -> Tuple[np.ndarray, np.ndarray]:
+    """%K and %D"""
+    lowest = _rolling(low, k, np.min)
+    highest = _rolling(high, k, np.max)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        raw = 100 * (close - lowest) / non_zero_range(highest, lowest)
+    stoch_k = sma(raw, smooth_k)
+    return stoch_k, sma(stoch_k, d)
+
+
+def _mad(windows: np.ndarray, axis: int) -> np.ndarray:
+    return np.abs(windows - windows.mean(axis=axis, keepdims=True)).mean(axis=axis)
+
+
+def cci(high: np.ndarray, low: np.ndarray, close: np.ndarray, length: int = 20) -> np.ndarray:
+    typical = (high + low + close) / 3
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (typical - sma(typical, length)) / (0.015 * _rolling(typical, length, _mad))
+
+
+def bbands(close: np.ndarray, length: int = 20, std: float = 2) -> Tuple[np.ndarray, ...]:
+    """Lower, mid and upper band, bandwidth and %B"""
+    mid = sma(close, length)
+    dev = std * _rolling(close, length, np.std)
+    lower, upper = mid - dev, mid + dev
+    width = non_zero_range(upper, lower)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return lower, mid, upper, 100 * width / mid, non_zero_range(close, lower) / width
+
+
+def vwap(high: np.ndarray, low: np.ndarray, close: np.ndarray, volume: np.ndarray,
+         index: pd.DatetimeIndex) -> np.ndarray:
+    """VWAP anchored to each calendar day"""
+    typical = (high + low + close) / 3
+    weighted = typical * volume
+    days = index.to_period('D').asi8
+    if not (np.diff(days) >= 0).all():
+        # Unsorted bars: fall back to a grouped cumulative sum
+        by_day = pd.Index(days)
+        return (pd.Series(weighted).groupby(by_day).cumsum() / pd.Series(volume).groupby(by_day).cumsum()).to_numpy()
+
+    out = np.empty(len(close))
+    bounds = np.concatenate(([0], np.flatnonzero(np.diff(days)) + 1, [len(days)]))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            out[start:end] = np.cumsum(weighted[start:end]) / np.cumsum(volume[start:end])
+    return out
+
+
+def obv(close: np.ndarray, volume: np.ndarray) -> np.ndarray:
+    """On-balance volume (the first bar counts as an up bar)"""
+    sign = np.sign(_diff(close))
+    sign[:1] = 1
+    return np.cumsum(sign * volume)
+
+
+def _supertrend_loop(close, upper, lower):
+    n = len(close)
+    direction = np.ones(n, dtype=np.int64)
+    trend = np.zeros(n)
+    long = np.full(n, np.nan)
+    short = np.full(n, np.nan)
+    for i in range(1, n):
+        if close[i] > upper[i - 1]:
+            direction[i] = 1
+        elif close[i] < lower[i - 1]:
+            direction[i] = -1
+        else:
+            direction[i] = direction[i - 1]
+            if direction[i] > 0 and lower[i] < lower[i - 1]:
+                lower[i] = lower[i - 1]
+            if direction[i] < 0 and upper[i] > upper[i - 1]:
+                upper[i] = upper[i - 1]
+        if direction[i] > 0:
+            trend[i] = long[i] = lower[i]
+        else:
+            trend[i] = short[i] = upper[i]
+    return trend, direction, long, short
+
+
+if njit is not None:
+    _supertrend_loop = njit(cache=True)(_supertrend_loop)
+
+
+def supertrend(high: np.ndarray, low: np.ndarray, close: np.ndarray,
+               length: int = 7, multiplier: float = 3) -> Tuple[np.ndarray, ...]:
+    """Supertrend line, direction (1/-1), long band and short band"""
+    hl2 = (high + low) / 2
+    band = multiplier * atr(high, low, close, length)
+    return _supertrend_loop(close, hl2 + band, hl2 - band)
+
+
+def indicator_columns(df: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """Same columns, names and order as FeatureEngine's pandas-ta backend"""
+    high = df['high'].to_numpy(dtype=float)
+    low = df['low'].to_numpy(dtype=float)
+    close = df['close'].to_numpy(dtype=float)
+    cols = {}
+
+    # 1. Trend Indicators
+    cols['sma_20'] = sma(close, 20)
+    cols['sma_50'] = sma(close, 50)
+    cols['ema_9'] = ema(close, 9)
+    cols['ema_21'] = ema(close, 21)
+    cols['MACD_12_26_9'], cols['MACDh_12_26_9'], cols['MACDs_12_26_9'] = macd(close, 12, 26, 9)
+    cols['ADX_14'], cols['DMP_14'], cols['DMN_14'] = adx(high, low, close, 14)
+
+    # 2. Momentum Indicators
+    cols['rsi'] = rsi(close, 14)
+    cols['stoch_k'], cols['stoch_d'] = stoch(high, low, close, 14, 3, 3)
+    cols['cci'] = cci(high, low, close, 20)
+
+    # 3. Volatility Indicators
+    bands = bbands(close, 20, 2)
+    for name, values in zip(['BBL', 'BBM', 'BBU', 'BBB', 'BBP'], bands):
+        cols[f'{name}_20_2.0'] = values
+    cols['atr'] = atr(high, low, close, 14)
+
+    # 4. Volume Indicators
+    if 'volume' in df.columns:
+        volume = df['volume'].to_numpy(dtype=float)
+        cols['VWAP_D'] = vwap(high, low, close, volume, df.index)
+        cols['obv'] = obv(close, volume)
+
+    # 5. Custom Features
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cols['dist_sma20'] = (close - cols['sma_20']) / cols['sma_20']
+    cols['rsi_slope'] = _diff(cols['rsi'], 3)
+    cols['price_slope'] = _diff(close, 3)
+
+    trend = supertrend(high, low, close, 7, 3)
+    for name, values in zip(['SUPERT', 'SUPERTd', 'SUPERTl', 'SUPERTs'], trend):
+        cols[f'{name}_7_3.0'] = values
+
+    return cols
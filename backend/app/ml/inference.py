@@ -0,0 +1,148 @@
+"""Batched model inference across symbols"""
+import asyncio
+import logging
+import time
+import warnings
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+def load_model(model_path: str):
+    """Load a pickled model once per process (LRU cached, reloaded when the file changes)"""
+    from app.ml.registry import load_artifact
+    return load_artifact(model_path)
+
+
+def model_feature_cols(model) -> Optional[List[str]]:
+    """Column order the model was fitted with (sklearn stores it as feature_names_in_)"""
+    names = getattr(model, 'feature_names_in_', None)
+    return [str(name) for name in names] if names is not None else None
+
+
+def predict_rows(model_path: str, rows: List[Dict], feature_cols: Optional[List[str]] = None,
+                 fallback_cols: Optional[List[str]] = None) -> np.ndarray:
+    """
+    Buy probabilities for feature-row dicts, aligned to the model's columns.
+
+    Columns are ``feature_cols`` (recorded with this model), else the model's
+    own feature_names_in_, else ``fallback_cols``. The model is loaded and
+    its columns resolved in the same call, so they always belong together.
+    """
+    model = load_model(model_path)
+    cols = feature_cols or model_feature_cols(model) or fallback_cols
+    if cols is None:
+        raise ValueError(f"{model_path} has no feature names and no feature_cols were given")
+    X = np.array([[row.get(col, np.nan) for col in cols] for row in rows], dtype=float)
+    with warnings.catch_warnings():
+        # Columns are already aligned to feature_names_in_; skip the DataFrame round trip
+        warnings.filterwarnings("ignore", message="X does not have valid feature names")
+        return model.predict_proba(X)[:, 1]
+
+
+async def _run_inline(func, *args):
+    return func(*args)
+
+
+class BatchPredictor:
+    """
+    Collects feature rows from concurrent callers and scores them together.
+
+    The first request opens a ``window``-second batch; every row submitted
+    before it closes (or until ``max_batch`` rows are queued) is aligned to
+    the model's feature column order, stacked into one contiguous matrix and
+    scored with a single predict_proba call through ``runner`` (e.g.
+    TradingEngine.run_inference, which keeps loading, alignment and
+    inference off the event loop while the model stays loaded in this
+    process).
+    """
+
+    def __init__(self, model_path: str, runner: Callable[..., Awaitable] = None,
+                 window: float = 0.05, max_batch: int = 256, feature_cols: List[str] = None):
+        self.runner = runner or _run_inline
+        self.window = window
+        self.max_batch = max_batch
+
+        self._pending = []  # (symbol, row, future)
+        self._timer = None
+        self._tasks = set()
+        self._model = (model_path, list(feature_cols) if feature_cols is not None else None)
+        self._fallback_cols = None
+
+        self.stats = {
+            'batches': 0,
+            'rows': 0,
+            'last_batch_size': 0,
+            'last_latency_ms': None,
+            'avg_latency_ms': None,
+            'max_latency_ms': None
+        }
+
+    async def predict(self, symbol: str, row: Dict, feature_cols: List[str] = None) -> float:
+        """
+        Queue one feature row and wait for its probability.
+
+        ``feature_cols`` is only used when the model does not record the
+        column order it was fitted with.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((symbol, row, future))
+        if self._fallback_cols is None and feature_cols is not None:
+            self._fallback_cols = list(feature_cols)
+
+        if len(self._pending) >= self.max_batch:
+            self._dispatch()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._dispatch)
+        return await future
+
+    @property
+    def model_path(self) -> str:
+        return self._model[0]
+
+    def swap(self, model_path: str, feature_cols: List[str] = None):
+        """Point new batches at another model (batches already dispatched finish on the old one)"""
+        # One assignment: a batch never pairs the new path with the old columns
+        self._model = (model_path, list(feature_cols) if feature_cols is not None else None)
+
+    def _dispatch(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.get_running_loop().create_task(self._score(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _score(self, batch):
+        start = time.perf_counter()
+        model_path, feature_cols = self._model
+        try:
+            rows = [row for _, row, _ in batch]
+            probs = await self.runner(predict_rows, model_path, rows, feature_cols, self._fallback_cols)
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        latency_ms = (time.perf_counter() - start) * 1000
+        self._record(len(batch), latency_ms)
+        logger.debug(f"Scored batch of {len(batch)} rows in {latency_ms:.1f} ms")
+
+        for (_, _, future), prob in zip(batch, probs):
+            if not future.done():
+                future.set_result(float(prob))
+
+    def _record(self, size: int, latency_ms: float):
+        stats = self.stats
+        stats['batches'] += 1
+        stats['rows'] += size
+        stats['last_batch_size'] = size
+        stats['last_latency_ms'] = latency_ms
+        prev_avg = stats['avg_latency_ms'] or 0.0
+        stats['avg_latency_ms'] = prev_avg + (latency_ms - prev_avg) / stats['batches']
+        stats['max_latency_ms'] = max(stats['max_latency_ms'] or 0.0, latency_ms)
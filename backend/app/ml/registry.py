@@ -0,0 +1,174 @@
+"""Model registry backed by the models table"""
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.files import atomic_write
+
+logger = logging.getLogger(__name__)
+
+REGISTER_ATTEMPTS = 5  # Concurrent registrations of one name race for the same version
+
+
+class LRUCache:
+    """Small thread-safe LRU cache for loaded model artifacts"""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._items:
+                return None
+            self._items.move_to_end(key)
+            return self._items[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+# Artifacts loaded in this process, keyed by (path, mtime)
+_artifacts = LRUCache(settings.MODEL_CACHE_SIZE)
+
+
+def load_artifact(path: str):
+    """Unpickle a model artifact, shared by every caller in this process"""
+    import joblib
+
+    key = (os.path.abspath(path), os.path.getmtime(path))
+    model = _artifacts.get(key)
+    if model is None:
+        model = joblib.load(path)
+        _artifacts.put(key, model)
+    return model
+
+
+class ModelRegistry:
+    """
+    Versioned models stored as joblib artifacts and recorded in the models table.
+
+    Each row keeps the artifact location in ``artifact_uri`` and the feature
+    column order the model expects in ``params['feature_cols']``, so callers
+    can align inputs without unpickling the model.
+    """
+
+    def __init__(self, artifact_dir: str = None, session_factory=None):
+        self.artifact_dir = artifact_dir or settings.MODEL_REGISTRY_DIR
+        self._session_factory = session_factory
+
+    def _session(self):
+        if self._session_factory is None:
+            from app.core.database import SessionLocal
+            self._session_factory = SessionLocal
+        return self._session_factory()
+
+    def register(self, name: str, model: Any, feature_cols: List[str],
+                 params: Dict = None, metrics: Dict = None) -> Dict:
+        """Save ``model`` as the next version of ``name`` and return its record"""
+        from sqlalchemy.exc import IntegrityError
+
+        for attempt in range(1, REGISTER_ATTEMPTS + 1):
+            try:
+                return self._register(name, model, feature_cols, params, metrics)
+            except IntegrityError:
+                # Another registration took this version first (uq_models_name_version)
+                if attempt == REGISTER_ATTEMPTS:
+                    raise
+                logger.warning(f"Model {name} version conflict, retrying ({attempt}/{REGISTER_ATTEMPTS})")
+
+    def _register(self, name: str, model: Any, feature_cols: List[str], params: Dict, metrics: Dict) -> Dict:
+        import joblib
+        from sqlalchemy import select
+        from app.models.strategy import Model
+
+        db = self._session()
+        path = None
+        try:
+            versions = db.scalars(select(Model.version).where(Model.name == name)).all()
+            version = str(max((int(v) for v in versions if v.isdigit()), default=0) + 1)
+
+            safe_name = re.sub(r'[^A-Za-z0-9._-]', '_', name)
+            row = Model(
+                name=name,
+                version=version,
+                params={**(params or {}), 'feature_cols': list(feature_cols)},
+                metrics=metrics or {},
+                artifact_uri=os.path.join(self.artifact_dir, safe_name, f"v{version}.pkl")
+            )
+            db.add(row)
+            db.flush()  # Claims the version (or raises IntegrityError) before the artifact is written
+
+            path = row.artifact_uri
+            with atomic_write(path) as tmp_path:
+                joblib.dump(model, tmp_path)
+
+            db.commit()
+            db.refresh(row)
+            logger.info(f"Registered model {name} v{version} at {path}")
+            return self._record(row)
+        except Exception:
+            # The version was never committed; drop its artifact while the row still holds the name
+            if path is not None and os.path.exists(path):
+                os.remove(path)
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def latest(self, name: str) -> Optional[Dict]:
+        """Newest registered version of ``name`` (None if there is none)"""
+        from app.models.strategy import Model
+
+        db = self._session()
+        try:
+            row = db.query(Model).filter(Model.name == name).order_by(Model.id.desc()).first()
+            return self._record(row) if row else None
+        finally:
+            db.close()
+
+    def get(self, name: str, version: str) -> Optional[Dict]:
+        from app.models.strategy import Model
+
+        db = self._session()
+        try:
+            row = db.query(Model).filter(Model.name == name, Model.version == version).first()
+            return self._record(row) if row else None
+        finally:
+            db.close()
+
+    def load(self, name: str, version: str = None) -> Tuple[Any, List[str]]:
+        """Loaded model and its feature columns (latest version by default)"""
+        record = self.get(name, version) if version else self.latest(name)
+        if record is None:
+            raise ValueError(f"Model {name} {version or 'latest'} is not registered")
+        return load_artifact(record['artifact_uri']), record['feature_cols']
+
+    @staticmethod
+    def _record(row) -> Dict:
+        params = dict(row.params or {})
+        return {
+            'id': row.id,
+            'name': row.name,
+            'version': row.version,
+            'feature_cols': params.pop('feature_cols', None),
+            'params': params,
+            'metrics': row.metrics,
+            'artifact_uri': row.artifact_uri,
+            'created_at': row.created_at
+        }
+
+
+model_registry = ModelRegistry()
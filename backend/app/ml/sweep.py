@@ -0,0 +1,197 @@
+"""Parameter-sweep backtesting on a process pool"""
+import itertools
+import os
+import random
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.ml.backtest import Backtester
+
+# Arrays shared with the current worker process (memory-mapped, read-only)
+_shared: Dict[str, np.ndarray] = {}
+
+
+def generate_signals(close: np.ndarray, probs: np.ndarray, buy_threshold: float = 0.8,
+                     sell_threshold: float = 0.2, stop_loss_pct: float = None,
+                     take_profit_pct: float = None) -> np.ndarray:
+    """
+    Turn model probabilities into Backtester signals (1 buy, -1 sell, 0 hold).
+
+    Without stop loss / take profit the raw threshold signals are returned.
+    Otherwise every position is walked from its entry to the first bar that
+    either has a sell signal or moves past the stop loss / take profit level
+    (same percentage check as TradingEngine), and only those entries and exits
+    are emitted. The scan is per trade, not per bar.
+    """
+    signals = np.where(probs > buy_threshold, 1, np.where(probs < sell_threshold, -1, 0)).astype(np.int8)
+    if not stop_loss_pct and not take_profit_pct:
+        return signals
+
+    out = np.zeros_like(signals)
+    buy_idx = np.flatnonzero(signals == 1)
+    sell_mask = signals == -1
+    start = 0
+    while True:
+        pos = np.searchsorted(buy_idx, start)
+        if pos == len(buy_idx):
+            break
+        entry = buy_idx[pos]
+        out[entry] = 1
+        exit_idx = _first_exit(close, sell_mask, entry + 1, close[entry], stop_loss_pct, take_profit_pct)
+        if exit_idx is None:
+            break
+        out[exit_idx] = -1
+        start = exit_idx + 1
+    return out
+
+
+def _first_exit(close, sell_mask, start, entry_price, stop_loss_pct, take_profit_pct) -> Optional[int]:
+    """Index of the first exit bar at or after ``start`` (scanned in growing chunks)"""
+    n = len(close)
+    chunk = 64
+    while start < n:
+        end = min(n, start + chunk)
+        pnl_pct = (close[start:end] - entry_price) / entry_price
+        hit = sell_mask[start:end].copy()
+        if stop_loss_pct:
+            hit |= pnl_pct <= -stop_loss_pct
+        if take_profit_pct:
+            hit |= pnl_pct >= take_profit_pct
+        found = np.flatnonzero(hit)
+        if found.size:
+            return start + int(found[0])
+        start = end
+        chunk *= 2
+    return None
+
+
+def _init_worker(data_dir: str):
+    """Map the shared dataset into this worker once"""
+    _shared['close'] = np.load(os.path.join(data_dir, 'close.npy'), mmap_mode='r')
+    _shared['probs'] = np.load(os.path.join(data_dir, 'probs.npy'), mmap_mode='r')
+    _shared['index'] = pd.DatetimeIndex(np.load(os.path.join(data_dir, 'index.npy'), mmap_mode='r'))
+
+
+def _run_configs(configs: List[Dict], initial_capital: float) -> List[Dict]:
+    """Backtest a batch of configurations against the shared dataset"""
+    close, probs, index = _shared['close'], _shared['probs'], _shared['index']
+    results = []
+    for config in configs:
+        signals = generate_signals(
+            close, probs,
+            buy_threshold=config['buy_threshold'],
+            sell_threshold=config['sell_threshold'],
+            stop_loss_pct=config['stop_loss_pct'],
+            take_profit_pct=config['take_profit_pct']
+        )
+        backtester = Backtester(
+            initial_capital=initial_capital,
+            commission=config['commission'],
+            slippage=config['slippage']
+        )
+        metrics = backtester.run_arrays(close, signals, index)
+        metrics.pop('trades')
+        results.append({**config, **metrics})
+    return results
+
+
+class ParameterSweep:
+    """Grid / random search over strategy parameters with Backtester"""
+
+    PARAMS = ['buy_threshold', 'sell_threshold', 'stop_loss_pct', 'take_profit_pct', 'commission', 'slippage']
+    DEFAULTS = {
+        'buy_threshold': 0.8,      # TradingEngine entry threshold
+        'sell_threshold': 0.2,
+        'stop_loss_pct': 0.01,
+        'take_profit_pct': 0.02,
+        'commission': 0.0003,
+        'slippage': 0.0001
+    }
+    EXCLUDE_COLS = ['label_binary', 'label_regression', 'future_return', 'returns']
+
+    def __init__(self, df: pd.DataFrame, probabilities: np.ndarray = None, model=None,
+                 feature_cols: List[str] = None, initial_capital=100000, max_workers: int = None):
+        """
+        Args:
+            df: Feature-engineered frame (FeatureEngine.prepare_features output)
+            probabilities: Buy probabilities per row; computed with ``model`` if omitted
+            model: Fitted classifier with predict_proba
+            feature_cols: Model input columns (defaults to the ModelTrainer selection)
+        """
+        if probabilities is None:
+            if model is None:
+                raise ValueError("Either probabilities or model is required")
+            feature_cols = feature_cols or [c for c in df.columns if c not in self.EXCLUDE_COLS]
+            probabilities = model.predict_proba(df[feature_cols])[:, 1]
+
+        self.close = df['close'].to_numpy(dtype=float)
+        self.probabilities = np.asarray(probabilities, dtype=float)
+        if isinstance(df.index, pd.DatetimeIndex):
+            self.index = df.index.to_numpy(dtype='datetime64[ns]')
+        else:
+            self.index = pd.date_range('1970-01-01', periods=len(df), freq='1min').to_numpy()
+        self.initial_capital = initial_capital
+        self.max_workers = max_workers or os.cpu_count() or 1
+
+    def grid(self, space: Dict[str, List], metric: str = 'sharpe_ratio') -> pd.DataFrame:
+        """Evaluate every combination of the values in ``space``"""
+        keys = list(space.keys())
+        configs = [dict(zip(keys, values)) for values in itertools.product(*(space[k] for k in keys))]
+        return self.run(configs, metric)
+
+    def random(self, space: Dict, n_iter: int = 1000, seed: int = 42, metric: str = 'sharpe_ratio') -> pd.DataFrame:
+        """
+        Evaluate ``n_iter`` random configurations.
+
+        Each entry of ``space`` is either a list of choices or a (low, high)
+        tuple sampled uniformly.
+        """
+        rng = random.Random(seed)
+        configs = []
+        for _ in range(n_iter):
+            config = {}
+            for key, values in space.items():
+                if isinstance(values, tuple):
+                    config[key] = rng.uniform(*values)
+                else:
+                    config[key] = rng.choice(list(values))
+            configs.append(config)
+        return self.run(configs, metric)
+
+    def run(self, configs: List[Dict], metric: str = 'sharpe_ratio') -> pd.DataFrame:
+        """Backtest ``configs`` in parallel and return them ranked by ``metric``"""
+        unknown = {k for config in configs for k in config} - set(self.PARAMS)
+        if unknown:
+            raise ValueError(f"Unknown sweep parameters: {sorted(unknown)}")
+        configs = [{**self.DEFAULTS, **config} for config in configs]
+
+        # Write the dataset once; workers memory-map it instead of unpickling copies
+        data_dir = tempfile.mkdtemp(prefix="sweep_")
+        try:
+            np.save(os.path.join(data_dir, 'close.npy'), self.close)
+            np.save(os.path.join(data_dir, 'probs.npy'), self.probabilities)
+            np.save(os.path.join(data_dir, 'index.npy'), self.index)
+
+            workers = min(self.max_workers, max(1, len(configs)))
+            batch_size = max(1, len(configs) // (workers * 4))
+            batches = [configs[i:i + batch_size] for i in range(0, len(configs), batch_size)]
+
+            print(f"Running {len(configs)} configurations on {workers} workers...")
+            results = []
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(data_dir,)) as pool:
+                for batch in pool.map(_run_configs, batches, itertools.repeat(self.initial_capital)):
+                    results.extend(batch)
+        finally:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+        table = pd.DataFrame(results, columns=self.PARAMS + [
+            'total_return', 'sharpe_ratio', 'max_drawdown', 'num_trades', 'final_equity'
+        ])
+        table = table.sort_values(metric, ascending=False, kind='stable').reset_index(drop=True)
+        table.index.name = 'rank'
+        return table
@@ -1,3 +1,5 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 import numpy as np
 from sklearn.model_selection import TimeSeriesSplit
@@ -5,22 +7,96 @@ from sklearn.metrics import accuracy_score, roc_auc_score
 import xgboost as xgb
 import mlflow
 import mlflow.xgboost
-from app.ml.features import FeatureEngine
+from app.ml.feature_cache import prepare_features
+from app.core.config import settings
+
+LEARNERS = ['gbm', 'hist', 'xgboost', 'lightgbm']
+
+# Training data shared with the current worker process
+_shared = {}
+
+def make_model(learner: str = "gbm", n_jobs: int = 1):
+    """
+    Classifier for ``learner``, all with the same 200 trees / lr 0.1 / depth 5.
+    
+    'gbm' is the original single-threaded GradientBoostingClassifier; 'hist',
+    'xgboost' and 'lightgbm' are histogram-based and use ``n_jobs`` threads.
+    """
+    if learner == "gbm":
+        from sklearn.ensemble import GradientBoostingClassifier
+        return GradientBoostingClassifier(n_estimators=200, learning_rate=0.1, max_depth=5, random_state=42)
+    if learner == "hist":
+        from sklearn.ensemble import HistGradientBoostingClassifier
+        return HistGradientBoostingClassifier(max_iter=200, learning_rate=0.1, max_depth=5, random_state=42)
+    if learner == "xgboost":
+        return xgb.XGBClassifier(
+            n_estimators=200, learning_rate=0.1, max_depth=5, tree_method="hist",
+            n_jobs=n_jobs, random_state=42
+        )
+    if learner == "lightgbm":
+        import lightgbm as lgb
+        return lgb.LGBMClassifier(
+            n_estimators=200, learning_rate=0.1, max_depth=5,
+            n_jobs=n_jobs, random_state=42, verbose=-1
+        )
+    raise ValueError(f"Unknown learner: {learner} (expected one of {LEARNERS})")
+
+def _init_worker(X: pd.DataFrame, y: pd.Series):
+    """Receive the training data once per worker instead of once per fold"""
+    _shared['X'] = X
+    _shared['y'] = y
+
+def _fit(learner: str, n_jobs: int, train_idx: np.ndarray, val_idx: np.ndarray = None):
+    """
+    Fit on ``train_idx``; for a fold return validation probabilities,
+    for the final fit (no ``val_idx``) return the model.
+    """
+    from threadpoolctl import threadpool_limits
+    
+    X, y = _shared['X'], _shared['y']
+    model = make_model(learner, n_jobs)
+    # Keep OpenMP learners (hist) to this worker's share of the cores
+    with threadpool_limits(limits=n_jobs):
+        model.fit(X.iloc[train_idx], y.iloc[train_idx])
+        if val_idx is None:
+            return model
+        return model.predict_proba(X.iloc[val_idx])[:, 1]
+
+def high_confidence_accuracy(y_val: pd.Series, probs: np.ndarray):
+    """Accuracy over the 5% most confident predictions at each end (None when there are none)"""
+    # Strict confidence mask (Top 5% confidence)
+    high_conf_threshold = np.percentile(probs, 95)
+    low_conf_threshold = np.percentile(probs, 5)
+    
+    high_conf_mask = (probs > high_conf_threshold) | (probs < low_conf_threshold)
+    
+    if sum(high_conf_mask) == 0:
+        return None, 0
+    y_val_conf = y_val[high_conf_mask]
+    y_pred_conf = (probs[high_conf_mask] > 0.5).astype(int)
+    return accuracy_score(y_val_conf, y_pred_conf), int(sum(high_conf_mask))
 
 class ModelTrainer:
     """Train and evaluate ML models"""
     
-    def __init__(self, experiment_name="nifty_trading"):
+    def __init__(self, experiment_name="nifty_trading", learner: str = None, max_workers: int = None):
         mlflow.set_experiment(experiment_name)
         self.feature_cols = None
+        self.fold_scores = []
+        self.learner = learner or settings.MODEL_LEARNER
+        self.max_workers = max_workers or settings.TRAIN_WORKERS or os.cpu_count() or 1
     
     def train_random_forest(self, df: pd.DataFrame):
-        """Train Random Forest classifier with high confidence threshold"""
-        from sklearn.ensemble import RandomForestClassifier
+        """
+        Train classifier with high confidence threshold.
         
+        The five walk-forward folds and the final fit are independent, so
+        they run concurrently in a process pool; the CPU cores left over
+        are given to multithreaded learners as ``n_jobs``.
+        """
         # Prepare features
         print(f"Data shape before features: {df.shape}")
-        df = FeatureEngine.prepare_features(df)
+        df = prepare_features(df)  # Cached by data fingerprint
         print(f"Data shape after features: {df.shape}")
         
         if df.empty:
@@ -35,58 +111,55 @@ class ModelTrainer:
         
         # Train/Test Split
         tscv = TimeSeriesSplit(n_splits=5)
+        folds = list(tscv.split(X))
         
-        scores = []
-        for train_idx, val_idx in tscv.split(X):
-            X_train, X_val = X.iloc[train_idx], X.iloc[val_idx]
-            y_train, y_val = y.iloc[train_idx], y.iloc[val_idx]
-            
-            # Use Gradient Boosting for better accuracy
-            from sklearn.ensemble import GradientBoostingClassifier
-            model = GradientBoostingClassifier(
-                n_estimators=200,
-                learning_rate=0.1,
-                max_depth=5,
-                random_state=42
-            )
-            model.fit(X_train, y_train)
-            
-            # Evaluate only high confidence predictions
-            probs = model.predict_proba(X_val)[:, 1]
+        workers = min(self.max_workers, len(folds) + 1)
+        n_jobs = max(1, (os.cpu_count() or 1) // workers)
+        print(f"Training {self.learner} on {workers} workers ({n_jobs} threads each)...")
+        
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(X, y)) as pool:
+            # Final model first: it trains on the most data and finishes last
+            final_future = pool.submit(_fit, self.learner, n_jobs, np.arange(len(X)))
+            fold_futures = [pool.submit(_fit, self.learner, n_jobs, train_idx, val_idx) for train_idx, val_idx in folds]
             
-            # Strict confidence mask (Top 5% confidence)
-            high_conf_threshold = np.percentile(probs, 95)
-            low_conf_threshold = np.percentile(probs, 5)
+            scores = []
+            for (train_idx, val_idx), future in zip(folds, fold_futures):
+                y_val = y.iloc[val_idx]
+                
+                # Evaluate only high confidence predictions
+                acc, trades = high_confidence_accuracy(y_val, future.result())
+                if acc is not None:
+                    scores.append(acc)
+                    print(f"Fold High Confidence Accuracy: {acc:.4f} (Trades: {trades})")
+                else:
+                    print("Fold: No high confidence trades")
             
-            high_conf_mask = (probs > high_conf_threshold) | (probs < low_conf_threshold)
+            self.fold_scores = scores
+            avg_acc = np.mean(scores) if scores else 0
+            print(f"Average High Confidence Accuracy: {avg_acc:.4f}")
             
-            if sum(high_conf_mask) > 0:
-                y_val_conf = y_val[high_conf_mask]
-                y_pred_conf = (probs[high_conf_mask] > 0.5).astype(int)
-                acc = accuracy_score(y_val_conf, y_pred_conf)
-                scores.append(acc)
-                print(f"Fold High Confidence Accuracy: {acc:.4f} (Trades: {sum(high_conf_mask)})")
-            else:
-                print("Fold: No high confidence trades")
-        
-        avg_acc = np.mean(scores) if scores else 0
-        print(f"Average High Confidence Accuracy: {avg_acc:.4f}")
-        
-        # Train final model
-        from sklearn.ensemble import GradientBoostingClassifier
-        final_model = GradientBoostingClassifier(
-            n_estimators=200,
-            learning_rate=0.1,
-            max_depth=5,
-            random_state=42
-        )
-        final_model.fit(X, y)
+            # Train final model
+            final_model = final_future.result()
         
         # Save model to disk
         import joblib
         joblib.dump(final_model, "model.pkl")
         print("Model saved to model.pkl")
         
+        # Register a new version; running engines pick it up without a restart
+        from app.ml.registry import model_registry
+        record = model_registry.register(
+            settings.MODEL_NAME,
+            final_model,
+            self.feature_cols,
+            params={
+                'learner': self.learner,
+                **{k: v for k, v in final_model.get_params().items() if isinstance(v, (int, float, str, bool))}
+            },
+            metrics={'high_conf_accuracy': float(avg_acc)}
+        )
+        print(f"Registered {record['name']} v{record['version']}")
+        
         return final_model, avg_acc
 
     def train_model(self, symbol: str = "^NSEI", period: str = "2y"):
@@ -1,5 +1,6 @@
 from app.models.user import User
-from app.models.wallet import Wallet, Ledger
+from app.models.wallet import Wallet, Ledger, WalletStats
 from app.models.order import Order, Trade
 from app.models.position import Position
 from app.models.strategy import Strategy, Model
+from app.models.analytics import PerformanceStats
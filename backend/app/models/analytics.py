@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, Float, ForeignKey, DateTime, JSON
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+class PerformanceStats(Base):
+    """Running trade statistics per user, folded in as each fill is recorded"""
+    __tablename__ = "performance_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    total_trades = Column(Integer, nullable=False, default=0)
+    winning_trades = Column(Integer, nullable=False, default=0)
+    losing_trades = Column(Integer, nullable=False, default=0)
+    realized_pnl = Column(Float, nullable=False, default=0.0)
+    gross_profit = Column(Float, nullable=False, default=0.0)
+    gross_loss = Column(Float, nullable=False, default=0.0)
+    peak_pnl = Column(Float, nullable=False, default=0.0)  # High-water mark of realized PnL
+    max_drawdown = Column(Float, nullable=False, default=0.0)
+    open_entries = Column(JSON)  # Entry prices of unmatched buys, oldest first
+    balance_curve = Column(JSON)  # Realized PnL after each trade (most recent points)
+    last_order_id = Column(Integer)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Enum
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Enum, Index
 from sqlalchemy.sql import func
 from app.core.database import Base
 import enum
@@ -21,6 +21,9 @@ class OrderStatus(str, enum.Enum):
 
 class Order(Base):
     __tablename__ = "orders"
+    __table_args__ = (
+        Index("ix_orders_user_created", "user_id", "created_at", "id"),  # Keyset pages of a user's orders
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     ext_id = Column(String, unique=True, index=True)  # Broker order ID
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, JSON, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, JSON, ForeignKey, UniqueConstraint
 from sqlalchemy.sql import func
 from app.core.database import Base
 
@@ -17,6 +17,9 @@ class Strategy(Base):
 
 class Model(Base):
     __tablename__ = "models"
+    __table_args__ = (
+        UniqueConstraint("name", "version", name="uq_models_name_version"),  # Concurrent registers retry on conflict
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
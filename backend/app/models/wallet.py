@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Float, ForeignKey, DateTime, String, Enum, JSON
+from sqlalchemy import Column, Integer, Float, ForeignKey, DateTime, String, Enum, JSON, Index, event, insert, select, update
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.core.database import Base
@@ -26,6 +26,9 @@ class LedgerType(str, enum.Enum):
 
 class Ledger(Base):
     __tablename__ = "ledger"
+    __table_args__ = (
+        Index("ix_ledger_wallet_timestamp", "wallet_id", "timestamp", "id"),  # Keyset pages of transactions
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     wallet_id = Column(Integer, ForeignKey("wallets.id"), nullable=False)
@@ -34,3 +37,47 @@ class Ledger(Base):
     balance_after = Column(Float, nullable=False)
     meta_data = Column(JSON)  # Renamed from 'metadata' to avoid SQLAlchemy conflict
     timestamp = Column(DateTime(timezone=True), server_default=func.now())
+
+class WalletStats(Base):
+    """Running ledger totals per wallet and entry type, kept in step with every ledger insert"""
+    __tablename__ = "wallet_stats"
+    
+    wallet_id = Column(Integer, ForeignKey("wallets.id"), primary_key=True)
+    type = Column(Enum(LedgerType), primary_key=True)
+    total_amount = Column(Float, nullable=False, default=0.0)
+    entry_count = Column(Integer, nullable=False, default=0)
+
+def add_to_wallet_stats(connection, wallet_id: int, type: LedgerType, amount: float, count: int = 1):
+    """Add ``amount``/``count`` to a wallet_stats row, creating it if needed"""
+    dialect = connection.dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as upsert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as upsert
+        stmt = upsert(WalletStats).values(wallet_id=wallet_id, type=type, total_amount=amount, entry_count=count)
+        connection.execute(stmt.on_conflict_do_update(
+            index_elements=[WalletStats.wallet_id, WalletStats.type],
+            set_={
+                "total_amount": WalletStats.total_amount + stmt.excluded.total_amount,
+                "entry_count": WalletStats.entry_count + stmt.excluded.entry_count,
+            }
+        ))
+        return
+
+    # No portable upsert: select, then update or insert
+    key = (WalletStats.wallet_id == wallet_id) & (WalletStats.type == type)
+    exists = connection.execute(select(WalletStats.wallet_id).where(key)).first()
+    if exists:
+        connection.execute(update(WalletStats).where(key).values(
+            total_amount=WalletStats.total_amount + amount, entry_count=WalletStats.entry_count + count
+        ))
+    else:
+        connection.execute(insert(WalletStats).values(
+            wallet_id=wallet_id, type=type, total_amount=amount, entry_count=count
+        ))
+
+@event.listens_for(Ledger, "after_insert")
+def _count_ledger_entry(mapper, connection, target):
+    # Same connection and transaction as the ledger row, so both commit or roll back together
+    add_to_wallet_stats(connection, target.wallet_id, target.type, target.amount)
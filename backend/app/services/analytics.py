@@ -1,19 +1,122 @@
+import threading
+from typing import Optional
+
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import flag_modified
+from app.models.analytics import PerformanceStats
 from app.models.order import Order, OrderSide, OrderStatus
-import pandas as pd
+
+CURVE_POINTS = 500  # Most recent balance curve points kept for the performance chart
 
 class AnalyticsService:
+    """
+    Per-user trade statistics kept in one performance_stats row.
+
+    Filled orders are matched FIFO as they are recorded (each sell closes
+    the oldest open buy), so reading the metrics never touches the orders
+    table. Accounts without a stats row are rebuilt from their order
+    history once, on first read.
+    """
+
+    # Engine loops record fills from several threads; serialize the read-modify-write
+    _lock = threading.Lock()
+
     def __init__(self, db: Session, user_id: int):
         self.db = db
         self.user_id = user_id
 
+    @staticmethod
+    def empty_stats(user_id: int) -> PerformanceStats:
+        return PerformanceStats(
+            user_id=user_id, total_trades=0, winning_trades=0, losing_trades=0,
+            realized_pnl=0.0, gross_profit=0.0, gross_loss=0.0, peak_pnl=0.0, max_drawdown=0.0,
+            open_entries=[], balance_curve=[0.0]
+        )
+
+    @staticmethod
+    def apply_fill(stats: PerformanceStats, side: OrderSide, qty: int, price: float):
+        """Fold one filled order into ``stats`` (the JSON lists are changed in place)"""
+        if side == OrderSide.BUY:
+            stats.open_entries.append(price)
+            return
+        if not stats.open_entries:
+            return  # Nothing to close
+        entry = stats.open_entries.pop(0)
+        pnl = (price - entry) * qty
+
+        stats.total_trades += 1
+        if pnl > 0:
+            stats.winning_trades += 1
+            stats.gross_profit += pnl
+        else:
+            stats.losing_trades += 1
+            stats.gross_loss += -pnl
+        stats.realized_pnl += pnl
+        stats.peak_pnl = max(stats.peak_pnl, stats.realized_pnl)
+        stats.max_drawdown = max(stats.max_drawdown, stats.peak_pnl - stats.realized_pnl)
+        stats.balance_curve.append(stats.realized_pnl)
+        if len(stats.balance_curve) > CURVE_POINTS:
+            del stats.balance_curve[0]
+
+    @staticmethod
+    def _touch(stats: PerformanceStats):
+        # In-place list changes are invisible to the ORM
+        flag_modified(stats, "open_entries")
+        flag_modified(stats, "balance_curve")
+
+    def record_fill(self, order: Order, commit: bool = True) -> PerformanceStats:
+        """Add a filled order and update the stats in the same transaction"""
+        with self._lock:
+            self.db.add(order)
+            self.db.flush()
+            stats = self.db.scalar(
+                select(PerformanceStats).where(PerformanceStats.user_id == self.user_id).with_for_update()
+            )
+            if stats is None:
+                # Includes the order just flushed
+                stats = self.rebuild(commit=False)
+            else:
+                self.apply_fill(stats, order.side, order.qty, order.price)
+                stats.last_order_id = order.id
+                self._touch(stats)
+            if commit:
+                self.db.commit()
+            return stats
+
+    def rebuild(self, commit: bool = True) -> PerformanceStats:
+        """Recompute the stats from every filled order of the user"""
+        stats = self.db.get(PerformanceStats, self.user_id)
+        if stats is None:
+            stats = self.empty_stats(self.user_id)
+            self.db.add(stats)
+        else:
+            fresh = self.empty_stats(self.user_id)
+            for column in PerformanceStats.__table__.columns.keys():
+                if column not in ("user_id", "updated_at"):
+                    setattr(stats, column, getattr(fresh, column))
+
+        rows = self.db.execute(
+            select(Order.id, Order.side, Order.qty, Order.price)
+            .where(Order.user_id == self.user_id, Order.status == OrderStatus.FILLED)
+            .order_by(Order.created_at, Order.id)
+            .execution_options(yield_per=5000)
+        )
+        for order_id, side, qty, price in rows:
+            self.apply_fill(stats, side, qty, price)
+            stats.last_order_id = order_id
+        self._touch(stats)
+        if commit:
+            self.db.commit()
+        return stats
+
     def get_performance_metrics(self):
-        orders = self.db.query(Order).filter(
-            Order.user_id == self.user_id,
-            Order.status == OrderStatus.FILLED
-        ).order_by(Order.created_at).all()
+        stats = self.db.get(PerformanceStats, self.user_id)
+        if stats is None:
+            with self._lock:
+                stats = self.rebuild()
 
-        if not orders:
+        if stats.last_order_id is None:
             return {
                 "total_trades": 0,
                 "win_rate": 0,
@@ -22,70 +125,46 @@ class AnalyticsService:
                 "max_drawdown": 0
             }
 
-        # Convert to DataFrame for easier calculation
-        data = []
-        for o in orders:
-            data.append({
-                "id": o.id,
-                "side": o.side,
-                "qty": o.qty,
-                "price": o.price,
-                "timestamp": o.created_at
-            })
-        
-        df = pd.DataFrame(data)
-        
-        # Simple PnL calculation (FIFO or assumption of paired trades)
-        # This is a simplified PnL estimator assuming sequential Buy -> Sell pairs
-        # In a real system, we'd match specific buy/sell orders.
-        
-        pnl_list = []
-        balance_curve = [0]
-        
-        # We need to reconstruct trades from orders
-        # Assumption: We always close the full position.
-        # We'll just iterate and match buys with subsequent sells.
-        
-        position = []
-        closed_trades = []
-        
-        for _, row in df.iterrows():
-            if row['side'] == OrderSide.BUY:
-                position.append(row)
-            elif row['side'] == OrderSide.SELL:
-                if position:
-                    entry = position.pop(0) # FIFO
-                    pnl = (row['price'] - entry['price']) * row['qty']
-                    closed_trades.append(pnl)
-                    balance_curve.append(balance_curve[-1] + pnl)
-        
-        total_trades = len(closed_trades)
-        winning_trades = len([p for p in closed_trades if p > 0])
-        losing_trades = len([p for p in closed_trades if p <= 0])
-        
-        win_rate = (winning_trades / total_trades * 100) if total_trades > 0 else 0
-        total_pnl = sum(closed_trades)
-        
-        gross_profit = sum([p for p in closed_trades if p > 0])
-        gross_loss = abs(sum([p for p in closed_trades if p < 0]))
-        
-        profit_factor = (gross_profit / gross_loss) if gross_loss > 0 else float('inf')
-        
-        # Max Drawdown
-        peak = -float('inf')
-        max_dd = 0
-        for bal in balance_curve:
-            if bal > peak:
-                peak = bal
-            dd = peak - bal
-            if dd > max_dd:
-                max_dd = dd
-                
+        total_trades = stats.total_trades
+        curve_offset = total_trades + 1 - len(stats.balance_curve)  # The full curve starts at 0 before any trade
+        win_rate = (stats.winning_trades / total_trades * 100) if total_trades > 0 else 0
+        profit_factor = (stats.gross_profit / stats.gross_loss) if stats.gross_loss > 0 else float('inf')
+
         return {
             "total_trades": total_trades,
             "win_rate": round(win_rate, 2),
-            "total_pnl": round(total_pnl, 2),
+            "total_pnl": round(stats.realized_pnl, 2),
             "profit_factor": round(profit_factor, 2) if profit_factor != float('inf') else "Inf",
-            "max_drawdown": round(max_dd, 2),
-            "balance_curve": balance_curve
+            "max_drawdown": round(stats.max_drawdown, 2),
+            # Only the last CURVE_POINTS points are kept; offset = index of the first one in the full curve
+            "balance_curve": stats.balance_curve,
+            "balance_curve_offset": curve_offset,
+            "balance_curve_truncated": curve_offset > 0
         }
+
+def rebuild_performance_stats(db: Session, user_id: Optional[int] = None) -> int:
+    """Recompute performance_stats for one user (or every user with fills); returns the number of users"""
+    if user_id is not None:
+        user_ids = [user_id]
+    else:
+        user_ids = db.scalars(select(Order.user_id).where(Order.status == OrderStatus.FILLED).distinct()).all()
+    with AnalyticsService._lock:
+        for uid in user_ids:
+            AnalyticsService(db, uid).rebuild(commit=False)
+            db.flush()
+        db.commit()
+    return len(user_ids)
+
+if __name__ == "__main__":
+    import argparse
+    from app.core.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Recompute performance_stats from the filled orders")
+    parser.add_argument("--user", type=int, help="Only this user id (default: every user with fills)")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        print(f"Rebuilt performance_stats for {rebuild_performance_stats(db, args.user)} users")
+    finally:
+        db.close()
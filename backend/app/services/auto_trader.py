@@ -4,8 +4,10 @@ from typing import Dict, List
 from sqlalchemy.orm import Session
 from app.services.market_analyzer import MarketAnalyzer
 from app.brokers.factory import get_broker
-from app.models.order import Order, OrderSide, OrderType, OrderStatus
+from app.models.order import OrderSide, OrderType, OrderStatus
 from app.models.position import Position
+from app.services.order_writer import order_writer
+from app.core.market_hours import ist_aware
 import logging
 
 logger = logging.getLogger(__name__)
@@ -16,11 +18,11 @@ class AutoTrader:
     def __init__(self, user_id: int, db: Session):
         self.user_id = user_id
         self.db = db
-        self.analyzer = MarketAnalyzer()
-        self.broker = get_broker()
+        self.broker = get_broker(account=user_id)
+        self.analyzer = MarketAnalyzer(self.broker)  # Same broker, so signals and orders share its clock
         self.is_active = False
         self.max_position_size = 1  # Max 1 lot per symbol
-        self.active_positions = {}
+        self.active_positions = {}  # symbol -> {'side', 'qty', 'avg_price'}; reloaded for every signal
         
     async def start_trading(self, symbols: List[str]):
         """Start automated trading"""
@@ -34,6 +36,26 @@ class AutoTrader:
             # Execute trade based on signal
             await self.execute_signal(signal)
     
+    def load_positions(self):
+        """
+        Stored positions, with this user's position writes still queued in
+        the order writer laid over them (the DB is written behind).
+        """
+        # Taken before the read: a write committed in between is then in the DB, else still in this list
+        queued = order_writer.queued_positions(self.user_id)
+        self.db.rollback()  # New read transaction: see what the writer thread committed since
+        positions = self.db.query(Position).filter(Position.user_id == self.user_id).all()
+        self.active_positions = {
+            p.symbol: {'side': p.side, 'qty': p.qty, 'avg_price': p.avg_price} for p in positions
+        }
+        for write in queued:
+            if write['qty'] > 0:
+                self.active_positions[write['symbol']] = {
+                    'side': OrderSide(write['side']), 'qty': write['qty'], 'avg_price': write['avg_price']
+                }
+            else:
+                self.active_positions.pop(write['symbol'], None)
+    
     async def execute_signal(self, signal: Dict):
         """Execute trade based on signal"""
         symbol = signal['symbol']
@@ -43,17 +65,15 @@ class AutoTrader:
         logger.info(f"Signal: {action} {symbol} @ {signal['price']:.2f} "
                    f"(Confidence: {confidence:.1%}, Pattern: {signal['pattern_name']})")
         
-        # Check if we already have a position
-        existing_position = self.db.query(Position).filter(
-            Position.user_id == self.user_id,
-            Position.symbol == symbol
-        ).first()
+        # Check if we already have a position (another trader or process may have changed it)
+        self.load_positions()
+        existing_position = self.active_positions.get(symbol)
         
         if action == 'BUY' and not existing_position:
             # Open long position
             await self.place_order(symbol, OrderSide.BUY, signal['price'])
             
-        elif action == 'SELL' and existing_position and existing_position.side == 'buy':
+        elif action == 'SELL' and existing_position and existing_position['side'] == 'buy':
             # Close long position
             await self.place_order(symbol, OrderSide.SELL, signal['price'])
     
@@ -69,57 +89,53 @@ class AutoTrader:
                 price=None
             )
             
-            # Save to database
-            order = Order(
+            # Save to database (batched, off the event loop)
+            order_writer.submit_order(
                 ext_id=broker_order['order_id'],
                 user_id=self.user_id,
                 symbol=symbol,
                 side=side,
                 type=OrderType.MARKET,
                 qty=self.max_position_size,
-                status=OrderStatus.SUBMITTED
+                status=OrderStatus.SUBMITTED,
+                created_at=ist_aware(self.analyzer.clock.now())
             )
-            self.db.add(order)
-            self.db.commit()
             
             logger.info(f"Order placed: {side.value} {symbol} x{self.max_position_size}")
             
             # Update position
-            await self.update_position(symbol, side, broker_order.get('avg_price', price))
+            self.update_position(symbol, side, broker_order.get('avg_price', price))
             
         except Exception as e:
             logger.error(f"Failed to place order: {e}")
     
-    async def update_position(self, symbol: str, side: OrderSide, price: float):
+    def update_position(self, symbol: str, side: OrderSide, price: float):
         """Update position after order execution"""
-        position = self.db.query(Position).filter(
-            Position.user_id == self.user_id,
-            Position.symbol == symbol
-        ).first()
+        position = self.active_positions.get(symbol)
         
         if side == OrderSide.BUY:
             if not position:
                 # Create new position
-                position = Position(
-                    user_id=self.user_id,
-                    symbol=symbol,
-                    side=side,
-                    qty=self.max_position_size,
-                    avg_price=price
-                )
-                self.db.add(position)
+                position = {'side': side, 'qty': self.max_position_size, 'avg_price': price}
+                self.active_positions[symbol] = position
             else:
                 # Update existing
-                position.qty += self.max_position_size
-                position.avg_price = (position.avg_price + price) / 2
+                position['qty'] += self.max_position_size
+                position['avg_price'] = (position['avg_price'] + price) / 2
         
         elif side == OrderSide.SELL and position:
             # Close position
-            position.qty -= self.max_position_size
-            if position.qty <= 0:
-                self.db.delete(position)
+            position['qty'] -= self.max_position_size
+            if position['qty'] <= 0:
+                del self.active_positions[symbol]
+        
+        else:
+            return
         
-        self.db.commit()
+        if symbol in self.active_positions:
+            order_writer.submit_position(self.user_id, symbol, **position)
+        else:
+            order_writer.submit_position(self.user_id, symbol)  # Closed: delete the row
     
     def stop_trading(self):
         """Stop automated trading"""
@@ -0,0 +1,205 @@
+"""Tick-to-bar aggregation on NSE session boundaries"""
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.core.market_hours import INTERVALS, IST, SESSION_CLOSE, SESSION_OPEN, to_ist
+from app.services.bar_store import TICKS, BarStore, bar_store
+from app.services.clock import system_clock
+
+logger = logging.getLogger(__name__)
+
+
+def session_bounds(ts: datetime) -> Tuple[datetime, datetime]:
+    open_ = datetime.combine(ts.date(), SESSION_OPEN)
+    return open_, datetime.combine(ts.date(), SESSION_CLOSE)
+
+
+def bar_span(ts: datetime, minutes: int) -> Optional[Tuple[datetime, datetime]]:
+    """(start, end) of the bar containing ``ts`` (naive IST), or None outside the session"""
+    open_, close = session_bounds(ts)
+    if not open_ <= ts < close:
+        return None
+    elapsed = int((ts - open_).total_seconds() // 60)
+    start = open_ + timedelta(minutes=elapsed - elapsed % minutes)
+    # The last bar of the day is cut short at the close (e.g. 15:15-15:30 for 1h)
+    return start, min(start + timedelta(minutes=minutes), close)
+
+
+class BarAggregator:
+    """
+    Builds OHLCV bars from broker ticks.
+
+    Ticks are the dicts returned by BaseBroker.get_tick: price is ``last``
+    and ``volume`` is the cumulative day volume, so bar volume is the
+    increase between ticks. A bar closes when a tick for a later bar arrives
+    or when ``flush`` passes its end time. Closed bars are written to the
+    bar store and delivered to every matching subscriber queue.
+
+    The volume deltas and the store's ring buffers assume one writer per
+    symbol: loops sharing an aggregator ``claim`` a symbol before feeding
+    it, and the others just read the bars the owner writes.
+    """
+
+    def __init__(self, intervals: Iterable[str] = tuple(INTERVALS), store: BarStore = None, naive_tz=IST):
+        self.intervals = {interval: INTERVALS[interval] for interval in intervals}
+        self.store = store or bar_store
+        self.naive_tz = naive_tz
+
+        self._bars: Dict[Tuple[str, str], Dict] = {}  # (symbol, interval) -> forming bar
+        self._ends: Dict[Tuple[str, str], datetime] = {}
+        self._last_volume: Dict[str, float] = {}
+        self._last_tick: Dict[str, datetime] = {}
+        self._owners: Dict[str, object] = {}  # symbol -> the loop feeding its ticks
+        self._subscribers: List[Tuple[asyncio.Queue, asyncio.AbstractEventLoop, str, Optional[set]]] = []
+
+    def subscribe(self, interval: str = '1m', symbols: Iterable[str] = None, maxsize: int = 1000) -> asyncio.Queue:
+        """
+        Queue receiving ``(symbol, interval, bar)`` for every closed bar.
+
+        Must be called from the event loop that will read the queue; when the
+        queue is full the oldest bar is dropped.
+        """
+        if interval not in self.intervals:
+            raise ValueError(f"Interval {interval} is not aggregated (have {list(self.intervals)})")
+        queue = asyncio.Queue(maxsize=maxsize)
+        loop = asyncio.get_running_loop()
+        self._subscribers.append((queue, loop, interval, set(symbols) if symbols else None))
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers = [sub for sub in self._subscribers if sub[0] is not queue]
+
+    def claim(self, symbol: str, owner) -> bool:
+        """Make ``owner`` the tick writer for ``symbol``; False while another owner holds it"""
+        return self._owners.setdefault(symbol, owner) is owner
+
+    def release(self, owner):
+        """Give up every symbol ``owner`` claimed (another loop may then take them over)"""
+        for symbol in [symbol for symbol, held_by in self._owners.items() if held_by is owner]:
+            del self._owners[symbol]
+
+    def current_bar(self, symbol: str, interval: str) -> Optional[Dict]:
+        """The still-forming bar (None between bars)"""
+        bar = self._bars.get((symbol, interval))
+        return dict(bar) if bar else None
+
+    def on_tick(self, tick: Dict) -> List[Tuple[str, str, Dict]]:
+        """Add one tick; returns the bars it closed"""
+        symbol = tick['symbol']
+        ts = to_ist(tick['timestamp'], self.naive_tz)
+        price = tick.get('last', tick.get('close'))
+        if price is None:
+            return []
+
+        last_tick = self._last_tick.get(symbol)
+        if last_tick is not None and ts < last_tick:
+            return []  # Out-of-order tick
+        if last_tick is None or last_tick.date() != ts.date():
+            self._last_volume.pop(symbol, None)
+        self._last_tick[symbol] = ts
+
+        cumulative = tick.get('volume')
+        volume = 0.0
+        if cumulative is not None:
+            previous = self._last_volume.get(symbol)
+            if previous is not None and cumulative >= previous:
+                volume = float(cumulative - previous)
+            self._last_volume[symbol] = cumulative
+
+        closed = []
+        for interval, minutes in self.intervals.items():
+            key = (symbol, interval)
+            bar = self._bars.get(key)
+            if bar is not None and ts >= self._ends[key]:
+                closed.append(self._close(key))
+                bar = None
+
+            span = bar_span(ts, minutes)
+            if span is None:
+                continue
+            if bar is None:
+                self._bars[key] = {
+                    'timestamp': span[0],
+                    'open': price,
+                    'high': price,
+                    'low': price,
+                    'close': price,
+                    'volume': volume
+                }
+                self._ends[key] = span[1]
+            else:
+                bar['high'] = max(bar['high'], price)
+                bar['low'] = min(bar['low'], price)
+                bar['close'] = price
+                bar['volume'] += volume
+        return closed
+
+    def flush(self, now: datetime = None, owner=None) -> List[Tuple[str, str, Dict]]:
+        """
+        Close every bar whose end time has passed (call periodically so quiet
+        symbols still close); with an ``owner``, only the bars of its symbols.
+        """
+        now = to_ist(now or datetime.now(IST), self.naive_tz)
+        return [
+            self._close(key) for key, end in list(self._ends.items())
+            if now >= end and (owner is None or self._owners.get(key[0]) is owner)
+        ]
+
+    async def consume(self, broker, symbols: List[str], poll_interval: float = 1.0, clock=None):
+        """
+        Poll ``broker.get_tick`` for ``symbols`` and aggregate until cancelled.
+        Paced by ``clock`` (default: the broker's own, so replays run on virtual time).
+        """
+
+        clock = clock or getattr(broker, "clock", system_clock)
+        clock.register()
+        owner = asyncio.current_task()
+        try:
+            while True:
+                for symbol in symbols:
+                    if not self.claim(symbol, owner):
+                        continue  # Another loop feeds this symbol
+                    try:
+                        tick = await broker.get_tick(symbol)
+                        if tick:
+                            self.on_tick(tick)
+                    except Exception as e:
+                        logger.error(f"Tick error for {symbol}: {e}")
+                self.flush(clock.now(), owner=owner)
+                await clock.sleep(poll_interval)
+        finally:
+            self.release(owner)
+
+    def _close(self, key: Tuple[str, str]) -> Tuple[str, str, Dict]:
+        symbol, interval = key
+        bar = self._bars.pop(key)
+        del self._ends[key]
+        self.store.append(symbol, interval, bar, source=TICKS)
+        self._publish(symbol, interval, bar)
+        return symbol, interval, bar
+
+    def _publish(self, symbol: str, interval: str, bar: Dict):
+        item = (symbol, interval, dict(bar))
+        for queue, loop, sub_interval, symbols in self._subscribers:
+            if sub_interval != interval or (symbols is not None and symbol not in symbols):
+                continue
+            try:
+                running = asyncio.get_running_loop()
+            except RuntimeError:
+                running = None
+            if running is loop:
+                self._put(queue, item)
+            elif not loop.is_closed():
+                # Ticks from a feed thread: hand the bar to the subscriber's loop
+                loop.call_soon_threadsafe(self._put, queue, item)
+
+    @staticmethod
+    def _put(queue: asyncio.Queue, item):
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(item)
+
+
+bar_aggregator = BarAggregator()
@@ -0,0 +1,189 @@
+"""Shared in-memory OHLCV store with a preallocated ring buffer per symbol"""
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from app.core.config import settings
+
+FIELDS = ('open', 'high', 'low', 'close', 'volume')
+
+
+class BarWindow:
+    """Read-only, zero-copy view of the most recent bars of one buffer"""
+
+    def __init__(self, timestamp: np.ndarray, data: np.ndarray):
+        self.timestamp = timestamp
+        self.open, self.high, self.low, self.close, self.volume = data
+
+    def __len__(self) -> int:
+        return len(self.timestamp)
+
+    def to_frame(self) -> pd.DataFrame:
+        """Copy the window into a DataLoader-style DataFrame"""
+        frame = pd.DataFrame({field: getattr(self, field) for field in FIELDS})
+        frame.insert(0, 'timestamp', self.timestamp)
+        return frame
+
+    def records(self, from_date: datetime = None, to_date: datetime = None) -> List[Dict]:
+        """Bars as a list of dicts (API response format), optionally limited to a date range"""
+        mask = slice(None)
+        if from_date is not None or to_date is not None:
+            lo = np.searchsorted(self.timestamp, np.datetime64(from_date, 'ns')) if from_date else 0
+            hi = np.searchsorted(self.timestamp, np.datetime64(to_date, 'ns'), side='right') if to_date else len(self)
+            mask = slice(lo, hi)
+        columns = [pd.DatetimeIndex(self.timestamp[mask]).to_pydatetime().tolist()]
+        columns += [getattr(self, field)[mask].tolist() for field in FIELDS]
+        return [dict(zip(('timestamp',) + FIELDS, values)) for values in zip(*columns)]
+
+
+class RingBuffer:
+    """
+    Fixed-capacity OHLCV ring buffer for one symbol/interval.
+
+    Every bar is written twice, at ``i`` and ``i + capacity``, so the latest
+    ``n <= capacity`` bars are always one contiguous slice and windows can be
+    handed out as NumPy views without copying. There must be a single writer;
+    readers see a bar once ``count`` has been bumped. A view stays valid until
+    ``capacity`` further bars have been written.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.count = 0  # Bars written so far (including overwritten ones)
+        self.updated_at = None  # time.monotonic() of the last write
+        self._timestamp = np.zeros(2 * capacity, dtype='datetime64[ns]')
+        self._data = np.zeros((len(FIELDS), 2 * capacity), dtype=float)
+
+    def __len__(self) -> int:
+        return min(self.count, self.capacity)
+
+    @property
+    def last_timestamp(self) -> Optional[np.datetime64]:
+        if not self.count:
+            return None
+        return self._timestamp[(self.count - 1) % self.capacity]
+
+    def append(self, timestamp, values: Tuple[float, ...]) -> bool:
+        """
+        Write one bar. A bar with the same timestamp as the last one replaces
+        it (a still-forming bar); older bars are ignored.
+        """
+        timestamp = np.datetime64(timestamp, 'ns')
+        last = self.last_timestamp
+        if last is not None and timestamp < last:
+            return False
+        if last is not None and timestamp == last:
+            pos = (self.count - 1) % self.capacity
+        else:
+            pos = self.count % self.capacity
+        self._timestamp[pos] = self._timestamp[pos + self.capacity] = timestamp
+        self._data[:, pos] = self._data[:, pos + self.capacity] = values
+        if last is None or timestamp > last:
+            self.count += 1
+        self.updated_at = time.monotonic()
+        return True
+
+    def extend(self, timestamps: np.ndarray, data: np.ndarray) -> int:
+        """Write bars in bulk (``data`` shaped like FIELDS x n); returns bars added or replaced"""
+        timestamps = np.asarray(timestamps, dtype='datetime64[ns]')
+        last = self.last_timestamp
+        written = 0
+        if last is not None:
+            keep = timestamps >= last
+            timestamps, data = timestamps[keep], data[:, keep]
+            if len(timestamps) and timestamps[0] == last:
+                written += self.append(timestamps[0], data[:, 0])
+                timestamps, data = timestamps[1:], data[:, 1:]
+        if len(timestamps) > self.capacity:
+            timestamps, data = timestamps[-self.capacity:], data[:, -self.capacity:]
+        n = len(timestamps)
+        if not n:
+            return written
+
+        pos = (self.count + np.arange(n)) % self.capacity
+        for offset in (0, self.capacity):
+            self._timestamp[pos + offset] = timestamps
+            self._data[:, pos + offset] = data
+        self.count += n
+        self.updated_at = time.monotonic()
+        return written + n
+
+    def window(self, n: int = None) -> BarWindow:
+        """The latest ``n`` bars (all buffered bars by default) as views"""
+        size = len(self)
+        n = size if n is None else min(n, size)
+        end = (self.count - 1) % self.capacity + self.capacity + 1 if self.count else 0
+        start = end - n
+        return BarWindow(self._timestamp[start:end], self._data[:, start:end])
+
+
+# Writers: each source owns its own buffers, so no buffer ever has two writers
+TICKS = 'ticks'  # BarAggregator, bars built from broker ticks
+POLL = 'poll'  # TradingEngine, bars polled from the history API
+SOURCES = (TICKS, POLL)
+
+
+class BarStore:
+    """
+    Process-wide registry of ring buffers keyed by (symbol, interval, source).
+
+    Every source is the single writer of its buffers; readers pick a source
+    or take whichever is live (``live_window``).
+    """
+
+    def __init__(self, capacity: int = None):
+        self.capacity = capacity or settings.BAR_STORE_CAPACITY
+        self._buffers: Dict[Tuple[str, str, str], RingBuffer] = {}
+
+    def buffer(self, symbol: str, interval: str, source: str = TICKS) -> RingBuffer:
+        if source not in SOURCES:
+            raise ValueError(f"Unknown bar source: {source}")
+        key = (symbol, interval, source)
+        if key not in self._buffers:
+            self._buffers[key] = RingBuffer(self.capacity)
+        return self._buffers[key]
+
+    def append(self, symbol: str, interval: str, bar: Dict, source: str = TICKS) -> bool:
+        """Write one bar dict (timestamp + OHLCV keys)"""
+        values = tuple(float(bar.get(field, np.nan)) for field in FIELDS)
+        return self.buffer(symbol, interval, source).append(bar['timestamp'], values)
+
+    def extend(self, symbol: str, interval: str, bars: Union[pd.DataFrame, Iterable[Dict]],
+               source: str = TICKS) -> int:
+        """Write a DataLoader frame or a list of bar dicts; returns bars added or replaced"""
+        if not isinstance(bars, pd.DataFrame):
+            bars = pd.DataFrame(list(bars))
+        if bars.empty:
+            return 0
+        data = np.vstack([
+            bars[field].to_numpy(dtype=float) if field in bars else np.full(len(bars), np.nan)
+            for field in FIELDS
+        ])
+        timestamps = pd.DatetimeIndex(bars['timestamp'])
+        if timestamps.tz is not None:
+            timestamps = timestamps.tz_localize(None)
+        return self.buffer(symbol, interval, source).extend(timestamps.to_numpy(), data)
+
+    def window(self, symbol: str, interval: str, n: int = None, source: str = TICKS) -> BarWindow:
+        return self.buffer(symbol, interval, source).window(n)
+
+    def is_live(self, symbol: str, interval: str, max_age: float, source: str = TICKS) -> bool:
+        """True if the source's writer updated this buffer within ``max_age`` seconds"""
+        buf = self._buffers.get((symbol, interval, source))
+        return buf is not None and buf.updated_at is not None and time.monotonic() - buf.updated_at < max_age
+
+    def live_window(self, symbol: str, interval: str, max_age: float) -> Optional[BarWindow]:
+        """Window of the most recently updated live source, or None (read-only: never creates buffers)"""
+        live = [
+            self._buffers[(symbol, interval, source)] for source in SOURCES
+            if self.is_live(symbol, interval, max_age, source)
+        ]
+        if not live:
+            return None
+        return max(live, key=lambda buf: buf.updated_at).window()
+
+
+bar_store = BarStore()
@@ -0,0 +1,105 @@
+"""Clocks for trading loops: wall-clock time, or virtual time for replays"""
+import asyncio
+import heapq
+import itertools
+import time as _time
+from datetime import datetime, timedelta
+from typing import Optional
+
+from app.core.market_hours import IST
+
+
+class Clock:
+    """Wall-clock market time (naive IST) and real sleeps"""
+
+    realtime = True
+
+    def now(self) -> datetime:
+        return datetime.now(IST).replace(tzinfo=None)
+
+    def register(self, task: asyncio.Task = None):
+        """Declare a loop that paces itself with this clock (only matters for virtual time)"""
+
+    async def sleep(self, seconds: float):
+        await asyncio.sleep(seconds)
+
+    async def sleep_until(self, when: datetime):
+        await self.sleep(max((when - self.now()).total_seconds(), 0.0))
+
+
+system_clock = Clock()
+
+
+class VirtualClock(Clock):
+    """
+    Simulated market time starting at ``start``.
+
+    With a ``speed`` the clock runs that many times faster than the wall
+    clock and sleeps are shortened to match. Without one it is a
+    discrete-event clock: time only moves when every registered task (and
+    every task that has slept on the clock) is parked in ``sleep``, and
+    then jumps straight to the earliest wake-up, so loops run as fast as
+    their own work allows. Register loops when they are created so time
+    cannot run ahead while they do their first piece of work.
+    """
+
+    def __init__(self, start: datetime = None, speed: Optional[float] = None):
+        self.start = start or system_clock.now()
+        self.speed = speed or None
+        self._wall_start = _time.monotonic()
+        self._now = self.start
+
+        self._sleepers = []  # heap of (wake time, seq, future)
+        self._parked = {}  # task -> its pending sleep future (None while working)
+        self._seq = itertools.count()
+        self._driver: Optional[asyncio.Task] = None
+
+    @property
+    def realtime(self) -> bool:
+        return False
+
+    def now(self) -> datetime:
+        if self.speed:
+            return self.start + timedelta(seconds=(_time.monotonic() - self._wall_start) * self.speed)
+        return self._now
+
+    async def sleep(self, seconds: float):
+        if self.speed:
+            await asyncio.sleep(max(seconds, 0.0) / self.speed)
+            return
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        heapq.heappush(self._sleepers, (self._now + timedelta(seconds=max(seconds, 0.0)), next(self._seq), future))
+        task = asyncio.current_task()
+        self.register(task)
+        self._parked[task] = future
+        if self._driver is None or self._driver.done() or self._driver.get_loop() is not loop:
+            self._driver = loop.create_task(self._drive())
+        await future
+
+    def register(self, task: asyncio.Task = None):
+        task = task or asyncio.current_task()
+        if task not in self._parked:
+            self._parked[task] = None
+            task.add_done_callback(lambda t: self._parked.pop(t, None))
+
+    async def _drive(self):
+        while self._sleepers:
+            await asyncio.sleep(0)  # Let woken tasks run up to their next await
+            busy = [task for task, future in self._parked.items() if (future is None or future.done()) and not task.done()]
+            if busy:
+                # Someone is still working (thread pool, inference, ...): wait for it to park
+                await asyncio.sleep(0.001)
+                continue
+
+            while self._sleepers and self._sleepers[0][2].done():
+                heapq.heappop(self._sleepers)  # Cancelled sleep
+            if not self._sleepers:
+                break
+            wake = self._sleepers[0][0]
+            self._now = max(self._now, wake)
+            while self._sleepers and self._sleepers[0][0] <= self._now:
+                _, _, future = heapq.heappop(self._sleepers)
+                if not future.done():
+                    future.set_result(None)
@@ -0,0 +1,197 @@
+"""Persistent Parquet cache for OHLCV history"""
+import os
+import re
+from datetime import datetime
+from typing import Optional
+
+import pandas as pd
+
+from app.core.config import settings
+from app.core.files import atomic_write
+from app.core.market_hours import IST, SESSION_OPEN
+
+# yfinance period strings -> calendar offsets (trading-day periods use business days)
+_PERIODS = {
+    'd': lambda n: pd.offsets.BDay(n),
+    'wk': lambda n: pd.DateOffset(weeks=n),
+    'mo': lambda n: pd.DateOffset(months=n),
+    'y': lambda n: pd.DateOffset(years=n),
+}
+
+_INTERVALS = {
+    'm': 'min',
+    'h': 'h',
+    'd': 'D',
+    'wk': 'W',
+    'mo': 'D',
+}
+
+# How far back yfinance serves intraday intervals; older starts return nothing
+INTRADAY_LIMITS = {'1m': pd.Timedelta(days=7)}
+INTRADAY_LIMIT = pd.Timedelta(days=60)
+
+
+def exchange_now() -> pd.Timestamp:
+    """Current NSE wall-clock time, naive like the cached bar timestamps"""
+    return pd.Timestamp(datetime.now(IST).replace(tzinfo=None))
+
+
+def last_session(now: datetime = None) -> pd.Timestamp:
+    """Date of the most recent trading session that has opened (weekends and pre-open roll back)"""
+    now = pd.Timestamp(now or exchange_now())
+    day = now.normalize()
+    if now.time() < SESSION_OPEN:
+        day -= pd.Timedelta(days=1)
+    return pd.offsets.BDay().rollback(day)
+
+
+def download_limit(interval: str) -> Optional[pd.Timedelta]:
+    """Oldest history yfinance returns for ``interval`` (None = unlimited)"""
+    if not re.fullmatch(r'\d+(m|h)', interval):
+        return None
+    return INTRADAY_LIMITS.get(interval, INTRADAY_LIMIT)
+
+
+def period_start(period: str, now: datetime = None) -> Optional[pd.Timestamp]:
+    """First timestamp covered by a yfinance-style period ('5d', '1mo', '2y', 'ytd', 'max')"""
+    now = pd.Timestamp(now or exchange_now())
+    if period == 'max':
+        return None
+    if period == 'ytd':
+        return now.normalize().replace(month=1, day=1)
+    match = re.fullmatch(r'(\d+)(d|wk|mo|y)', period)
+    if not match:
+        raise ValueError(f"Unsupported period: {period}")
+    n, unit = int(match.group(1)), match.group(2)
+    if unit == 'd':
+        # Trading days counted back from the last session, so '1d' on a weekend is Friday
+        return last_session(now) - _PERIODS[unit](max(n - 1, 0))
+    return now.normalize() - _PERIODS[unit](n)
+
+
+def interval_delta(interval: str) -> pd.Timedelta:
+    """Bar length for a yfinance-style interval ('1m', '5m', '1h', '1d', ...)"""
+    match = re.fullmatch(r'(\d+)(m|h|d|wk|mo)', interval)
+    if not match:
+        raise ValueError(f"Unsupported interval: {interval}")
+    n, unit = int(match.group(1)), match.group(2)
+    if unit == 'mo':
+        n *= 30
+    return pd.Timedelta(n, _INTERVALS[unit])
+
+
+class OHLCVCache:
+    """
+    One Parquet file per (symbol, interval) holding every bar fetched so far.
+
+    Besides the bars, each file records in its metadata the earliest start the
+    cache is known to cover and when it was last refreshed from the network.
+
+    Refreshes only add the last session or so, so ``append`` writes those bars
+    to a small ``.tail.parquet`` file next to the main one instead of
+    rewriting the full history; ``read`` merges the two. Once the tail holds
+    ``compact_rows`` bars it is folded into the main file.
+    """
+
+    compact_rows = 5000
+
+    def __init__(self, cache_dir: str = None, compact_rows: int = None):
+        self.cache_dir = cache_dir or settings.DATA_CACHE_DIR
+        if compact_rows is not None:
+            self.compact_rows = compact_rows
+
+    def path(self, symbol: str, interval: str) -> str:
+        safe_symbol = re.sub(r'[^A-Za-z0-9._-]', '_', symbol)
+        return os.path.join(self.cache_dir, f"{safe_symbol}_{interval}.parquet")
+
+    def tail_path(self, symbol: str, interval: str) -> str:
+        return self.path(symbol, interval)[:-len('.parquet')] + '.tail.parquet'
+
+    def read(self, symbol: str, interval: str) -> Optional[pd.DataFrame]:
+        """Cached bars (with ``attrs`` metadata) or None"""
+        base = self._read(self.path(symbol, interval))
+        tail = self._read(self.tail_path(symbol, interval))
+        if tail is None:
+            return base
+        # The tail carries the metadata of the latest refresh
+        merged = self.merge(base, tail)
+        merged.attrs = dict(tail.attrs)
+        return merged
+
+    def write(self, symbol: str, interval: str, df: pd.DataFrame,
+              coverage_start: Optional[pd.Timestamp], fetched_at: datetime = None):
+        """Replace the cached bars for symbol/interval"""
+        # Drop the tail first: if the rewrite fails the old main file still stands on its own
+        tail_path = self.tail_path(symbol, interval)
+        if os.path.exists(tail_path):
+            os.remove(tail_path)
+        self._write(self.path(symbol, interval), df, coverage_start, fetched_at)
+
+    def append(self, symbol: str, interval: str, fresh: pd.DataFrame,
+               coverage_start: Optional[pd.Timestamp], fetched_at: datetime = None):
+        """Add refreshed bars to the tail file, compacting it into the main file once it grows"""
+        tail = self.merge(self._read(self.tail_path(symbol, interval)), fresh)
+        if len(tail) < self.compact_rows:
+            self._write(self.tail_path(symbol, interval), tail, coverage_start, fetched_at)
+            return
+        merged = self.merge(self._read(self.path(symbol, interval)), tail)
+        # Main file first: a crash before the tail is removed only leaves duplicate bars
+        self._write(self.path(symbol, interval), merged, coverage_start, fetched_at)
+        os.remove(self.tail_path(symbol, interval))
+
+    @staticmethod
+    def _read(path: str) -> Optional[pd.DataFrame]:
+        if not os.path.exists(path):
+            return None
+        return pd.read_parquet(path)
+
+    @staticmethod
+    def _write(path: str, df: pd.DataFrame, coverage_start: Optional[pd.Timestamp], fetched_at: datetime = None):
+        df = df.reset_index(drop=True)
+        df.attrs = {
+            'coverage_start': coverage_start.isoformat() if coverage_start is not None else 'max',
+            'fetched_at': pd.Timestamp(fetched_at or exchange_now()).isoformat(),
+        }
+        with atomic_write(path) as tmp_path:
+            df.to_parquet(tmp_path, index=False)
+
+    @staticmethod
+    def merge(cached: Optional[pd.DataFrame], fresh: pd.DataFrame) -> pd.DataFrame:
+        """Append fresh bars, letting them replace cached bars with the same timestamp"""
+        if cached is None or cached.empty:
+            return fresh.sort_values('timestamp').reset_index(drop=True)
+        merged = pd.concat([cached, fresh], ignore_index=True)
+        merged = merged.drop_duplicates(subset='timestamp', keep='last')
+        return merged.sort_values('timestamp').reset_index(drop=True)
+
+    @staticmethod
+    def covers(cached: Optional[pd.DataFrame], start: Optional[pd.Timestamp]) -> bool:
+        """Whether the cached range reaches back to ``start``"""
+        if cached is None or cached.empty:
+            return False
+        coverage = cached.attrs.get('coverage_start')
+        if coverage == 'max':
+            return True
+        if start is None:
+            return False
+        first = cached['timestamp'].iloc[0]
+        if coverage:
+            first = min(first, pd.Timestamp(coverage))
+        return first <= start
+
+    @staticmethod
+    def tail_reachable(cached: pd.DataFrame, interval: str, now: datetime = None) -> bool:
+        """Whether the bars since the last cached session are still downloadable for ``interval``"""
+        limit = download_limit(interval)
+        if limit is None:
+            return True
+        last = cached['timestamp'].iloc[-1].normalize()
+        return pd.Timestamp(now or exchange_now()) - last < limit
+
+    @staticmethod
+    def is_fresh(cached: pd.DataFrame, interval: str, now: datetime = None) -> bool:
+        """True if the cache was refreshed less than one bar ago"""
+        fetched_at = cached.attrs.get('fetched_at')
+        if not fetched_at:
+            return False
+        return pd.Timestamp(now or exchange_now()) - pd.Timestamp(fetched_at) < interval_delta(interval)
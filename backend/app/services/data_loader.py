@@ -2,30 +2,103 @@ import yfinance as yf
 import pandas as pd
 from datetime import datetime, timedelta
 from typing import List, Optional
+from app.core.config import settings
+from app.services.data_cache import OHLCVCache, period_start
 
 class DataLoader:
     """Service to load market data from yfinance"""
     
     @staticmethod
-    def fetch_history(symbol: str, period: str = "2y", interval: str = "1h") -> pd.DataFrame:
+    def fetch_history(symbol: str, period: str = "2y", interval: str = "1h", use_cache: bool = True) -> pd.DataFrame:
         """
         Fetch historical data for a symbol
         
+        Bars are served from the local Parquet cache when it already covers the
+        requested period; only the missing tail since the last cached bar is
+        downloaded and merged in (or the whole period, once that tail is older
+        than yfinance serves for intraday intervals).
+        
         Args:
             symbol: Ticker symbol (e.g., ^NSEI for NIFTY 50, RELIANCE.NS)
             period: Data period (1d, 5d, 1mo, 3mo, 6mo, 1y, 2y, 5y, 10y, ytd, max)
             interval: Data interval (1m, 2m, 5m, 15m, 30m, 60m, 90m, 1h, 1d, 5d, 1wk, 1mo, 3mo)
+            use_cache: Read/write the on-disk cache (settings.DATA_CACHE_ENABLED must also be set)
         """
         # Add .NS suffix if not present and not an index
         if not symbol.startswith("^") and not symbol.endswith(".NS"):
             symbol = f"{symbol}.NS"
-            
+        
+        if not (use_cache and settings.DATA_CACHE_ENABLED):
+            df = DataLoader._download(symbol, interval, period=period)
+            if df.empty:
+                raise ValueError(f"No data found for symbol {symbol}")
+            return df
+        
+        cache = OHLCVCache()
+        cached = cache.read(symbol, interval)
+        start = period_start(period)
+        covered = cache.covers(cached, start)
+        
+        if settings.DATA_OFFLINE or (covered and cache.is_fresh(cached, interval)):
+            if cached is None:
+                raise ValueError(f"No cached data for symbol {symbol} ({interval})")
+            return DataLoader._slice(cached, start)
+        
+        # Intraday history older than yfinance's window cannot be downloaded,
+        # so a cache whose last bar is past it is refetched in full
+        extend = covered and cache.tail_reachable(cached, interval)
+        try:
+            if extend:
+                # Refetch from the start of the last cached session so a
+                # partially formed last bar gets replaced
+                last = cached['timestamp'].iloc[-1]
+                fresh = DataLoader._download(symbol, interval, start=last.normalize())
+                coverage = cached.attrs.get('coverage_start')
+                coverage = None if coverage == 'max' else pd.Timestamp(coverage)
+            else:
+                fresh = DataLoader._download(symbol, interval, period=period)
+                coverage = start
+        except Exception as e:
+            if cached is None or cached.empty:
+                raise
+            print(f"Fetch failed for {symbol} ({e}), serving cached data")
+            return DataLoader._slice(cached, start)
+        
+        if fresh.empty:
+            # Keep fetched_at as it was so the next call tries again
+            if cached is None or cached.empty:
+                raise ValueError(f"No data found for symbol {symbol}")
+            print(f"No new bars for {symbol} ({interval}), serving cached data")
+            return DataLoader._slice(cached, start)
+        
+        if not extend and cached is not None and not cached.empty:
+            # Keep the older bars only if the new ones reach them without a gap
+            if fresh['timestamp'].iloc[0] <= cached['timestamp'].iloc[-1]:
+                old_coverage = cached.attrs.get('coverage_start')
+                if start is not None and old_coverage:
+                    coverage = None if old_coverage == 'max' else min(start, pd.Timestamp(old_coverage))
+            else:
+                cached = None
+        
+        merged = cache.merge(cached, fresh)
+        if extend:
+            cache.append(symbol, interval, fresh, coverage)
+        else:
+            cache.write(symbol, interval, merged, coverage)
+        return DataLoader._slice(merged, start)
+    
+    @staticmethod
+    def _download(symbol: str, interval: str, period: str = None, start=None) -> pd.DataFrame:
+        """Download bars from yfinance and normalize columns"""
         print(f"Fetching data for {symbol}...")
         ticker = yf.Ticker(symbol)
-        df = ticker.history(period=period, interval=interval)
+        if start is not None:
+            df = ticker.history(start=start, interval=interval)
+        else:
+            df = ticker.history(period=period, interval=interval)
         
         if df.empty:
-            raise ValueError(f"No data found for symbol {symbol}")
+            return pd.DataFrame(columns=['timestamp'])
             
         # Reset index to make Date/Datetime a column
         df.reset_index(inplace=True)
@@ -44,6 +117,15 @@ class DataLoader:
              df['timestamp'] = df['timestamp'].dt.tz_localize(None)
 
         return df
+    
+    @staticmethod
+    def _slice(df: pd.DataFrame, start: Optional[pd.Timestamp]) -> pd.DataFrame:
+        """Bars from ``start`` onwards, without cache metadata"""
+        if start is not None:
+            df = df[df['timestamp'] >= start]
+        df = df.reset_index(drop=True)
+        df.attrs = {}
+        return df
 
     @staticmethod
     def get_indian_indices() -> List[str]:
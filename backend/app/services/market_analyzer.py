@@ -1,10 +1,11 @@
 """Real-time market analysis service"""
 import asyncio
-import numpy as np
-from datetime import datetime
 from typing import Dict, List
 from app.ml.features import FeatureEngine
 from app.brokers.factory import get_broker
+from app.services.bar_store import bar_store
+from app.services.bar_aggregator import bar_aggregator
+from app.services.clock import system_clock
 import logging
 
 logger = logging.getLogger(__name__)
@@ -12,18 +13,23 @@ logger = logging.getLogger(__name__)
 class MarketAnalyzer:
     """Analyzes market in real-time and generates trading signals"""
     
-    def __init__(self):
-        self.broker = get_broker()
+    def __init__(self, broker=None):
+        # Without a broker: the shared default account, fine for reading market data only
+        self.broker = broker or get_broker()
+        self.clock = getattr(self.broker, "clock", system_clock)  # Virtual for mock/replay brokers
         self.is_running = False
         self.active_symbols = []
         self.model = None
+        self.feature_cols = None
         self.confidence_threshold = 0.90  # 90% confidence
-        self.historical_data = {}
+        self.interval = "1m"  # Patterns are evaluated on closed 1-minute bars built from ticks
+        self._bars_seen = {}  # symbol -> bar store count at the last evaluation
         
     async def start_analysis(self, symbols: List[str], model_path: str = None):
         """Start real-time market analysis"""
         self.is_running = True
         self.active_symbols = symbols
+        self.clock.register()
         
         # Load trained model if provided
         if model_path:
@@ -31,40 +37,38 @@ class MarketAnalyzer:
         
         logger.info(f"Started market analysis for {symbols}")
         
-        while self.is_running:
-            for symbol in self.active_symbols:
-                try:
-                    signal = await self.analyze_symbol(symbol)
-                    if signal:
-                        yield signal
-                except Exception as e:
-                    logger.error(f"Error analyzing {symbol}: {e}")
-            
-            await asyncio.sleep(1)  # Check every second
+        try:
+            while self.is_running:
+                for symbol in self.active_symbols:
+                    try:
+                        signal = await self.analyze_symbol(symbol)
+                        if signal:
+                            yield signal
+                    except Exception as e:
+                        logger.error(f"Error analyzing {symbol}: {e}")
+                
+                # Close bars of symbols that stopped ticking (e.g. at 15:30)
+                bar_aggregator.flush(self.clock.now(), owner=self)
+                await self.clock.sleep(1)  # Check every second
+        finally:
+            bar_aggregator.release(self)
     
     async def analyze_symbol(self, symbol: str) -> Dict:
         """Analyze single symbol and generate signal"""
         # Get latest tick
         tick = await self.broker.get_tick(symbol)
         
-        # Update historical data
-        if symbol not in self.historical_data:
-            self.historical_data[symbol] = []
-        
-        self.historical_data[symbol].append({
-            'timestamp': tick['timestamp'],
-            'close': tick['last'],
-            'high': tick['high'],
-            'low': tick['low'],
-            'volume': tick['volume']
-        })
-        
-        # Keep only last 100 candles
-        if len(self.historical_data[symbol]) > 100:
-            self.historical_data[symbol] = self.historical_data[symbol][-100:]
+        # Build real OHLCV bars from the ticks; only react when a bar closes.
+        # One analyzer writes each symbol's bars, the others read them
+        if bar_aggregator.claim(symbol, self):
+            bar_aggregator.on_tick(tick)
+        buffer = bar_store.buffer(symbol, self.interval)
+        if buffer.count == self._bars_seen.get(symbol, 0):
+            return None
+        self._bars_seen[symbol] = buffer.count
         
         # Need at least 50 candles for analysis
-        if len(self.historical_data[symbol]) < 50:
+        if len(bar_store.buffer(symbol, self.interval)) < 50:
             return None
         
         # Detect patterns
@@ -76,7 +80,7 @@ class MarketAnalyzer:
                 'action': pattern['action'],
                 'confidence': pattern['confidence'],
                 'price': tick['last'],
-                'timestamp': datetime.utcnow(),
+                'timestamp': self.clock.now(),
                 'pattern_name': pattern['name'],
                 'reason': pattern['reason']
             }
@@ -85,19 +89,19 @@ class MarketAnalyzer:
     
     def detect_pattern(self, symbol: str) -> Dict:
         """Detect trading patterns with confidence score"""
-        data = self.historical_data[symbol]
-        prices = [d['close'] for d in data]
+        # Last 100 candles as a zero-copy view
+        prices = bar_store.window(symbol, self.interval, 100).close
         
         # Calculate indicators
-        sma_20 = np.mean(prices[-20:])
-        sma_50 = np.mean(prices[-50:])
+        sma_20 = prices[-20:].mean()
+        sma_50 = prices[-50:].mean()
         current_price = prices[-1]
         
         # Price momentum
         momentum = (current_price - prices[-10]) / prices[-10]
         
         # Volatility
-        volatility = np.std(prices[-20:]) / np.mean(prices[-20:])
+        volatility = prices[-20:].std() / prices[-20:].mean()
         
         # Pattern 1: Golden Cross (SMA 20 crosses above SMA 50)
         if sma_20 > sma_50 and momentum > 0.01:
@@ -120,7 +124,7 @@ class MarketAnalyzer:
             }
         
         # Pattern 3: Breakout (price breaks above recent high with volume)
-        recent_high = max(prices[-20:-1])
+        recent_high = prices[-20:-1].max()
         if current_price > recent_high * 1.005 and momentum > 0.015:
             return {
                 'name': 'Breakout',
@@ -130,7 +134,7 @@ class MarketAnalyzer:
             }
         
         # Pattern 4: Breakdown (price breaks below recent low)
-        recent_low = min(prices[-20:-1])
+        recent_low = prices[-20:-1].min()
         if current_price < recent_low * 0.995 and momentum < -0.015:
             return {
                 'name': 'Breakdown',
@@ -142,11 +146,18 @@ class MarketAnalyzer:
         return None
     
     def load_model(self, model_path: str):
-        """Load trained ML model"""
-        # TODO: Load from MLflow or pickle
-        pass
+        """Load trained ML model (a pickle path or a registered model name)"""
+        from app.ml.registry import load_artifact, model_registry
+        import os
+        
+        if os.path.exists(model_path):
+            self.model = load_artifact(model_path)
+            self.feature_cols = list(getattr(self.model, 'feature_names_in_', []))
+        else:
+            self.model, self.feature_cols = model_registry.load(model_path)
     
     def stop_analysis(self):
         """Stop market analysis"""
         self.is_running = False
+        bar_aggregator.release(self)
         logger.info("Stopped market analysis")
@@ -0,0 +1,279 @@
+"""Write-behind persistence for orders and positions"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError
+
+from app.core.config import settings
+from app.models.order import Order, OrderSide, OrderStatus, OrderType
+from app.models.position import Position
+
+logger = logging.getLogger(__name__)
+
+MAX_RETRY_DELAY = 30.0  # Seconds between retries while the database is unavailable
+
+
+class OrderWriter:
+    """
+    Queue of order inserts and position updates written in batches by one
+    background thread.
+
+    ``submit_*`` only appends the write to a local journal (no fsync) and
+    queues it, so trading loops never wait on the database. The writer
+    thread fsyncs the journal, then commits up to ``batch_size`` writes per
+    transaction. Writes still in the journal when the process dies are
+    replayed on the next start; both kinds are idempotent (orders are
+    skipped when their ext_id exists, positions carry their full state), so
+    replaying an already committed write is harmless. The journal is
+    truncated whenever everything submitted has been committed.
+    """
+
+    def __init__(self, session_factory: Callable = None, journal_path: str = None,
+                 batch_size: int = None, interval: float = None, retry_delay: float = 1.0):
+        self._session_factory = session_factory
+        self.journal_path = journal_path or settings.ORDER_JOURNAL_PATH
+        self.batch_size = batch_size or settings.ORDER_WRITER_BATCH
+        self.interval = interval if interval is not None else settings.ORDER_WRITER_INTERVAL
+        self.retry_delay = retry_delay
+
+        self._pending = deque()
+        self._cond = threading.Condition()
+        self._submitted = 0
+        self._committed = 0
+        self._flush_target = 0
+        self._journal = None
+        self._journal_dirty = False
+        self._thread: Optional[threading.Thread] = None
+        self._closing = False
+        self.stats = {"batches": 0, "writes": 0, "dropped": 0, "replayed": 0}
+
+    @property
+    def session_factory(self) -> Callable:
+        if self._session_factory is None:
+            from app.core.database import SessionLocal
+            self._session_factory = SessionLocal
+        return self._session_factory
+
+    # Producers (any thread, including the event loop)
+
+    def submit_order(self, ext_id: str, user_id: int, symbol: str, side: OrderSide, type: OrderType, qty: int,
+                     price: float = None, status: OrderStatus = OrderStatus.SUBMITTED, strategy_id: int = None,
+                     created_at: datetime = None):
+        """Queue an order insert; ``created_at`` defaults to the database time (pass the trading clock's in replays)"""
+        self._submit({
+            "kind": "order", "ext_id": ext_id, "user_id": user_id, "strategy_id": strategy_id, "symbol": symbol,
+            "side": OrderSide(side).value, "type": OrderType(type).value, "qty": qty, "price": price,
+            "status": OrderStatus(status).value, "created_at": created_at.isoformat() if created_at else None
+        })
+
+    def submit_position(self, user_id: int, symbol: str, side: OrderSide = None, qty: int = 0, avg_price: float = None):
+        """Set the stored position for (user_id, symbol); qty <= 0 deletes it"""
+        self._submit({
+            "kind": "position", "user_id": user_id, "symbol": symbol,
+            "side": OrderSide(side).value if side else None, "qty": qty, "avg_price": avg_price
+        })
+
+    def queued_positions(self, user_id: int) -> List[Dict]:
+        """Position writes for ``user_id`` not committed yet, oldest first"""
+        with self._cond:
+            return [dict(w) for w in self._pending if w["kind"] == "position" and w["user_id"] == user_id]
+
+    def start(self):
+        """Replay writes left in the journal and start the writer (also done on the first submit)"""
+        with self._cond:
+            if self._thread is None:
+                self._start()
+
+    def _submit(self, write: Dict):
+        with self._cond:
+            if self._thread is None:
+                self._start()
+            self._closing = False
+            self._append_journal(write)
+            self._pending.append(write)
+            self._submitted += 1
+            if len(self._pending) >= self.batch_size:
+                self._cond.notify_all()
+
+    def flush(self, timeout: float = None) -> bool:
+        """Block until everything submitted so far is committed; False on timeout"""
+        with self._cond:
+            target = self._submitted
+            self._flush_target = max(self._flush_target, target)
+            self._cond.notify_all()
+            return self._cond.wait_for(lambda: self._committed >= target, timeout)
+
+    def close(self, timeout: float = 30.0):
+        """
+        Flush and stop the writer thread (app shutdown). On a timeout the
+        thread keeps retrying in the background and stops once the queue is
+        empty; a submit before then keeps it running.
+        """
+        thread = self._thread
+        if thread is None:
+            return
+        flushed = self.flush(timeout)
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        thread.join(timeout)
+        if not flushed:
+            logger.error(f"Order writer closing with {len(self._pending)} writes left in {self.journal_path}")
+
+    # Journal
+
+    def _start(self):
+        """Replay a leftover journal, then start the writer thread (caller holds the lock)"""
+        # Writes still queued are the journal's uncommitted tail already:
+        # replaying it would queue them twice
+        replayed = [] if self._pending else self._read_journal()
+        for write in replayed:
+            self._pending.append(write)
+            self._submitted += 1
+        self.stats["replayed"] += len(replayed)
+        if replayed:
+            logger.warning(f"Replaying {len(replayed)} uncommitted writes from {self.journal_path}")
+        os.makedirs(os.path.dirname(os.path.abspath(self.journal_path)), exist_ok=True)
+        self._journal = open(self.journal_path, "a", encoding="utf-8")
+        self._thread = threading.Thread(target=self._run, name="order-writer", daemon=True)
+        self._thread.start()
+
+    def _read_journal(self) -> List[Dict]:
+        if not os.path.exists(self.journal_path):
+            return []
+        writes = []
+        with open(self.journal_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    writes.append(json.loads(line))
+                except json.JSONDecodeError:
+                    break  # Torn last line from a crash mid-write
+        return writes
+
+    def _append_journal(self, write: Dict):
+        self._journal.write(json.dumps(write) + "\n")
+        self._journal.flush()  # Into the OS cache: survives a process crash
+        self._journal_dirty = True
+
+    def _sync_journal(self):
+        with self._cond:
+            if not self._journal_dirty or self._journal is None:
+                return
+            fd = self._journal.fileno()
+            self._journal_dirty = False
+        os.fsync(fd)  # Off the order path: bounds what a power loss can take to one interval
+
+    # Writer thread
+
+    def _run(self):
+        delay = self.retry_delay
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._closing or len(self._pending) >= self.batch_size
+                                    or self._committed < self._flush_target, self.interval)
+                if not self._pending:
+                    if self._closing:
+                        self._journal.close()
+                        self._journal = None
+                        self._thread = None
+                        self._closing = False
+                        return
+                    continue
+                batch = [self._pending[i] for i in range(min(self.batch_size, len(self._pending)))]
+
+            self._sync_journal()
+            try:
+                self._write(batch)
+            except OperationalError as e:
+                # Database unreachable/locked/not migrated: keep the writes queued (and journaled) and retry
+                logger.error(f"Order writer batch failed, retrying in {delay:.0f}s: {e}")
+                time.sleep(delay)
+                delay = min(delay * 2, MAX_RETRY_DELAY)
+                continue
+            delay = self.retry_delay
+
+            with self._cond:
+                for _ in batch:
+                    self._pending.popleft()
+                self._committed += len(batch)
+                self.stats["batches"] += 1
+                self.stats["writes"] += len(batch)
+                if not self._pending and self._journal is not None:
+                    self._journal.truncate(0)
+                    self._journal_dirty = True
+                self._cond.notify_all()
+
+    def _write(self, batch: List[Dict]):
+        db = self.session_factory()
+        try:
+            try:
+                self._apply(db, batch)
+                db.commit()
+            except OperationalError:
+                raise
+            except Exception as e:
+                # One bad write must not block the queue: retry them one per transaction
+                db.rollback()
+                logger.error(f"Order writer batch rejected ({e}), writing one by one")
+                for write in batch:
+                    try:
+                        self._apply(db, [write])
+                        db.commit()
+                    except OperationalError:
+                        raise
+                    except Exception as e:
+                        db.rollback()
+                        self.stats["dropped"] += 1
+                        logger.error(f"Dropped {write['kind']} write {write}: {e}")
+        finally:
+            db.close()
+
+    def _apply(self, db, batch: List[Dict]):
+        from app.services.analytics import AnalyticsService
+
+        ext_ids = [w["ext_id"] for w in batch if w["kind"] == "order"]
+        existing = set(db.scalars(select(Order.ext_id).where(Order.ext_id.in_(ext_ids)))) if ext_ids else set()
+
+        for write in batch:
+            if write["kind"] == "order":
+                if write["ext_id"] in existing:
+                    continue  # Replay of a committed write
+                existing.add(write["ext_id"])
+                fields = {k: v for k, v in write.items() if k != "kind"}
+                created_at = fields.pop("created_at", None)
+                order = Order(**{
+                    **fields, "side": OrderSide(fields["side"]), "type": OrderType(fields["type"]),
+                    "status": OrderStatus(fields["status"])
+                })
+                if created_at:
+                    order.created_at = datetime.fromisoformat(created_at)
+                if order.status == OrderStatus.FILLED:
+                    AnalyticsService(db, order.user_id).record_fill(order, commit=False)
+                else:
+                    db.add(order)
+
+            elif write["kind"] == "position":
+                position = db.scalar(select(Position).where(
+                    Position.user_id == write["user_id"], Position.symbol == write["symbol"]
+                ))
+                if write["qty"] <= 0:
+                    if position is not None:
+                        db.delete(position)
+                elif position is None:
+                    db.add(Position(user_id=write["user_id"], symbol=write["symbol"], side=OrderSide(write["side"]),
+                                    qty=write["qty"], avg_price=write["avg_price"]))
+                else:
+                    position.side = OrderSide(write["side"])
+                    position.qty = write["qty"]
+                    position.avg_price = write["avg_price"]
+            db.flush()  # Later writes in the batch see this one
+
+
+order_writer = OrderWriter()
@@ -1,118 +1,160 @@
 import asyncio
 import logging
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from datetime import datetime
+from functools import partial
+from typing import Dict, List, Optional
 from app.brokers.factory import get_broker
+from app.core.config import settings
+from app.core.market_hours import ist_aware
 from app.services.data_loader import DataLoader
+from app.services.bar_store import POLL, bar_store
+from app.services.clock import system_clock
+from app.ml.inference import BatchPredictor
+from app.ml.registry import model_registry
 # from app.ml.predictor import Predictor # We will create this
 
 logger = logging.getLogger(__name__)
 
-class TradingEngine:
-    _instance = None
-    
-    def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super(TradingEngine, cls).__new__(cls)
-            cls._instance.is_running = False
-            cls._instance.symbol = "^NSEI" # Default NIFTY 50
-            cls._instance.task = None
-        return cls._instance
+# Risk Management Settings
+STOP_LOSS_PCT = 0.01  # 1%
+TAKE_PROFIT_PCT = 0.02 # 2%
 
-    def start(self, symbol: str):
-        if self.is_running:
-            return {"status": "already_running"}
-        
+MODEL_PATH = "model.pkl" # Used when nothing is registered under settings.MODEL_NAME
+DEFAULT_USER_ID = 1 # Demo user (init_db.py): owns the engine until a user starts it through the API
+
+def _warm_up_features(df):
+    """Build an incremental feature engine from history (runs in the CPU pool)"""
+    from app.ml.incremental import IncrementalFeatureEngine
+
+    features = IncrementalFeatureEngine()
+    latest_row = features.warm_up(df)
+    return features, latest_row
+
+class SymbolTrader:
+    """Trading loop and state for a single symbol"""
+
+    def __init__(self, engine: "TradingEngine", symbol: str):
+        self.engine = engine
         self.symbol = symbol
+        self.is_running = False
+        self.task = None
+
+        # State
+        self.active_position = None # { 'side': 'buy'/'sell', 'entry_price': float, 'qty': int }
+        self.last_price = None
+        self.last_probability = None
+        self.last_update = None
+        self.last_error = None
+
+    def start(self):
         self.is_running = True
         self.task = asyncio.create_task(self._run_loop())
-        return {"status": "started", "symbol": symbol}
+        self.engine.clock.register(self.task)
 
     def stop(self):
-        if not self.is_running:
-            return {"status": "not_running"}
-        
         self.is_running = False
         if self.task:
             self.task.cancel()
-        return {"status": "stopped"}
+
+    def status(self) -> Dict:
+        return {
+            "symbol": self.symbol,
+            "is_running": self.is_running,
+            "position": self.active_position,
+            "last_price": self.last_price,
+            "last_probability": self.last_probability,
+            "last_update": self.last_update,
+            "last_error": self.last_error
+        }
 
     async def _run_loop(self):
         logger.info(f"Starting trading loop for {self.symbol}")
-        broker = get_broker()
-        
-        # Load model
-        import joblib
-        import pandas as pd
-        from app.ml.features import FeatureEngine
-        
-        try:
-            model = joblib.load("model.pkl")
-            logger.info("ML Model loaded successfully")
-        except Exception as e:
-            logger.error(f"Failed to load model: {e}")
-            model = None
-            
-        # Risk Management Settings
-        STOP_LOSS_PCT = 0.01  # 1%
-        TAKE_PROFIT_PCT = 0.02 # 2%
-        
-        # State
-        active_position = None # { 'side': 'buy'/'sell', 'entry_price': float, 'qty': int }
-        
+        broker = self.engine.broker
+        clock = self.engine.clock
+
+        predictor = await self.engine.refresh_model()
+        if predictor:
+            logger.info(f"ML Model {self.engine.model_version} found, predictions are batched across symbols")
+        else:
+            logger.error(f"Failed to load model: no {settings.MODEL_NAME} registered and {MODEL_PATH} not found")
+
+        features = None # IncrementalFeatureEngine, warmed up on the first fetch
+        latest_row = None
+
         while self.is_running:
             try:
-                # 1. Get Market Data
-                df = DataLoader.fetch_history(self.symbol, period="5d", interval="1m")
-                
+                # 1. Get Market Data (full window once, then only the recent tail)
+                #    Blocking download runs on the I/O thread pool
+                period = "5d" if features is None else "1d"
+                df = await self.engine.run_io(self.engine.fetch_history, self.symbol, period=period, interval="1m")
+
                 if df.empty:
-                    await asyncio.sleep(5)
+                    await clock.sleep(5)
                     continue
-                
-                current_price = df['close'].iloc[-1]
-                
+
+                # Publish bars to the shared store (the forming last bar is
+                # overwritten on the next poll) and read the live price back
+                bar_store.extend(self.symbol, "1m", df, source=POLL)
+                current_price = bar_store.window(self.symbol, "1m", 1, source=POLL).close[-1]
+                self.last_price = float(current_price)
+                self.last_update = clock.now()
+
+                # Feed closed bars (all but the still-forming last one) into the
+                # incremental feature engine instead of recomputing every indicator
+                closed = df.iloc[:-1]
+                if features is None:
+                    if not closed.empty:
+                        features, latest_row = await self.engine.run_cpu(_warm_up_features, closed)
+                else:
+                    closed = closed[closed['timestamp'] > features.last_timestamp]
+                    for bar in closed.to_dict('records'):
+                        latest_row = features.update(bar)
+
                 # 2. Check Risk Management (if position exists)
-                if active_position:
-                    entry_price = active_position['entry_price']
-                    side = active_position['side']
+                if self.active_position:
+                    entry_price = self.active_position['entry_price']
+                    side = self.active_position['side']
                     pnl_pct = 0.0
-                    
+
                     if side == 'buy':
                         pnl_pct = (current_price - entry_price) / entry_price
                     else:
                         pnl_pct = (entry_price - current_price) / entry_price
-                        
+
                     # Check SL/TP
                     exit_reason = None
                     if pnl_pct <= -STOP_LOSS_PCT:
                         exit_reason = "STOP_LOSS"
                     elif pnl_pct >= TAKE_PROFIT_PCT:
                         exit_reason = "TAKE_PROFIT"
-                        
+
                     if exit_reason:
-                        logger.info(f"{exit_reason} Hit! PnL: {pnl_pct*100:.2f}%")
+                        logger.info(f"{self.symbol} {exit_reason} Hit! PnL: {pnl_pct*100:.2f}%")
                         # Close Position
                         exit_side = "sell" if side == "buy" else "buy"
-                        await broker.place_order(self.symbol, exit_side, "market", active_position['qty'])
-                        self._save_order_to_db(self.symbol, exit_side, active_position['qty'], current_price)
-                        active_position = None
-                        await asyncio.sleep(5)
+                        qty = self.active_position['qty']
+                        await broker.place_order(self.symbol, exit_side, "market", qty)
+                        _save_order_to_db(self.engine.user_id, self.symbol, exit_side, qty, current_price, clock.now())
+                        self.active_position = None
+                        await clock.sleep(5)
                         continue
 
                 # 3. Prepare Features & Predict (Only if no position)
-                if not active_position:
-                    df = FeatureEngine.prepare_features(df)
-                    
-                    if not df.empty:
-                        latest_features = df.iloc[[-1]]
-                        exclude_cols = ['label_binary', 'label_regression', 'future_return', 'returns']
-                        feature_cols = [col for col in latest_features.columns if col not in exclude_cols]
-                        
-                        if model:
+                #    Picks up newly registered model versions without a restart
+                predictor = await self.engine.refresh_model()
+                if not self.active_position:
+                    if latest_row is not None and features.is_ready(latest_row):
+                        if predictor:
                             try:
-                                X_pred = latest_features[feature_cols]
-                                prob = model.predict_proba(X_pred)[0][1]
-                                logger.info(f"Prediction Probability: {prob:.4f}")
-                                
+                                # Scored together with the other symbols' rows in one matrix
+                                prob = await predictor.predict(self.symbol, latest_row, features.feature_cols)
+                                self.last_probability = prob
+                                logger.info(f"{self.symbol} Prediction Probability: {prob:.4f}")
+
                                 # 4. Execute Entry
                                 action = None
                                 # Strict thresholds
@@ -120,55 +162,247 @@ class TradingEngine:
                                     action = "buy"
                                 elif prob < 0.2: # Very high confidence Sell
                                     action = "sell"
-                                    
+
                                 if action:
-                                    logger.info(f"Signal: {action.upper()}")
-                                    qty = 50 # 1 Lot NIFTY (approx)
-                                    
+                                    logger.info(f"{self.symbol} Signal: {action.upper()}")
+                                    qty = 50 # Brokers trading futures round this to whole lots
+
                                     # Place order
                                     order_data = await broker.place_order(self.symbol, action, "market", qty)
-                                    
+
                                     # Record Position
-                                    active_position = {
+                                    self.active_position = {
                                         'side': action,
                                         'entry_price': order_data['price'] if order_data.get('price') else current_price,
                                         'qty': qty
                                     }
-                                    
-                                    self._save_order_to_db(self.symbol, action, qty, active_position['entry_price'])
-                                    
+
+                                    _save_order_to_db(self.engine.user_id, self.symbol, action, qty,
+                                                      self.active_position['entry_price'], clock.now())
+
                             except Exception as e:
-                                logger.error(f"Prediction error: {e}")
-                
-                await asyncio.sleep(15) # Poll faster (15s) to check SL/TP
-                
+                                logger.error(f"{self.symbol} Prediction error: {e}")
+
+                self.last_error = None
+                await clock.sleep(settings.ENGINE_POLL_SECONDS) # Poll often to check SL/TP
+
             except asyncio.CancelledError:
-                logger.info("Trading loop cancelled")
+                logger.info(f"Trading loop cancelled for {self.symbol}")
                 break
             except Exception as e:
-                logger.error(f"Error in trading loop: {e}")
-                await asyncio.sleep(5)
-
-    def _save_order_to_db(self, symbol, side, qty, price):
-        from app.core.database import SessionLocal
-        from app.models.order import Order, OrderSide, OrderType, OrderStatus
-        
-        db = SessionLocal()
-        try:
-            db_order = Order(
-                ext_id=f"auto_{int(datetime.now().timestamp())}",
-                user_id=1, # Demo user
-                symbol=symbol,
-                side=OrderSide.BUY if side == "buy" else OrderSide.SELL,
-                type=OrderType.MARKET,
-                qty=qty,
-                price=price,
-                status=OrderStatus.FILLED
-            )
-            db.add(db_order)
-            db.commit()
-            logger.info(f"Order saved to DB: {db_order.id}")
-        except Exception as e:
-            logger.error(f"Failed to save order to DB: {e}")
-        finally:
-            db.close()
+                logger.error(f"Error in trading loop for {self.symbol}: {e}")
+                self.last_error = str(e)
+                await clock.sleep(5)
+
+        self.is_running = False
+
+class TradingEngine:
+    """Runs one independent trading loop per symbol"""
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(TradingEngine, cls).__new__(cls)
+            cls._instance.traders = {}
+            cls._instance.broker = None
+            cls._instance.user_id = DEFAULT_USER_ID
+            cls._instance.clock = system_clock
+            cls._instance.io_pool = None
+            cls._instance.cpu_pool = None
+            cls._instance.inference_pool = None
+            cls._instance.predictor = None
+            cls._instance.model_version = None
+            cls._instance._model_checked_at = None
+            cls._instance._model_lock = None
+        return cls._instance
+
+    @property
+    def is_running(self) -> bool:
+        return any(trader.is_running for trader in self.traders.values())
+
+    @property
+    def symbols(self) -> List[str]:
+        return [symbol for symbol, trader in self.traders.items() if trader.is_running]
+
+    @property
+    def symbol(self) -> str:
+        """First running symbol (single-symbol API compatibility)"""
+        symbols = self.symbols
+        return symbols[0] if symbols else "^NSEI" # Default NIFTY 50
+
+    def start(self, symbol: str):
+        trader = self.traders.get(symbol)
+        if trader and trader.is_running:
+            return {"status": "already_running", "symbol": symbol}
+
+        if self.broker is None:
+            self.use_broker(get_broker(account=self.user_id), self.user_id)
+        trader = SymbolTrader(self, symbol)
+        self.traders[symbol] = trader
+        trader.start()
+        return {"status": "started", "symbol": symbol}
+
+    def use_broker(self, broker, user_id: int = DEFAULT_USER_ID):
+        """
+        Trade through ``broker`` on behalf of ``user_id``. Brokers with their
+        own clock (mock, replay) also set the pace of the loops, and brokers
+        that replay stored bars (``fetch_history``) replace DataLoader as the
+        data source.
+        """
+        self.broker = broker
+        self.user_id = user_id
+        self.clock = getattr(broker, "clock", system_clock)
+
+    def trade_for(self, user_id: int):
+        """
+        Switch to ``user_id``'s broker account (the engine trades for one
+        user at a time); raises ValueError while another user's loops run.
+        """
+        if user_id == self.user_id and self.broker is not None:
+            return
+        if self.is_running:
+            raise ValueError(f"The trading engine is running for user {self.user_id}; stop it first")
+        self.use_broker(get_broker(account=user_id), user_id)
+
+    def fetch_history(self, symbol: str, period: str, interval: str):
+        source = getattr(self.broker, "fetch_history", DataLoader.fetch_history)
+        return source(symbol, period=period, interval=interval)
+
+    def start_many(self, symbols: List[str]) -> Dict[str, Dict]:
+        return {symbol: self.start(symbol) for symbol in symbols}
+
+    def start_universe(self) -> Dict[str, Dict]:
+        """Trade the index set plus the top-stock universe"""
+        return self.start_many(DataLoader.get_indian_indices() + DataLoader.get_top_stocks())
+
+    def stop(self, symbol: Optional[str] = None):
+        """Stop one symbol, or every symbol when none is given"""
+        if symbol is not None:
+            trader = self.traders.get(symbol)
+            if not trader or not trader.is_running:
+                return {"status": "not_running", "symbol": symbol}
+            trader.stop()
+            return {"status": "stopped", "symbol": symbol}
+
+        if not self.is_running:
+            return {"status": "not_running"}
+
+        stopped = self.symbols
+        for trader in self.traders.values():
+            trader.stop()
+        return {"status": "stopped", "symbols": stopped}
+
+    def status(self, symbol: Optional[str] = None) -> Dict:
+        if symbol is not None:
+            trader = self.traders.get(symbol)
+            return trader.status() if trader else {"symbol": symbol, "is_running": False}
+        return {
+            "is_running": self.is_running,
+            "symbol": self.symbol,
+            "symbols": {s: trader.status() for s, trader in self.traders.items()},
+            "model": self.model_version,
+            "inference": self.predictor.stats if self.predictor else None
+        }
+
+    async def refresh_model(self, force: bool = False) -> Optional[BatchPredictor]:
+        """
+        Shared cross-symbol predictor for the latest registered model.
+
+        The registry is checked at most every MODEL_RELOAD_SECONDS; a new
+        version is hot-swapped into the running predictor. Falls back to
+        MODEL_PATH when nothing is registered. Returns None without a model.
+        """
+        if self._model_lock is None:
+            self._model_lock = asyncio.Lock()
+        async with self._model_lock:
+            now = time.monotonic()
+            if not force and self._model_checked_at is not None \
+                    and now - self._model_checked_at < settings.MODEL_RELOAD_SECONDS:
+                return self.predictor
+            self._model_checked_at = now
+
+            try:
+                record = await self.run_io(model_registry.latest, settings.MODEL_NAME)
+            except Exception as e:
+                logger.error(f"Model registry lookup failed: {e}")
+                record = None
+
+            if record and os.path.exists(record['artifact_uri']):
+                path, feature_cols = record['artifact_uri'], record['feature_cols']
+                version = f"{record['name']} v{record['version']}"
+            elif os.path.exists(MODEL_PATH):
+                path, feature_cols, version = MODEL_PATH, None, MODEL_PATH
+            else:
+                return self.predictor
+
+            if self.predictor is None:
+                self.predictor = BatchPredictor(
+                    path,
+                    runner=self.run_inference,
+                    # Virtual time: loops waiting on a batch window would stall the clock
+                    window=settings.INFERENCE_BATCH_WINDOW if self.clock.realtime else 0,
+                    max_batch=settings.INFERENCE_MAX_BATCH,
+                    feature_cols=feature_cols
+                )
+            elif version != self.model_version:
+                self.predictor.swap(path, feature_cols)
+                logger.info(f"Hot-swapped model {self.model_version} -> {version}")
+            self.model_version = version
+            return self.predictor
+
+    async def run_io(self, func, *args, **kwargs):
+        """Run blocking I/O (downloads, DB writes) on the shared thread pool"""
+        if self.io_pool is None:
+            self.io_pool = ThreadPoolExecutor(max_workers=settings.ENGINE_IO_WORKERS, thread_name_prefix="engine-io")
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.io_pool, partial(func, *args, **kwargs))
+
+    async def run_cpu(self, func, *args, **kwargs):
+        """Run CPU-bound work (feature warm-up) on the shared process pool"""
+        if self.cpu_pool is None:
+            self.cpu_pool = ProcessPoolExecutor(max_workers=settings.ENGINE_CPU_WORKERS or None)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.cpu_pool, partial(func, *args, **kwargs))
+
+    async def run_inference(self, func, *args, **kwargs):
+        """Run model scoring on one dedicated thread: the model loads once, in this process"""
+        if self.inference_pool is None:
+            self.inference_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="engine-inference")
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.inference_pool, partial(func, *args, **kwargs))
+
+    def shutdown(self):
+        """Stop every loop and release the worker pools"""
+        for trader in self.traders.values():
+            trader.stop()
+        for pool in (self.io_pool, self.cpu_pool, self.inference_pool):
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+        self.io_pool = None
+        self.cpu_pool = None
+        self.inference_pool = None
+
+def _save_order_to_db(user_id: int, symbol, side, qty, price, created_at: datetime):
+    """
+    Queue ``user_id``'s fill for the batched order writer (returns without
+    waiting on the DB); ``created_at`` is the engine clock's naive IST time.
+    """
+    from app.models.order import OrderSide, OrderType, OrderStatus
+    from app.services.order_writer import order_writer
+
+    created_at = ist_aware(created_at)
+    try:
+        # Folded into the user's performance stats when the batch is written
+        order_writer.submit_order(
+            ext_id=f"auto_{int(created_at.timestamp())}_{uuid.uuid4().hex[:8]}",
+            user_id=user_id,
+            symbol=symbol,
+            side=OrderSide.BUY if side == "buy" else OrderSide.SELL,
+            type=OrderType.MARKET,
+            qty=qty,
+            price=price,
+            status=OrderStatus.FILLED,
+            created_at=created_at
+        )
+    except Exception as e:
+        logger.error(f"Failed to queue order for DB: {e}")
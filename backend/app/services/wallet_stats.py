@@ -0,0 +1,42 @@
+"""Rebuild the per-wallet ledger totals (wallet_stats) from the ledger history"""
+from typing import Optional
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+from app.models.wallet import Ledger, WalletStats
+
+def rebuild_wallet_stats(db: Session, wallet_id: Optional[int] = None) -> int:
+    """
+    Recompute wallet_stats from the ledger for one wallet (or all of them)
+    in a single transaction; returns the number of rows written.
+    """
+    clear = delete(WalletStats)
+    if wallet_id is not None:
+        clear = clear.where(WalletStats.wallet_id == wallet_id)
+    db.execute(clear)
+    written = db.execute(backfill_statement(wallet_id)).rowcount
+    db.commit()
+    return written
+
+def backfill_statement(wallet_id: Optional[int] = None):
+    """INSERT ... SELECT of the ledger totals per (wallet, type) into wallet_stats"""
+    totals = select(
+        Ledger.wallet_id, Ledger.type, func.coalesce(func.sum(Ledger.amount), 0.0), func.count()
+    ).group_by(Ledger.wallet_id, Ledger.type)
+    if wallet_id is not None:
+        totals = totals.where(Ledger.wallet_id == wallet_id)
+    return insert(WalletStats).from_select(["wallet_id", "type", "total_amount", "entry_count"], totals)
+
+if __name__ == "__main__":
+    import argparse
+    from app.core.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Recompute wallet_stats from the ledger")
+    parser.add_argument("--wallet", type=int, help="Only this wallet id (default: all wallets)")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        print(f"Rebuilt {rebuild_wallet_stats(db, args.wallet)} wallet_stats rows")
+    finally:
+        db.close()
@@ -1,33 +1,43 @@
--- Initialize database schema
+-- Initialize database schema (kept in sync with app/models and alembic/versions)
+-- Enum columns hold the Python enum member names (e.g. 'TRADER', 'FILLED'), as SQLAlchemy writes them
 
 CREATE TABLE IF NOT EXISTS users (
     id SERIAL PRIMARY KEY,
     email VARCHAR(255) UNIQUE NOT NULL,
     name VARCHAR(255) NOT NULL,
     hashed_password VARCHAR(255) NOT NULL,
-    role VARCHAR(50) DEFAULT 'trader',
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    role VARCHAR(50) DEFAULT 'TRADER',
+    created_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
 );
 
 CREATE TABLE IF NOT EXISTS wallets (
     id SERIAL PRIMARY KEY,
-    user_id INTEGER REFERENCES users(id),
-    total_balance DECIMAL(15, 2) DEFAULT 0,
-    reserved_balance DECIMAL(15, 2) DEFAULT 0,
-    available_balance DECIMAL(15, 2) DEFAULT 0,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    user_id INTEGER NOT NULL REFERENCES users(id),
+    total_balance DOUBLE PRECISION DEFAULT 0,
+    reserved_balance DOUBLE PRECISION DEFAULT 0,
+    available_balance DOUBLE PRECISION DEFAULT 0,
+    created_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
 );
 
 CREATE TABLE IF NOT EXISTS ledger (
     id SERIAL PRIMARY KEY,
+    wallet_id INTEGER NOT NULL REFERENCES wallets(id),
+    type VARCHAR(50) NOT NULL,
+    amount DOUBLE PRECISION NOT NULL,
+    balance_after DOUBLE PRECISION NOT NULL,
+    meta_data JSONB,
+    timestamp TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Running ledger totals per wallet and entry type (maintained on every ledger insert)
+CREATE TABLE IF NOT EXISTS wallet_stats (
     wallet_id INTEGER REFERENCES wallets(id),
     type VARCHAR(50) NOT NULL,
-    amount DECIMAL(15, 2) NOT NULL,
-    balance_after DECIMAL(15, 2) NOT NULL,
-    metadata JSONB,
-    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    total_amount DOUBLE PRECISION NOT NULL DEFAULT 0,
+    entry_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (wallet_id, type)
 );
 
 CREATE TABLE IF NOT EXISTS models (
@@ -37,7 +47,8 @@ CREATE TABLE IF NOT EXISTS models (
     params JSONB,
     metrics JSONB,
     artifact_uri VARCHAR(500),
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    created_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT uq_models_name_version UNIQUE (name, version)
 );
 
 CREATE TABLE IF NOT EXISTS strategies (
@@ -48,58 +59,78 @@ CREATE TABLE IF NOT EXISTS strategies (
     is_active BOOLEAN DEFAULT FALSE,
     is_paper BOOLEAN DEFAULT TRUE,
     config JSONB,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    created_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
 );
 
 CREATE TABLE IF NOT EXISTS orders (
     id SERIAL PRIMARY KEY,
     ext_id VARCHAR(255) UNIQUE,
-    user_id INTEGER REFERENCES users(id),
+    user_id INTEGER NOT NULL REFERENCES users(id),
     strategy_id INTEGER REFERENCES strategies(id),
     symbol VARCHAR(50) NOT NULL,
-    side VARCHAR(10) NOT NULL,
-    type VARCHAR(10) NOT NULL,
+    side VARCHAR(50) NOT NULL,
+    type VARCHAR(50) NOT NULL,
     qty INTEGER NOT NULL,
-    price DECIMAL(15, 2),
+    price DOUBLE PRECISION,
     filled_qty INTEGER DEFAULT 0,
-    avg_fill_price DECIMAL(15, 2),
-    status VARCHAR(50) DEFAULT 'pending',
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    executed_at TIMESTAMP
+    avg_fill_price DOUBLE PRECISION,
+    status VARCHAR(50) DEFAULT 'PENDING',
+    created_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
+    executed_at TIMESTAMPTZ
+);
+
+-- Running trade statistics per user (updated as fills are recorded)
+CREATE TABLE IF NOT EXISTS performance_stats (
+    user_id INTEGER PRIMARY KEY REFERENCES users(id),
+    total_trades INTEGER NOT NULL DEFAULT 0,
+    winning_trades INTEGER NOT NULL DEFAULT 0,
+    losing_trades INTEGER NOT NULL DEFAULT 0,
+    realized_pnl DOUBLE PRECISION NOT NULL DEFAULT 0,
+    gross_profit DOUBLE PRECISION NOT NULL DEFAULT 0,
+    gross_loss DOUBLE PRECISION NOT NULL DEFAULT 0,
+    peak_pnl DOUBLE PRECISION NOT NULL DEFAULT 0,
+    max_drawdown DOUBLE PRECISION NOT NULL DEFAULT 0,
+    open_entries JSONB,
+    balance_curve JSONB,
+    last_order_id INTEGER,
+    updated_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
 );
 
 CREATE TABLE IF NOT EXISTS trades (
     id SERIAL PRIMARY KEY,
-    order_id INTEGER REFERENCES orders(id),
-    fill_price DECIMAL(15, 2) NOT NULL,
+    order_id INTEGER NOT NULL REFERENCES orders(id),
+    fill_price DOUBLE PRECISION NOT NULL,
     fill_qty INTEGER NOT NULL,
-    fee DECIMAL(10, 2) DEFAULT 0,
-    tax DECIMAL(10, 2) DEFAULT 0,
-    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    fee DOUBLE PRECISION DEFAULT 0,
+    tax DOUBLE PRECISION DEFAULT 0,
+    timestamp TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
 );
 
 CREATE TABLE IF NOT EXISTS positions (
     id SERIAL PRIMARY KEY,
-    user_id INTEGER REFERENCES users(id),
+    user_id INTEGER NOT NULL REFERENCES users(id),
     symbol VARCHAR(50) NOT NULL,
-    side VARCHAR(10) NOT NULL,
+    side VARCHAR(50) NOT NULL,
     qty INTEGER NOT NULL,
-    avg_price DECIMAL(15, 2) NOT NULL,
-    current_price DECIMAL(15, 2),
-    unrealized_pnl DECIMAL(15, 2) DEFAULT 0,
-    realized_pnl DECIMAL(15, 2) DEFAULT 0,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    avg_price DOUBLE PRECISION NOT NULL,
+    current_price DOUBLE PRECISION,
+    unrealized_pnl DOUBLE PRECISION DEFAULT 0,
+    realized_pnl DOUBLE PRECISION DEFAULT 0,
+    created_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
 );
 
--- Create indexes
-CREATE INDEX idx_orders_user ON orders(user_id);
-CREATE INDEX idx_orders_symbol ON orders(symbol);
-CREATE INDEX idx_positions_user ON positions(user_id);
-CREATE INDEX idx_ledger_wallet ON ledger(wallet_id);
+-- Create indexes (same names as the models and alembic revisions 0001 and 0005)
+CREATE UNIQUE INDEX IF NOT EXISTS ix_orders_ext_id ON orders(ext_id);
+CREATE INDEX IF NOT EXISTS ix_orders_symbol ON orders(symbol);
+CREATE INDEX IF NOT EXISTS ix_positions_symbol ON positions(symbol);
+-- Keyset pagination (newest first per owner); the leading column also serves lookups by owner
+CREATE INDEX IF NOT EXISTS ix_orders_user_created ON orders(user_id, created_at, id);
+CREATE INDEX IF NOT EXISTS ix_ledger_wallet_timestamp ON ledger(wallet_id, timestamp, id);
+CREATE INDEX IF NOT EXISTS ix_positions_user_id ON positions(user_id, id);
 
 -- Insert demo user (password: admin123)
 INSERT INTO users (email, name, hashed_password, role) 
-VALUES ('admin@example.com', 'Admin User', '$2b$12$LQv3c1yqBWVHxkd0LHAkCOYz6TtxMQJqhN8/LewY5GyYqVr/qvQqK', 'admin')
+VALUES ('admin@example.com', 'Admin User', '$2b$12$LQv3c1yqBWVHxkd0LHAkCOYz6TtxMQJqhN8/LewY5GyYqVr/qvQqK', 'ADMIN')
 ON CONFLICT (email) DO NOTHING;
@@ -0,0 +1,24 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import Base
+import app.models  # noqa: F401  (registers every table on Base.metadata)
+
+@pytest.fixture
+def db_engine(tmp_path):
+    """Fresh SQLite database with every model table (a file, so writer threads share it)"""
+    engine = create_engine(f"sqlite:///{tmp_path}/test.db")
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+@pytest.fixture
+def session_factory(db_engine):
+    return sessionmaker(bind=db_engine)
+
+@pytest.fixture
+def db_session(session_factory):
+    db = session_factory()
+    yield db
+    db.close()
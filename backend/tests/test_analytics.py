@@ -0,0 +1,70 @@
+import numpy as np
+from sqlalchemy import event
+
+from app.models import Order, PerformanceStats
+from app.models.order import OrderSide, OrderStatus, OrderType
+from app.services.analytics import AnalyticsService
+
+def make_order(i, side, price, user_id=1):
+    return Order(ext_id=f"o{i}", user_id=user_id, symbol="NIFTY", side=side, type=OrderType.MARKET,
+                 qty=50, price=price, status=OrderStatus.FILLED)
+
+def test_fills_update_stats_incrementally(db_session):
+    """Stats folded in per fill match a rebuild from the orders; reads never query orders"""
+    db = db_session
+    rng = np.random.default_rng(3)
+    sides = [OrderSide.BUY if buy else OrderSide.SELL for buy in rng.random(300) < 0.5]
+    prices = 19500 + rng.normal(0, 50, size=300).round(2)
+    for i, (side, price) in enumerate(zip(sides, prices)):
+        AnalyticsService(db, 1).record_fill(make_order(i, side, float(price)))
+
+    # Reference: FIFO over the order list
+    entries, pnls = [], []
+    for side, price in zip(sides, prices):
+        if side == OrderSide.BUY:
+            entries.append(price)
+        elif entries:
+            pnls.append((price - entries.pop(0)) * 50)
+    curve = np.concatenate(([0.0], np.cumsum(pnls)))
+
+    statements = []
+    event.listen(db.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+    metrics = AnalyticsService(db, 1).get_performance_metrics()
+    assert len(statements) == 1 and "orders" not in statements[0]
+    assert metrics["total_trades"] == len(pnls)
+    assert metrics["total_pnl"] == round(sum(pnls), 2)
+    assert metrics["win_rate"] == round(sum(p > 0 for p in pnls) / len(pnls) * 100, 2)
+    assert metrics["max_drawdown"] == round(float((np.maximum.accumulate(curve) - curve).max()), 2)
+    assert np.allclose(metrics["balance_curve"], curve)
+
+    # Existing accounts without a stats row are rebuilt on first read
+    incremental = dict(metrics)
+    db.query(PerformanceStats).delete()
+    db.commit()
+    assert AnalyticsService(db, 1).get_performance_metrics() == incremental
+    assert AnalyticsService(db, 2).get_performance_metrics()["total_trades"] == 0
+
+def test_truncated_curve_is_flagged(db_session, monkeypatch):
+    monkeypatch.setattr("app.services.analytics.CURVE_POINTS", 5)
+    db = db_session
+    for i in range(16):
+        AnalyticsService(db, 1).record_fill(make_order(i, OrderSide.BUY if i % 2 == 0 else OrderSide.SELL, 100.0 + i))
+    metrics = AnalyticsService(db, 1).get_performance_metrics()
+    assert metrics["total_trades"] == 8
+    assert metrics["balance_curve"] == [200.0, 250.0, 300.0, 350.0, 400.0]  # Points 4..8 of the 9-point curve
+    assert metrics["balance_curve_offset"] == 4 and metrics["balance_curve_truncated"]
+
+def test_rebuild_command_backfills_every_user(db_session):
+    """rebuild_performance_stats writes a row for every user with fills (what the 0003 backfill did)"""
+    from app.services.analytics import rebuild_performance_stats
+
+    db = db_session
+    for i, (user_id, side, price) in enumerate([(1, OrderSide.BUY, 100.0), (1, OrderSide.SELL, 110.0),
+                                                (2, OrderSide.BUY, 200.0), (2, OrderSide.SELL, 190.0)]):
+        db.add(make_order(i, side, price, user_id=user_id))
+    db.commit()
+
+    assert rebuild_performance_stats(db) == 2
+    assert [(s.user_id, s.realized_pnl) for s in db.query(PerformanceStats).order_by(PerformanceStats.user_id)] == \
+        [(1, 500.0), (2, -500.0)]
+    assert rebuild_performance_stats(db, user_id=1) == 1
@@ -23,3 +23,62 @@ def test_backtester_basic():
     assert 'sharpe_ratio' in results
     assert 'max_drawdown' in results
     assert results['num_trades'] == 2
+
+def test_vectorized_matches_event_driven():
+    """Array-based run reproduces the iterrows loop exactly"""
+    rng = np.random.default_rng(42)
+    dates = pd.date_range('2023-01-01', periods=2000, freq='1min')
+    df = pd.DataFrame({
+        'close': 19500 + rng.standard_normal(2000).cumsum()
+    }, index=dates)
+    
+    # Noisy signals, including repeated buys while long and sells while flat
+    signals = pd.Series(rng.choice([0, 0, 0, 1, -1], size=2000), index=dates)
+    
+    event = Backtester(initial_capital=100000).run_event_driven(df, signals)
+    fast = Backtester(initial_capital=100000).run(df, signals)
+    
+    for key in ['total_return', 'sharpe_ratio', 'max_drawdown', 'num_trades', 'final_equity']:
+        assert fast[key] == event[key]
+    assert fast['trades'] == event['trades']
+
+def test_metrics_match_pandas_reference():
+    """Metrics on a fixed series, pinned to what the original pandas implementation returned"""
+    i = np.arange(300)
+    dates = pd.date_range('2023-01-02 09:15', periods=300, freq='1min')
+    df = pd.DataFrame({'close': 19500 + 40 * np.sin(i / 7) + 0.3 * i}, index=dates)
+    signals = pd.Series(np.where(i % 23 == 3, 1, np.where(i % 17 == 9, -1, 0)), index=dates)
+    
+    for run in ('run', 'run_event_driven'):
+        backtester = Backtester(initial_capital=100000)
+        results = getattr(backtester, run)(df, signals)
+        # pct_change/std/cummax over the equity DataFrame before vectorization
+        assert results['total_return'] == pytest.approx(-0.31658653613945154, rel=1e-12)
+        assert results['sharpe_ratio'] == pytest.approx(-3.724150447430274, rel=1e-12)
+        assert results['max_drawdown'] == pytest.approx(-0.3240918391905767, rel=1e-12)
+        assert results['final_equity'] == pytest.approx(99683.41346386055, rel=1e-12)
+        assert results['num_trades'] == 26
+        assert isinstance(backtester.equity_curve, pd.Series)
+        assert backtester.equity_curve.index.equals(dates)
+        assert backtester.equity_curve.iloc[-1] == results['final_equity']
+
+def test_parameter_sweep_ranks_configurations():
+    """Sweep workers reproduce a direct Backtester run on the shared dataset"""
+    from app.ml.sweep import ParameterSweep, generate_signals
+    
+    rng = np.random.default_rng(0)
+    dates = pd.date_range('2023-01-01', periods=500, freq='1min')
+    df = pd.DataFrame({'close': 19500 + rng.standard_normal(500).cumsum()}, index=dates)
+    probs = rng.uniform(0, 1, 500)
+    
+    sweep = ParameterSweep(df, probabilities=probs, max_workers=2)
+    results = sweep.grid({'buy_threshold': [0.7, 0.9], 'stop_loss_pct': [0.0005, 0.001]})
+    
+    assert len(results) == 4
+    assert results['sharpe_ratio'].is_monotonic_decreasing
+    
+    best = results.iloc[0]
+    signals = generate_signals(df['close'].to_numpy(), probs, best['buy_threshold'], 0.2,
+                               best['stop_loss_pct'], 0.02)
+    direct = Backtester(initial_capital=100000).run(df, pd.Series(signals, index=dates))
+    assert direct['final_equity'] == best['final_equity']
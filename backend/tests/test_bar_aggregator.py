@@ -0,0 +1,73 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from app.services.bar_aggregator import BarAggregator, bar_span
+from app.services.bar_store import BarStore
+
+def tick(ts, price, volume, symbol='^NSEI'):
+    return {'symbol': symbol, 'timestamp': ts, 'last': price, 'volume': volume}
+
+def test_bars_follow_session_boundaries():
+    """Bars are aligned to 9:15 IST and the last one is cut at 15:30"""
+    day = datetime(2024, 1, 2)
+    assert bar_span(day.replace(hour=9, minute=14, second=59), 1) is None
+    assert bar_span(day.replace(hour=9, minute=22), 5) == (day.replace(hour=9, minute=20), day.replace(hour=9, minute=25))
+    assert bar_span(day.replace(hour=15, minute=20), 60) == (day.replace(hour=15, minute=15), day.replace(hour=15, minute=30))
+    assert bar_span(day.replace(hour=15, minute=30), 1) is None
+    
+    # Timezone-aware ticks are converted to IST (03:45 UTC = 09:15 IST)
+    aggregator = BarAggregator(intervals=['1m'], store=BarStore(capacity=100))
+    aggregator.on_tick(tick(datetime(2024, 1, 2, 3, 45, 10, tzinfo=timezone.utc), 100.0, 0))
+    assert aggregator.current_bar('^NSEI', '1m')['timestamp'] == day.replace(hour=9, minute=15)
+
+def test_ticks_build_ohlcv_and_publish_closed_bars():
+    """OHLC from tick prices, volume from cumulative-volume deltas, closed bars to subscribers"""
+    store = BarStore(capacity=100)
+    aggregator = BarAggregator(intervals=['1m', '5m'], store=store)
+    start = datetime(2024, 1, 2, 9, 15)
+    
+    async def main():
+        queue = aggregator.subscribe('1m')
+        prices = [100, 103, 99, 101, 102, 104]
+        for i, price in enumerate(prices):
+            # Two ticks per minute for three minutes, day volume growing by 10 each tick
+            aggregator.on_tick(tick(start + timedelta(seconds=30 * i), price, 1000 + 10 * i))
+        aggregator.on_tick(tick(start + timedelta(minutes=5), 105, 1100))
+        await asyncio.sleep(0)
+        return [queue.get_nowait() for _ in range(queue.qsize())]
+    
+    published = asyncio.run(main())
+    bars = [bar for _, _, bar in published]
+    
+    assert [bar['timestamp'].minute for bar in bars] == [15, 16, 17]
+    assert (bars[0]['open'], bars[0]['high'], bars[0]['low'], bars[0]['close']) == (100, 103, 100, 103)
+    assert [bar['volume'] for bar in bars] == [10, 20, 20]
+    
+    # The 9:15-9:20 bar closed on the 9:20 tick and went to the store
+    five = store.window('^NSEI', '5m').records()
+    assert len(five) == 1
+    assert (five[0]['open'], five[0]['high'], five[0]['low'], five[0]['close']) == (100, 104, 99, 104)
+    
+    # Quiet symbols are closed by time
+    closed = aggregator.flush(datetime(2024, 1, 2, 9, 21))
+    assert [(interval, bar['timestamp'].minute) for _, interval, bar in closed] == [('1m', 20)]
+
+def test_one_writer_per_symbol():
+    """A second loop cannot feed a claimed symbol, and flushing by owner leaves other writers' bars alone"""
+    aggregator = BarAggregator(intervals=['1m'], store=BarStore(capacity=100))
+    first, second = object(), object()
+    start = datetime(2024, 1, 2, 9, 15)
+
+    assert aggregator.claim('^NSEI', first) and aggregator.claim('^NSEI', first)
+    assert not aggregator.claim('^NSEI', second)
+    assert aggregator.claim('^NSEBANK', second)
+    aggregator.on_tick(tick(start, 100.0, 0))
+    aggregator.on_tick(tick(start, 200.0, 0, symbol='^NSEBANK'))
+
+    closed = aggregator.flush(start + timedelta(minutes=1), owner=second)
+    assert [symbol for symbol, _, _ in closed] == ['^NSEBANK']
+    assert aggregator.current_bar('^NSEI', '1m') is not None
+
+    aggregator.release(first)
+    assert aggregator.claim('^NSEI', second)
@@ -0,0 +1,57 @@
+import pytest
+import pandas as pd
+import numpy as np
+from app.services.bar_store import POLL, TICKS, BarStore
+
+def make_bars(periods, start='2023-01-02 09:15'):
+    dates = pd.date_range(start, periods=periods, freq='1min')
+    close = np.arange(periods, dtype=float)
+    return pd.DataFrame({
+        'timestamp': dates,
+        'open': close,
+        'high': close + 1,
+        'low': close - 1,
+        'close': close,
+        'volume': 100.0
+    })
+
+def test_window_is_contiguous_view_after_wraparound():
+    """Windows stay ordered and zero-copy once the ring has wrapped"""
+    store = BarStore(capacity=10)
+    bars = make_bars(25)
+    store.extend('^NSEI', '1m', bars.iloc[:7])
+    for bar in bars.iloc[7:].to_dict('records'):
+        store.append('^NSEI', '1m', bar)
+    
+    window = store.window('^NSEI', '1m', 8)
+    assert len(window) == 8
+    assert window.close.tolist() == list(range(17, 25))
+    assert np.shares_memory(window.close, store.buffer('^NSEI', '1m')._data)
+    assert len(store.window('^NSEI', '1m')) == 10
+
+def test_forming_bar_is_replaced_and_old_bars_ignored():
+    """Same-timestamp writes update the last bar; older bars are dropped"""
+    store = BarStore(capacity=10)
+    bars = make_bars(5)
+    store.extend('^NSEI', '1m', bars)
+    
+    forming = dict(bars.iloc[-1], close=99.0)
+    assert store.append('^NSEI', '1m', forming)
+    assert not store.append('^NSEI', '1m', bars.iloc[0].to_dict())
+    
+    window = store.window('^NSEI', '1m')
+    assert len(window) == 5
+    assert window.close[-1] == 99.0
+    assert window.records()[-1]['close'] == 99.0
+
+def test_sources_have_separate_buffers():
+    """Polled and tick-built bars never write the same buffer; readers get the live one"""
+    store = BarStore(capacity=10)
+    store.extend('^NSEI', '1m', make_bars(5), source=POLL)
+    assert len(store.window('^NSEI', '1m', source=TICKS)) == 0
+    assert store.live_window('^NSEI', '1m', max_age=60).close[-1] == 4.0
+    
+    store.append('^NSEI', '1m', dict(make_bars(1, start='2023-01-02 09:20').iloc[0], close=50.0), source=TICKS)
+    assert len(store.window('^NSEI', '1m', source=POLL)) == 5
+    assert store.live_window('^NSEI', '1m', max_age=60).close[-1] == 50.0
+    assert store.live_window('^NSEI', '5m', max_age=60) is None
@@ -0,0 +1,138 @@
+import asyncio
+import threading
+import time
+
+import pandas as pd
+import pytest
+from app.brokers.paper import PaperBroker
+from app.services.data_loader import DataLoader
+
+def slow_history(calls, delay=0.2):
+    def fetch_history(symbol, period="2y", interval="1h", use_cache=True):
+        calls.append((symbol, threading.current_thread().name))
+        time.sleep(delay)
+        return pd.DataFrame({
+            'timestamp': [pd.Timestamp('2024-01-02 09:15')], 'open': [100.0], 'high': [101.0],
+            'low': [99.0], 'close': [100.5], 'volume': [1000]
+        })
+    return fetch_history
+
+def test_blocking_calls_run_off_the_event_loop(monkeypatch):
+    """Ticks for different symbols overlap; identical concurrent ticks share one download"""
+    calls = []
+    monkeypatch.setattr(DataLoader, "fetch_history", staticmethod(slow_history(calls)))
+
+    async def main():
+        heartbeats = 0
+        async def heartbeat():
+            nonlocal heartbeats
+            while True:
+                heartbeats += 1
+                await asyncio.sleep(0.01)
+        beat = asyncio.create_task(heartbeat())
+        started = time.perf_counter()
+        ticks = await asyncio.gather(*[PaperBroker().get_tick(s) for s in ['A', 'B', 'C', 'D'] + ['A'] * 20])
+        elapsed = time.perf_counter() - started
+        beat.cancel()
+        return ticks, elapsed, heartbeats
+
+    ticks, elapsed, heartbeats = asyncio.run(main())
+    assert all(t['last'] == 100.5 for t in ticks)
+    assert sorted(symbol for symbol, _ in calls) == ['A', 'B', 'C', 'D']
+    assert all(name.startswith('paperbroker-io') for _, name in calls)
+    assert elapsed < 0.6  # Not 4 x 0.2s
+    assert heartbeats >= 10  # The loop kept running while the downloads blocked
+
+def test_slow_calls_time_out(monkeypatch):
+    monkeypatch.setattr(DataLoader, "fetch_history", staticmethod(slow_history([], delay=0.5)))
+    broker = PaperBroker()
+    broker.timeout = 0.05
+
+    async def main():
+        with pytest.raises(asyncio.TimeoutError):
+            await broker.run_blocking(DataLoader.fetch_history, 'A')
+        return await broker.get_tick('A')  # Falls back to an empty tick
+
+    assert asyncio.run(main())['last'] == 0.0
+
+def test_get_broker_reuses_instances_per_mode_and_account():
+    """Order state survives between get_broker calls; repeatedly unhealthy brokers are rebuilt"""
+    from app.brokers.factory import BrokerPool
+    from app.brokers.mock import MockBroker
+
+    pool = BrokerPool(evict_after=2)
+    broker = pool.get("mock")
+    order = asyncio.run(broker.place_order("^NSEI", "buy", "market", 1))
+    assert pool.get("mock") is broker
+    assert asyncio.run(pool.get("mock").get_order_status(order["order_id"]))["status"] == "filled"
+    assert pool.get("mock", account=7) is not broker
+    assert pool.get("mock", account=7) is pool.get("mock", account="7")
+
+    class Failing(MockBroker):
+        async def health_check(self):
+            raise ConnectionError("session expired")
+
+    pool._brokers[pool.key("mock", "bad")] = failing = Failing()
+    report = asyncio.run(pool.health())
+    assert report["mock:default"] == {"status": "ok"}
+    assert report["mock:bad"]["status"] == "failed"
+    assert pool.report == report and pool.checked_at is not None
+    assert pool.get("mock", account="bad") is failing  # One failure is not enough
+
+    assert asyncio.run(pool.health())["mock:bad"]["failures"] == 2
+    assert pool.get("mock", account="bad") is not failing
+    assert pool.get("mock") is broker
+
+def test_paper_tick_reports_cumulative_volume(monkeypatch):
+    """Paper ticks sum the session's bar volumes and carry an IST-aware timestamp"""
+    bars = pd.DataFrame({
+        'timestamp': pd.to_datetime(['2024-01-01 15:29', '2024-01-02 09:15', '2024-01-02 09:16']),
+        'open': 100.0, 'high': 101.0, 'low': 99.0, 'close': [100.0, 100.5, 101.0], 'volume': [5000, 1000, 300]
+    })
+    monkeypatch.setattr(DataLoader, "fetch_history", staticmethod(lambda *args, **kwargs: bars))
+
+    tick = asyncio.run(PaperBroker().get_tick("^NSEI"))
+
+    assert tick["volume"] == 1300
+    assert tick["timestamp"].utcoffset() == pd.Timedelta(hours=5, minutes=30)
+    assert tick["timestamp"].hour == 9 and tick["timestamp"].minute == 16
+
+def test_health_monitor_caches_report():
+    """The background monitor fills the report /health serves"""
+    from app.brokers.factory import BrokerPool
+
+    pool = BrokerPool()
+    pool.get("mock")
+
+    async def main():
+        pool.start_monitor(interval=0.01)
+        await asyncio.sleep(0.05)
+        await pool.stop_monitor()
+
+    asyncio.run(main())
+    assert pool.report == {"mock:default": {"status": "ok"}}
+
+def test_engine_trades_on_its_users_account(monkeypatch):
+    """The engine uses the starting user's broker account and will not switch while another user's loops run"""
+    from app.brokers import factory
+    from app.core.config import settings
+    from app.services.trading_engine import TradingEngine
+
+    monkeypatch.setattr(settings, "BROKER_MODE", "mock")
+    monkeypatch.setattr(factory, "broker_pool", factory.BrokerPool())
+    engine = TradingEngine()
+    monkeypatch.setattr(engine, "broker", None)
+    monkeypatch.setattr(engine, "user_id", 1)
+    monkeypatch.setattr(engine, "traders", {})
+
+    engine.trade_for(7)
+    assert engine.user_id == 7 and engine.broker is factory.get_broker(account=7)
+    assert engine.broker is not factory.get_broker()
+
+    class Running:
+        is_running = True
+    engine.traders["^NSEI"] = Running()
+    engine.trade_for(7)  # Same user: no-op
+    with pytest.raises(ValueError):
+        engine.trade_for(8)
+    assert engine.user_id == 7
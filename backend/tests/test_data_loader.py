@@ -0,0 +1,123 @@
+import os
+import pytest
+import pandas as pd
+import numpy as np
+from app.core.config import settings
+from app.services.data_cache import OHLCVCache, period_start
+from app.services.data_loader import DataLoader
+
+def make_bars(start, periods):
+    dates = pd.date_range(start, periods=periods, freq='1h')
+    close = 19500 + np.arange(periods, dtype=float)
+    return pd.DataFrame({
+        'timestamp': dates,
+        'open': close,
+        'high': close + 10,
+        'low': close - 10,
+        'close': close,
+        'volume': 1000
+    })
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, 'DATA_CACHE_DIR', str(tmp_path))
+    monkeypatch.setattr(settings, 'DATA_CACHE_ENABLED', True)
+    return str(tmp_path)
+
+def test_offline_reads_fixture(cache_dir, monkeypatch):
+    """Offline mode serves history from the Parquet cache only"""
+    monkeypatch.setattr(settings, 'DATA_OFFLINE', True)
+    OHLCVCache().write('^NSEI', '1h', make_bars('2023-01-02', 50), coverage_start=None)
+    
+    def no_network(*args, **kwargs):
+        raise AssertionError("network used in offline mode")
+    monkeypatch.setattr(DataLoader, '_download', staticmethod(no_network))
+    
+    df = DataLoader.fetch_history('^NSEI', period='max', interval='1h')
+    assert len(df) == 50
+    assert df['timestamp'].is_monotonic_increasing
+
+def test_only_missing_tail_is_fetched(cache_dir, monkeypatch):
+    """A covered request downloads from the last cached session and merges"""
+    history = make_bars(pd.Timestamp.now().normalize() - pd.Timedelta(days=3), 60)
+    OHLCVCache().write('^NSEI', '1h', history.iloc[:40], coverage_start=None,
+                       fetched_at=pd.Timestamp('2000-01-01'))
+    
+    calls = []
+    def fake_download(symbol, interval, period=None, start=None):
+        calls.append((period, start))
+        return history[history['timestamp'] >= start]
+    monkeypatch.setattr(DataLoader, '_download', staticmethod(fake_download))
+    
+    df = DataLoader.fetch_history('^NSEI', period='max', interval='1h')
+    
+    assert calls == [(None, history['timestamp'].iloc[39].normalize())]
+    assert len(df) == 60
+    assert not df['timestamp'].duplicated().any()
+    assert len(OHLCVCache().read('^NSEI', '1h')) == 60
+
+def test_refresh_appends_to_tail_file(cache_dir, monkeypatch):
+    """Refreshes leave the main file alone until the tail is compacted into it"""
+    history = make_bars(pd.Timestamp.now().normalize() - pd.Timedelta(days=3), 60)
+    cache = OHLCVCache(compact_rows=25)
+    cache.write('^NSEI', '1h', history.iloc[:30], coverage_start=None)
+    main = pd.read_parquet(cache.path('^NSEI', '1h'))
+    
+    cache.append('^NSEI', '1h', history.iloc[28:40], coverage_start=None, fetched_at=pd.Timestamp('2001-01-01'))
+    cache.append('^NSEI', '1h', history.iloc[38:45], coverage_start=None, fetched_at=pd.Timestamp('2002-01-01'))
+    
+    pd.testing.assert_frame_equal(pd.read_parquet(cache.path('^NSEI', '1h')), main)
+    assert len(pd.read_parquet(cache.tail_path('^NSEI', '1h'))) == 17
+    cached = cache.read('^NSEI', '1h')
+    pd.testing.assert_frame_equal(cached, history.iloc[:45].reset_index(drop=True), check_dtype=False)
+    assert cached.attrs['fetched_at'] == '2002-01-01T00:00:00'
+    
+    cache.append('^NSEI', '1h', history.iloc[43:60], coverage_start=None)
+    assert not os.path.exists(cache.tail_path('^NSEI', '1h'))
+    pd.testing.assert_frame_equal(cache.read('^NSEI', '1h'), history, check_dtype=False)
+    
+    # A full rewrite supersedes any tail
+    cache.append('^NSEI', '1h', history.iloc[58:], coverage_start=None)
+    cache.write('^NSEI', '1h', history.iloc[:10], coverage_start=None)
+    assert len(cache.read('^NSEI', '1h')) == 10
+
+def test_stale_intraday_cache_is_refetched_in_full(cache_dir, monkeypatch):
+    """A tail older than the 1m download window triggers a full-period refetch"""
+    old = make_bars(pd.Timestamp.now().normalize() - pd.Timedelta(days=30), 10)
+    OHLCVCache().write('^NSEI', '1m', old, coverage_start=None, fetched_at=pd.Timestamp('2000-01-01'))
+    recent = make_bars(pd.Timestamp.now().normalize() - pd.Timedelta(days=2), 20)
+    
+    calls = []
+    def fake_download(symbol, interval, period=None, start=None):
+        calls.append((period, start))
+        return recent
+    monkeypatch.setattr(DataLoader, '_download', staticmethod(fake_download))
+    
+    df = DataLoader.fetch_history('^NSEI', period='max', interval='1m')
+    
+    assert calls == [('max', None)]
+    # The old bars are dropped rather than kept across the gap
+    assert len(df) == 20
+    assert len(OHLCVCache().read('^NSEI', '1m')) == 20
+
+def test_empty_tail_keeps_fetched_at(cache_dir, monkeypatch):
+    """An empty tail download serves the cache without marking it fresh"""
+    history = make_bars(pd.Timestamp.now().normalize() - pd.Timedelta(days=3), 40)
+    OHLCVCache().write('^NSEI', '1h', history, coverage_start=None, fetched_at=pd.Timestamp('2000-01-01'))
+    monkeypatch.setattr(DataLoader, '_download',
+                        staticmethod(lambda *args, **kwargs: pd.DataFrame(columns=['timestamp'])))
+    
+    df = DataLoader.fetch_history('^NSEI', period='max', interval='1h')
+    
+    assert len(df) == 40
+    assert OHLCVCache().read('^NSEI', '1h').attrs['fetched_at'] == '2000-01-01T00:00:00'
+
+def test_day_periods_start_at_last_session():
+    """'1d' on a weekend or before the open means the previous trading day"""
+    saturday = pd.Timestamp('2026-10-17 12:00')
+    monday_pre_open = pd.Timestamp('2026-10-19 08:00')
+    monday = pd.Timestamp('2026-10-19 10:00')
+    assert period_start('1d', saturday) == pd.Timestamp('2026-10-16')
+    assert period_start('1d', monday_pre_open) == pd.Timestamp('2026-10-16')
+    assert period_start('1d', monday) == pd.Timestamp('2026-10-19')
+    assert period_start('5d', monday) == pd.Timestamp('2026-10-13')
@@ -0,0 +1,37 @@
+import asyncio
+
+import pytest
+from app.core.database import async_database_url, pool_options
+
+def test_async_database_url_swaps_driver():
+    assert async_database_url("sqlite:///./autotrader.db") == "sqlite+aiosqlite:///./autotrader.db"
+    assert async_database_url("postgresql://u:p@db:5432/trader") == "postgresql+asyncpg://u:p@db:5432/trader"
+    assert async_database_url("postgresql+psycopg2://u:p@db/trader") == "postgresql+asyncpg://u:p@db/trader"
+    with pytest.raises(ValueError):
+        async_database_url("mysql://u:p@db/trader")
+    assert pool_options("sqlite+aiosqlite://") == {}
+    assert pool_options("postgresql+asyncpg://u:p@db/trader")["pool_size"] > 0
+
+def test_async_session_round_trip(tmp_path, monkeypatch):
+    pytest.importorskip("aiosqlite")
+    from sqlalchemy import select
+    from app.core import database
+    from app.core.config import settings
+    from app.models.user import User
+
+    monkeypatch.setattr(settings, "DATABASE_URL", f"sqlite:///{tmp_path}/test.db")
+    monkeypatch.setattr(database, "_async_engine", None)
+    monkeypatch.setattr(database, "_async_sessionmaker", None)
+
+    async def main():
+        async with database.get_async_engine().begin() as conn:
+            await conn.run_sync(User.__table__.create)
+        async with database.AsyncSessionLocal() as db:
+            db.add(User(email="a@b.c", name="A", hashed_password="x"))
+            await db.commit()
+        async with database.AsyncSessionLocal() as db:
+            user = await db.scalar(select(User).where(User.email == "a@b.c"))
+        await database.dispose_async_engine()
+        return user
+
+    assert asyncio.run(main()).name == "A"  # Still readable after the session closed
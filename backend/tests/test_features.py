@@ -37,3 +37,81 @@ def test_prepare_features():
     assert 'label_binary' in df_features.columns
     assert 'hour' in df_features.columns
     assert len(df_features) < len(df)  # Some rows dropped due to NaN
+
+def test_incremental_matches_prepare_features():
+    """Streaming engine reproduces the batch pipeline bar by bar"""
+    from app.ml.incremental import IncrementalFeatureEngine
+
+    rng = np.random.default_rng(7)
+    dates = pd.date_range('2023-01-02 09:15', periods=400, freq='1min')
+    close = 19500 + rng.standard_normal(400).cumsum() * 5
+    df = pd.DataFrame({
+        'timestamp': dates,
+        'open': close + rng.standard_normal(400),
+        'high': close + 3 + np.abs(rng.standard_normal(400)),
+        'low': close - 3 - np.abs(rng.standard_normal(400)),
+        'close': close,
+        'volume': rng.integers(1000, 10000, 400)
+    })
+    
+    batch = FeatureEngine.prepare_features(df)
+    
+    engine = IncrementalFeatureEngine()
+    rows = [engine.update(bar) for bar in df.to_dict('records')]
+    streamed = pd.DataFrame(rows, index=dates).loc[batch.index]
+    
+    assert list(streamed.columns) == list(batch.columns)
+    for col in engine.feature_cols:
+        np.testing.assert_allclose(streamed[col].astype(float), batch[col].astype(float), rtol=1e-9, atol=1e-9)
+
+def test_feature_cache_reuses_matrix(tmp_path, monkeypatch):
+    """Same input data is engineered once; changed data gets a new cache entry"""
+    from app.ml.feature_cache import FeatureCache
+
+    dates = pd.date_range('2023-01-02 09:15', periods=200, freq='1min')
+    close = 19500 + np.random.default_rng(3).standard_normal(200).cumsum()
+    df = pd.DataFrame({
+        'open': close,
+        'high': close + 2,
+        'low': close - 2,
+        'close': close,
+        'volume': np.arange(200) + 1000
+    }, index=dates)
+    
+    calls = []
+    prepare = FeatureEngine.prepare_features
+    monkeypatch.setattr(FeatureEngine, 'prepare_features', staticmethod(lambda d: calls.append(1) or prepare(d)))
+    
+    cache = FeatureCache(cache_dir=str(tmp_path))
+    first = cache.prepare(df)
+    second = cache.prepare(df.copy())
+    
+    assert len(calls) == 1
+    pd.testing.assert_frame_equal(first, second, check_freq=False)
+    
+    changed = df.copy()
+    changed.iloc[-1, changed.columns.get_loc('close')] += 1
+    assert cache.key(changed) != cache.key(df)
+    cache.prepare(changed)
+    assert len(calls) == 2
+
+def test_prepare_features_matches_step_chain():
+    """Single-assembly pipeline gives the same frame as chaining the add_* steps"""
+    rng = np.random.default_rng(11)
+    dates = pd.date_range('2023-01-02 09:15', periods=300, freq='1min')
+    close = 19500 + rng.standard_normal(300).cumsum() * 5
+    df = pd.DataFrame({
+        'open': close + rng.standard_normal(300),
+        'high': close + 3,
+        'low': close - 3,
+        'close': close,
+        'volume': rng.integers(1000, 10000, 300)
+    }, index=dates)
+    
+    chained = FeatureEngine.add_technical_indicators(df)
+    chained = FeatureEngine.add_lag_features(chained)
+    chained = FeatureEngine.add_time_features(chained)
+    chained = FeatureEngine.create_labels(chained)
+    chained = chained.drop(columns=[c for c in chained.columns if 'SUPERTl' in c or 'SUPERTs' in c]).dropna()
+    
+    pd.testing.assert_frame_equal(FeatureEngine.prepare_features(df), chained)
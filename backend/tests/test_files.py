@@ -0,0 +1,22 @@
+import os
+
+import pytest
+from app.core.files import atomic_write
+
+def test_atomic_write_replaces_only_on_success(tmp_path):
+    """The target changes only when the block completes; failed writes leave no temp files"""
+    path = str(tmp_path / "sub" / "data.bin")
+    with atomic_write(path) as tmp:
+        assert os.path.dirname(tmp) == os.path.dirname(path) and tmp != path
+        with open(tmp, "w") as f:
+            f.write("first")
+
+    with pytest.raises(RuntimeError):
+        with atomic_write(path) as tmp:
+            with open(tmp, "w") as f:
+                f.write("partial")
+            raise RuntimeError("writer crashed")
+
+    with open(path) as f:
+        assert f.read() == "first"
+    assert os.listdir(tmp_path / "sub") == ["data.bin"]
@@ -0,0 +1,56 @@
+import pytest
+import pandas as pd
+import numpy as np
+from app.ml.features import FeatureEngine
+
+pytest.importorskip("pandas_ta")
+
+def make_ohlcv(n=600, seed=5):
+    rng = np.random.default_rng(seed)
+    # Two trading days of 1-minute bars so VWAP resets once
+    dates = pd.date_range('2023-01-02 09:15', periods=n // 2, freq='1min').append(
+        pd.date_range('2023-01-03 09:15', periods=n - n // 2, freq='1min'))
+    close = 19500 + rng.standard_normal(n).cumsum() * 5
+    high = close + 3 + np.abs(rng.standard_normal(n))
+    low = close - 3 - np.abs(rng.standard_normal(n))
+    # Flat bars exercise the zero-range handling
+    high[::50] = low[::50] = close[::50]
+    return pd.DataFrame({
+        'open': close + rng.standard_normal(n),
+        'high': high,
+        'low': low,
+        'close': close,
+        'volume': rng.integers(1000, 10000, n)
+    }, index=dates)
+
+def test_numpy_backend_matches_pandas_ta():
+    """Every indicator column matches pandas-ta (names, order, NaN positions and values)"""
+    df = make_ohlcv()
+    expected = FeatureEngine.indicator_columns(df, backend="pandas_ta")
+    actual = FeatureEngine.indicator_columns(df, backend="numpy")
+    
+    assert list(actual) == list(expected)
+    for name, values in expected.items():
+        values = pd.Series(values).reindex(df.index).to_numpy(dtype=float)
+        np.testing.assert_allclose(actual[name], values, rtol=1e-9, atol=1e-9, err_msg=name)
+
+def test_supertrend_seeds_first_row():
+    """pandas-ta 0.3.14b0 starts the trend at 0.0 (not NaN) with direction 1"""
+    df = make_ohlcv()
+    cols = FeatureEngine.indicator_columns(df, backend="numpy")
+    
+    assert cols['SUPERT_7_3.0'][0] == 0.0
+    assert cols['SUPERTd_7_3.0'][0] == 1
+    assert np.isnan(cols['SUPERTl_7_3.0'][0]) and np.isnan(cols['SUPERTs_7_3.0'][0])
+
+def test_prepare_features_backends_agree(monkeypatch):
+    """Switching INDICATOR_BACKEND does not change the feature matrix"""
+    from app.core.config import settings
+
+    df = make_ohlcv()
+    monkeypatch.setattr(settings, 'INDICATOR_BACKEND', 'pandas_ta')
+    expected = FeatureEngine.prepare_features(df)
+    monkeypatch.setattr(settings, 'INDICATOR_BACKEND', 'numpy')
+    actual = FeatureEngine.prepare_features(df)
+    
+    pd.testing.assert_frame_equal(actual, expected, check_exact=False, rtol=1e-9, atol=1e-9)
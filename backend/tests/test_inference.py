@@ -0,0 +1,97 @@
+import asyncio
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LogisticRegression
+
+from app.ml.inference import BatchPredictor
+
+def test_batch_predictor_scores_symbols_together(tmp_path):
+    """Rows from concurrent symbols are aligned to the model's columns and scored in one call"""
+    rng = np.random.default_rng(0)
+    cols = ['rsi', 'macd', 'atr']
+    X = pd.DataFrame(rng.standard_normal((200, 3)), columns=cols)
+    y = (X['rsi'] + X['macd'] > 0).astype(int)
+    model = LogisticRegression().fit(X, y)
+    model_path = str(tmp_path / "model.pkl")
+    joblib.dump(model, model_path)
+    
+    # Rows arrive with extra keys and in a different key order than the model expects
+    rows = {
+        f"SYM{i}": {'atr': X['atr'][i], 'close': 100.0, 'macd': X['macd'][i], 'rsi': X['rsi'][i]}
+        for i in range(5)
+    }
+    
+    async def main():
+        predictor = BatchPredictor(model_path, window=0.05)
+        probs = await asyncio.gather(*(predictor.predict(s, row) for s, row in rows.items()))
+        return predictor, probs
+    
+    predictor, probs = asyncio.run(main())
+    expected = model.predict_proba(X[cols].iloc[:5])[:, 1]
+    
+    np.testing.assert_allclose(probs, expected)
+    assert predictor.stats['batches'] == 1
+    assert predictor.stats['last_batch_size'] == 5
+    assert predictor.stats['last_latency_ms'] is not None
+
+def test_engine_scores_on_one_inference_thread(tmp_path, monkeypatch):
+    """The engine's runner scores in this process (where the model cache lives) on one thread"""
+    import threading
+    from app.ml import inference
+    from app.services.trading_engine import TradingEngine
+
+    model = LogisticRegression().fit(pd.DataFrame({'rsi': [0.0, 1.0]}), [0, 1])
+    model_path = str(tmp_path / "model.pkl")
+    joblib.dump(model, model_path)
+
+    loads, threads = [], set()
+    real_load = inference.load_model
+    def counting_load(path):
+        loads.append(path)
+        threads.add(threading.current_thread().name)
+        return real_load(path)
+    monkeypatch.setattr(inference, "load_model", counting_load)
+
+    engine = TradingEngine()
+    async def main():
+        predictor = BatchPredictor(model_path, runner=engine.run_inference, window=0.01)
+        for value in (0.0, 1.0):
+            await predictor.predict('^NSEI', {'rsi': value})
+    try:
+        asyncio.run(main())
+    finally:
+        engine.shutdown()
+
+    assert loads and threads == {"engine-inference_0"}
+    assert engine.inference_pool is None
+
+def test_swap_mid_batch_keeps_path_and_columns_together(tmp_path):
+    """A batch dispatched before a swap scores on the old model with the old columns; the next uses the new pair"""
+    rng = np.random.default_rng(1)
+    X = pd.DataFrame(rng.standard_normal((100, 2)), columns=['rsi', 'atr'])
+    old = LogisticRegression().fit(X[['rsi']].to_numpy(), (X['rsi'] > 0).astype(int))
+    new = LogisticRegression().fit(X[['atr']].to_numpy(), (X['atr'] < 0).astype(int))
+    old_path, new_path = str(tmp_path / "old.pkl"), str(tmp_path / "new.pkl")
+    joblib.dump(old, old_path)
+    joblib.dump(new, new_path)
+    row = {'rsi': 0.8, 'atr': 0.8}
+
+    async def main():
+        started, release = asyncio.Event(), asyncio.Event()
+        async def gated(func, *args):
+            started.set()
+            await release.wait()
+            return func(*args)
+
+        predictor = BatchPredictor(old_path, runner=gated, window=0, feature_cols=['rsi'])
+        first = asyncio.create_task(predictor.predict('^NSEI', row))
+        await started.wait()
+        predictor.swap(new_path, ['atr'])
+        release.set()
+        return await first, await predictor.predict('^NSEI', row)
+
+    before, after = asyncio.run(main())
+    assert before == old.predict_proba([[0.8]])[0, 1]
+    assert after == new.predict_proba([[0.8]])[0, 1]
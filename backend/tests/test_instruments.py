@@ -0,0 +1,93 @@
+from datetime import date, datetime, time
+
+import pytest
+from app.brokers.instruments import InstrumentMaster, lot_quantity
+
+def instrument(token, tradingsymbol, name='', exchange='NSE', segment='NSE', instrument_type='EQ',
+               expiry='', strike=0.0, lot_size=1):
+    return {
+        'instrument_token': token, 'exchange_token': token >> 8, 'tradingsymbol': tradingsymbol,
+        'name': name, 'last_price': 0.0, 'expiry': expiry, 'strike': strike, 'tick_size': 0.05,
+        'lot_size': lot_size, 'instrument_type': instrument_type, 'segment': segment, 'exchange': exchange
+    }
+
+DUMP = [
+    instrument(256265, 'NIFTY 50', 'NIFTY 50', segment='INDICES'),
+    instrument(260105, 'NIFTY BANK', 'NIFTY BANK', segment='INDICES'),
+    instrument(265, 'SENSEX', 'SENSEX', 'BSE', segment='INDICES'),
+    instrument(738561, 'RELIANCE', 'RELIANCE'),
+    instrument(13238786, 'NIFTY24JANFUT', 'NIFTY', 'NFO', 'NFO-FUT', 'FUT', date(2024, 1, 25), lot_size=50),
+    instrument(13368322, 'NIFTY24FEBFUT', 'NIFTY', 'NFO', 'NFO-FUT', 'FUT', date(2024, 2, 29), lot_size=50),
+    instrument(13238530, 'BANKNIFTY24JANFUT', 'BANKNIFTY', 'NFO', 'NFO-FUT', 'FUT', date(2024, 1, 25), lot_size=15),
+    instrument(12345602, 'NIFTY2411121500CE', 'NIFTY', 'NFO', 'NFO-OPT', 'CE', date(2024, 1, 11), 21500.0, 50),
+    instrument(12345858, 'NIFTY2411121500PE', 'NIFTY', 'NFO', 'NFO-OPT', 'PE', date(2024, 1, 11), 21500.0, 50),
+]
+
+def test_lookup_by_symbol_token_expiry_and_strike():
+    """App symbols resolve to tokens and the near-month future rolls after expiry"""
+    master = InstrumentMaster(cache_dir='unused', refresh_time=time(8, 30))
+    master.build(DUMP)
+
+    assert master.resolve('^NSEI')['instrument_token'] == 256265
+    assert master.resolve('^NSEBANK')['instrument_token'] == 260105
+    assert master.resolve('RELIANCE.NS')['instrument_token'] == 738561
+    assert master.resolve('NFO:NIFTY24FEBFUT')['lot_size'] == 50
+    with pytest.raises(KeyError):
+        master.resolve('^UNKNOWN')
+
+    assert master.by_token(13238530)['tradingsymbol'] == 'BANKNIFTY24JANFUT'
+    assert master.expiries('^NSEI') == [date(2024, 1, 25), date(2024, 2, 29)]
+    assert master.current_future('^NSEI', on=date(2024, 1, 25))['tradingsymbol'] == 'NIFTY24JANFUT'
+    assert master.current_future('^NSEI', on=date(2024, 1, 26))['tradingsymbol'] == 'NIFTY24FEBFUT'
+    assert master.current_future('^NSEBANK', on=date(2024, 1, 2))['exchange'] == 'NFO'
+
+    put = master.option('^NSEI', 21500, 'PE', expiry=date(2024, 1, 11))
+    assert put['tradingsymbol'] == 'NIFTY2411121500PE' and put['expiry'] == date(2024, 1, 11)
+
+def test_bare_index_names_resolve_to_index_instruments():
+    """NIFTY, BANKNIFTY and SENSEX map to the index tradingsymbols, not equities"""
+    master = InstrumentMaster(cache_dir='unused', refresh_time=time(8, 30))
+    master.build(DUMP)
+
+    assert master.resolve('NIFTY')['instrument_token'] == 256265
+    assert master.resolve('BANKNIFTY')['instrument_token'] == 260105
+    assert master.resolve('SENSEX')['exchange'] == 'BSE'
+    assert master.current_future('NIFTY', on=date(2024, 1, 2))['tradingsymbol'] == 'NIFTY24JANFUT'
+    assert master.current_future('BANKNIFTY', on=date(2024, 1, 2))['tradingsymbol'] == 'BANKNIFTY24JANFUT'
+
+def test_orders_route_equities_to_cash_and_indices_to_futures():
+    """Equities are ordered as themselves; indices through the near-month future, in whole lots"""
+    master = InstrumentMaster(cache_dir='unused', refresh_time=time(8, 30))
+    master.build(DUMP)
+
+    assert master.order_instrument('RELIANCE.NS')['instrument_token'] == 738561
+    assert master.order_instrument('^NSEI', on=date(2024, 1, 2))['tradingsymbol'] == 'NIFTY24JANFUT'
+    assert master.order_instrument('NFO:NIFTY24FEBFUT')['tradingsymbol'] == 'NIFTY24FEBFUT'
+
+    assert lot_quantity(50, 1) == 50
+    assert lot_quantity(50, 15) == 45
+    assert lot_quantity(50, 75) == 75
+    assert lot_quantity(130, 50) == 150
+
+def test_dump_is_persisted_and_refreshed_daily(tmp_path):
+    """The dump is fetched once per day; a restart the same day reads it from disk"""
+    calls = []
+    def fetch():
+        calls.append(1)
+        return DUMP
+
+    morning = datetime(2024, 1, 2, 9, 0)
+    InstrumentMaster(cache_dir=str(tmp_path), refresh_time=time(8, 30)).ensure(fetch, now=morning)
+    assert len(calls) == 1
+
+    restarted = InstrumentMaster(cache_dir=str(tmp_path), refresh_time=time(8, 30))
+    restarted.ensure(fetch, now=morning.replace(hour=15))
+    assert len(calls) == 1
+    assert restarted.resolve('^NSEI')['instrument_token'] == 256265
+    assert restarted.current_future('^NSEI', on=morning.date())['expiry'] == date(2024, 1, 25)
+
+    # Before the next day's publication time the dump is still current
+    restarted.ensure(fetch, now=datetime(2024, 1, 3, 8, 0))
+    assert len(calls) == 1
+    restarted.ensure(fetch, now=datetime(2024, 1, 3, 8, 45))
+    assert len(calls) == 2
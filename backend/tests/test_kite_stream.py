@@ -0,0 +1,59 @@
+import time
+from datetime import datetime, timezone
+
+import pytest
+from app.brokers.kite_stream import KiteStream, encode_binary, parse_binary
+
+NIFTY = 256265  # Index token (segment 9)
+FUTURE = 13238786  # NFO token
+
+def quote(token, last, volume=0, ts=datetime(2024, 1, 2, 3, 45, tzinfo=timezone.utc)):
+    return {
+        'instrument_token': token,
+        'last_price': last,
+        'volume_traded': volume,
+        'ohlc': {'open': 100.0, 'high': 105.5, 'low': 99.25, 'close': 101.0},
+        'exchange_timestamp': ts
+    }
+
+def test_binary_packets_round_trip():
+    """Full-mode index and instrument packets decode to the values they were encoded from"""
+    index, future = parse_binary(encode_binary([quote(NIFTY, 21500.55), quote(FUTURE, 21580.05, volume=12345)]))
+
+    assert index['instrument_token'] == NIFTY and not index['tradable']
+    assert index['last_price'] == 21500.55
+    assert index['ohlc'] == {'open': 100.0, 'high': 105.5, 'low': 99.25, 'close': 101.0}
+    assert index['exchange_timestamp'] == datetime(2024, 1, 2, 3, 45, tzinfo=timezone.utc)
+
+    assert future['tradable'] and future['mode'] == 'full'
+    assert future['last_price'] == 21580.05
+    assert future['volume_traded'] == 12345
+    assert future['exchange_timestamp'] == index['exchange_timestamp']
+
+    assert parse_binary(b'\x00') == []  # Heartbeat
+
+def test_stream_keeps_latest_quote_from_replay_server():
+    """KiteStream against the local replay server ends up holding the last quote per token"""
+    pytest.importorskip("websocket")
+    from app.brokers.kite_replay import KiteReplayServer
+
+    quotes = [quote(FUTURE, 21500 + i, volume=100 * i) for i in range(50)] + [quote(NIFTY, 21400.5)]
+    received = []
+    with KiteReplayServer(quotes) as server:
+        stream = KiteStream("key", "token", url=server.url)
+        stream.add_listener(received.append)
+        stream.subscribe([FUTURE])
+        stream.start()
+        try:
+            deadline = time.time() + 10
+            while time.time() < deadline:
+                latest = stream.latest(FUTURE)
+                if latest and latest['volume_traded'] == 4900:
+                    break
+                time.sleep(0.01)
+        finally:
+            stream.stop()
+
+    assert stream.latest(FUTURE)['last_price'] == 21549
+    assert stream.latest(NIFTY) is None  # Not subscribed
+    assert [q['volume_traded'] for q in received] == [100 * i for i in range(50)]
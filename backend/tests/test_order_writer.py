@@ -0,0 +1,115 @@
+import json
+import time
+
+from sqlalchemy import func, select
+
+from app.models import Order, PerformanceStats, Position
+from app.models.order import OrderSide, OrderStatus, OrderType
+from app.services.order_writer import OrderWriter
+
+def test_writes_are_batched_off_the_caller(tmp_path, session_factory):
+    """Submits return immediately; a flush commits them in a few grouped transactions"""
+    factory = session_factory
+    writer = OrderWriter(factory, journal_path=str(tmp_path / "journal.jsonl"), batch_size=100, interval=0.05)
+
+    started = time.perf_counter()
+    for i in range(300):
+        writer.submit_order(f"o{i}", 1, "NIFTY", OrderSide.BUY if i % 2 == 0 else OrderSide.SELL,
+                            OrderType.MARKET, 50, price=100.0 + i, status=OrderStatus.FILLED)
+    writer.submit_position(1, "NIFTY", OrderSide.BUY, 50, 100.0)
+    writer.submit_position(1, "NIFTY", OrderSide.BUY, 100, 101.0)
+    writer.submit_position(1, "BANKNIFTY", OrderSide.BUY, 50, 200.0)
+    writer.submit_position(1, "BANKNIFTY")  # Closed
+    submit_time = time.perf_counter() - started
+
+    assert writer.flush(timeout=10)
+    writer.close()
+    db = factory()
+    assert db.scalar(select(func.count()).select_from(Order)) == 300
+    assert [(p.symbol, p.qty, p.avg_price) for p in db.scalars(select(Position))] == [("NIFTY", 100, 101.0)]
+    stats = db.get(PerformanceStats, 1)
+    assert stats.total_trades == 150 and stats.realized_pnl == 150 * 50.0
+    assert writer.stats["batches"] <= 10 and writer.stats["dropped"] == 0
+    assert submit_time < 0.5
+    assert (tmp_path / "journal.jsonl").read_text() == ""
+
+def test_journal_is_replayed_once(tmp_path, session_factory):
+    """Writes journaled before a crash are committed on the next start, without duplicates"""
+    factory = session_factory
+    journal = tmp_path / "journal.jsonl"
+    writer = OrderWriter(factory, journal_path=str(journal))
+    writer.submit_order("o1", 1, "NIFTY", OrderSide.BUY, OrderType.MARKET, 50, price=100.0, status=OrderStatus.FILLED)
+    writer.close()
+
+    # Crash after o1 committed but before the journal was truncated, o2 never written, torn last line
+    lines = [
+        {"kind": "order", "ext_id": ext_id, "user_id": 1, "strategy_id": None, "symbol": "NIFTY", "side": side,
+         "type": "market", "qty": 50, "price": price, "status": "filled"}
+        for ext_id, side, price in [("o1", "buy", 100.0), ("o2", "sell", 110.0)]
+    ] + [{"kind": "position", "user_id": 1, "symbol": "NIFTY", "side": None, "qty": 0, "avg_price": None}]
+    journal.write_text("".join(json.dumps(line) + "\n" for line in lines) + '{"kind": "ord')
+
+    writer = OrderWriter(factory, journal_path=str(journal))
+    writer.start()
+    assert writer.flush(timeout=10)
+    writer.close()
+    db = factory()
+    assert sorted(db.scalars(select(Order.ext_id))) == ["o1", "o2"]
+    assert db.get(PerformanceStats, 1).realized_pnl == 500.0
+    assert writer.stats["replayed"] == 3
+    assert journal.read_text() == ""
+
+def down_factory():
+    """Session factory for a database that cannot be reached"""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    return sessionmaker(bind=create_engine("sqlite:////nonexistent/dir/orders.db"))()
+
+def test_restart_after_timed_out_close_does_not_duplicate(tmp_path, session_factory):
+    """Writes still queued when close() times out are written once after the next submit restarts the writer"""
+    writer = OrderWriter(down_factory, journal_path=str(tmp_path / "journal.jsonl"), interval=0.01, retry_delay=0.05)
+    writer.submit_order("o1", 1, "NIFTY", OrderSide.BUY, OrderType.MARKET, 50, price=100.0, status=OrderStatus.FILLED)
+    writer.submit_position(1, "NIFTY", OrderSide.BUY, 50, 100.0)
+    writer.close(timeout=0.2)
+
+    writer._session_factory = session_factory  # Database back
+    writer.submit_order("o2", 1, "NIFTY", OrderSide.SELL, OrderType.MARKET, 50, price=110.0, status=OrderStatus.FILLED)
+    writer.submit_position(1, "NIFTY")
+    assert writer.flush(timeout=10)
+    writer.close()
+
+    assert writer._thread is None  # One writer thread, stopped
+    assert writer.stats["replayed"] == 0 and writer.stats["writes"] == 4
+    db = session_factory()
+    assert sorted(db.scalars(select(Order.ext_id))) == ["o1", "o2"]
+    assert db.get(PerformanceStats, 1).realized_pnl == 500.0
+    assert db.scalar(select(func.count()).select_from(Position)) == 0
+
+def test_auto_trader_reads_positions_per_signal(tmp_path, session_factory, monkeypatch):
+    """Positions come from the database plus this user's writes still queued, re-read every time"""
+    import app.services.auto_trader as auto_trader
+    from app.services.auto_trader import AutoTrader
+
+    writer = OrderWriter(down_factory, journal_path=str(tmp_path / "journal.jsonl"), interval=0.01, retry_delay=0.05)
+    monkeypatch.setattr(auto_trader, "order_writer", writer)
+    db = session_factory()
+    db.add_all([Position(user_id=1, symbol="NIFTY", side=OrderSide.BUY, qty=1, avg_price=100.0),
+                Position(user_id=2, symbol="SENSEX", side=OrderSide.BUY, qty=1, avg_price=300.0)])
+    db.commit()
+
+    trader = AutoTrader(1, db)
+    writer.submit_position(1, "NIFTY")  # Queued close
+    writer.submit_position(1, "BANKNIFTY", OrderSide.BUY, 1, 200.0)
+    writer.submit_position(2, "NIFTY", OrderSide.BUY, 1, 100.0)  # Another user
+    trader.load_positions()
+    assert trader.active_positions == {"BANKNIFTY": {'side': OrderSide.BUY, 'qty': 1, 'avg_price': 200.0}}
+
+    other = session_factory()  # A change made elsewhere shows up on the next read
+    other.add(Position(user_id=1, symbol="SENSEX", side=OrderSide.BUY, qty=2, avg_price=300.0))
+    other.commit()
+    other.close()
+    trader.load_positions()
+    assert set(trader.active_positions) == {"BANKNIFTY", "SENSEX"}
+    writer._session_factory = session_factory
+    writer.close()
+    db.close()
@@ -0,0 +1,37 @@
+from datetime import datetime, timedelta
+
+from fastapi import Response
+from sqlalchemy import select, text
+
+from app.core.pagination import NEXT_CURSOR_HEADER, keyset_page, with_next_cursor
+from app.models import Order
+from app.models.order import OrderSide, OrderStatus, OrderType
+
+def test_keyset_pages_cover_orders_once_in_order(db_session):
+    """Cursor pages walk newest first without gaps or repeats, ties included, on the composite index"""
+    db = db_session
+    start = datetime(2024, 1, 2, 9, 15)
+    db.add_all([
+        Order(ext_id=f"o{i}", user_id=1 + i % 2, symbol="NIFTY", side=OrderSide.BUY, type=OrderType.MARKET,
+              qty=1, status=OrderStatus.FILLED, created_at=start + timedelta(minutes=i // 6))  # Ties of 3 per user
+        for i in range(250)
+    ])
+    db.commit()
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        response = Response()
+        stmt = keyset_page(select(Order).where(Order.user_id == 1), Order.id, cursor, 40, sort_col=Order.created_at)
+        seen += with_next_cursor(db.scalars(stmt), 40, response)
+        pages += 1
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if cursor is None:
+            break
+        cursor = int(cursor)
+
+    expected = sorted(db.scalars(select(Order).where(Order.user_id == 1)), key=lambda o: (o.created_at, o.id), reverse=True)
+    assert [o.id for o in seen] == [o.id for o in expected]
+    assert pages == 4
+
+    plan = db.execute(text("EXPLAIN QUERY PLAN " + str(stmt.compile(compile_kwargs={"literal_binds": True})))).all()
+    assert any("ix_orders_user_created" in row[-1] for row in plan)
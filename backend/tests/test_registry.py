@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+from sqlalchemy import select
+from sqlalchemy.orm import Session, sessionmaker
+from sklearn.linear_model import LogisticRegression
+
+from app.models import Model
+from app.ml.registry import ModelRegistry
+
+def test_register_versions_and_cache(tmp_path, session_factory):
+    """New versions become latest and loaded artifacts are shared from the cache"""
+    registry = ModelRegistry(artifact_dir=str(tmp_path / "models"), session_factory=session_factory)
+    
+    X = pd.DataFrame(np.random.default_rng(0).standard_normal((50, 2)), columns=['rsi', 'macd'])
+    y = (X['rsi'] > 0).astype(int)
+    
+    first = registry.register("test_model", LogisticRegression().fit(X, y), ['rsi', 'macd'])
+    second = registry.register("test_model", LogisticRegression(C=0.5).fit(X, y), ['rsi', 'macd'],
+                               metrics={'auc': 0.6})
+    
+    assert (first['version'], second['version']) == ('1', '2')
+    latest = registry.latest("test_model")
+    assert latest['version'] == '2'
+    assert latest['feature_cols'] == ['rsi', 'macd']
+    assert latest['metrics'] == {'auc': 0.6}
+    
+    model, feature_cols = registry.load("test_model")
+    assert model.C == 0.5
+    assert registry.load("test_model")[0] is model
+    assert registry.load("test_model", version="1")[0].C == 1.0
+
+def test_register_retries_on_version_conflict(tmp_path, db_engine, db_session):
+    """A registration that lost the race for a version retries with the next one"""
+    model = LogisticRegression().fit(pd.DataFrame({'rsi': [0.0, 1.0]}), [0, 1])
+    ModelRegistry(artifact_dir=str(tmp_path / "models"), session_factory=sessionmaker(bind=db_engine)).register(
+        "test_model", model, ['rsi'])
+    
+    stale = []
+    class StaleSession(Session):
+        def scalars(self, *args, **kwargs):
+            if not stale:
+                stale.append(True)
+                return super().scalars(select(Model.version).where(Model.name == "nothing"))
+            return super().scalars(*args, **kwargs)
+    
+    registry = ModelRegistry(artifact_dir=str(tmp_path / "models"),
+                             session_factory=sessionmaker(bind=db_engine, class_=StaleSession))
+    record = registry.register("test_model", model, ['rsi'])
+    
+    assert record['version'] == '2'
+    assert registry.load("test_model", version="1")[0] is not None
+    assert sorted(m.version for m in db_session.query(Model)) == ['1', '2']
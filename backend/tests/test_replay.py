@@ -0,0 +1,120 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+from app.brokers.replay import ReplayBroker
+from app.brokers.simulator import MarketSimulator
+from app.core.market_hours import ist_aware
+from app.services.clock import VirtualClock
+
+def test_virtual_clock_jumps_between_wakeups():
+    """Sleeping loops advance virtual time instantly, but never past a task that is still working"""
+    clock = VirtualClock(datetime(2024, 1, 2, 9, 15))
+    log = []
+
+    async def loop(name, every, rounds, work=0.0):
+        clock.register()
+        for _ in range(rounds):
+            if work:
+                await asyncio.get_running_loop().run_in_executor(None, time.sleep, work)
+            log.append((clock.now(), name))
+            await clock.sleep(every)
+
+    async def main():
+        started = time.perf_counter()
+        await asyncio.gather(loop('fast', 15, 1500), loop('slow', 60, 375, work=0.002))
+        return time.perf_counter() - started
+
+    elapsed = asyncio.run(main())
+    assert clock.now() == datetime(2024, 1, 2, 15, 30)  # A 6h15m session
+    assert elapsed < 5
+    assert log == sorted(log, key=lambda entry: entry[0])  # Nobody saw time move backwards
+    assert [t for t, name in log if name == 'slow'][:2] == [datetime(2024, 1, 2, 9, 15), datetime(2024, 1, 2, 9, 16)]
+
+def test_replay_broker_never_shows_future_bars():
+    """Ticks lag one completed bar; the forming bar in fetch_history only exposes its open"""
+    bars = MarketSimulator(seed=3).bars('^NSEI', datetime(2024, 1, 1), datetime(2024, 1, 3))
+    broker = ReplayBroker({'^NSEI': bars})
+    assert broker.clock.now() == datetime(2024, 1, 2, 9, 15)  # Open of the last session
+    assert broker.end == datetime(2024, 1, 2, 15, 30)
+    day = bars[bars.timestamp >= '2024-01-02'].reset_index(drop=True)
+
+    async def main():
+        seen = []
+        while broker.clock.now() < broker.end:
+            await broker.clock.sleep(90)
+            tick = await broker.get_tick('^NSEI')
+            history = broker.fetch_history('^NSEI', period='5d')
+            seen.append((broker.clock.now(), tick, history))
+        return seen
+
+    seen = asyncio.run(main())
+    assert len(seen) == 250
+    now, tick, history = seen[0]  # 9:16:30, inside the 9:16 bar
+    assert tick['last'] == day.close[0] and tick['volume'] == day.volume[0]
+    assert len(history) == 375 + 2
+    assert history.timestamp.iloc[-1] == datetime(2024, 1, 2, 9, 16)
+    assert history.close.iloc[-1] == history.open.iloc[-1] == day.open[1]
+    assert history.close.iloc[-2] == day.close[0]
+
+    candles = asyncio.run(broker.get_history('^NSEI', '1h', datetime(2024, 1, 2), datetime(2024, 1, 3)))
+    assert [c['timestamp'].hour for c in candles] == [9, 10, 11, 12, 13, 14, 15]
+    assert candles[0]['volume'] == day.volume[:60].sum()
+
+    order = asyncio.run(broker.place_order('^NSEI', 'buy', 'market', 50))
+    assert order['avg_price'] == day.close.iloc[-1] and broker.positions['^NSEI']['qty'] == 50
+
+def test_run_replay_trades_on_virtual_time(tmp_path, session_factory, monkeypatch):
+    """TradingEngine over a replayed session: orders fill at the last completed bar and carry virtual times"""
+    import app.services.order_writer as order_writer_module
+    from app.brokers.replay import run_replay
+    from app.models import Order
+    from app.services.order_writer import OrderWriter
+    from app.services.trading_engine import TradingEngine
+
+    class AlwaysBuy:
+        """Predictor stand-in: every ready feature row is a high-confidence buy"""
+        stats = None
+
+        async def predict(self, symbol, row, feature_cols):
+            return 0.9
+
+    async def refresh_model(self, force=False):
+        self.model_version = "always-buy"
+        return AlwaysBuy()
+
+    writer = OrderWriter(session_factory, journal_path=str(tmp_path / "journal.jsonl"), interval=0.05)
+    monkeypatch.setattr(order_writer_module, "order_writer", writer)
+    monkeypatch.setattr(TradingEngine, "refresh_model", refresh_model)
+
+    bars = MarketSimulator(seed=11, vols=(0.6, 0.9)).bars('^NSEI', datetime(2024, 1, 1), datetime(2024, 1, 3))
+    broker = ReplayBroker({'^NSEI': bars})
+    start = broker.clock.now()
+    engine = TradingEngine()
+    try:
+        result = asyncio.run(run_replay(broker, ['^NSEI'], until=start + timedelta(hours=2), user_id=3))
+    finally:
+        engine.shutdown()
+        engine.traders.clear()
+        engine.use_broker(None)
+        monkeypatch.undo()
+    assert writer.flush(timeout=10)
+    writer.close()
+
+    orders = result["orders"]
+    assert len(orders) > 2 and orders[0]["side"] == "buy"  # Entries and stop-loss/take-profit exits
+    times = [order["timestamp"] for order in orders]
+    assert times == sorted(times) and start <= times[0] and times[-1] <= start + timedelta(hours=2)
+    for order in orders:
+        # Filled at the close of the last bar completed at that virtual moment
+        completed = bars[bars.timestamp + timedelta(minutes=1) <= order["timestamp"]]
+        assert order["avg_price"] == completed.close.iloc[-1]
+
+    db = session_factory()
+    stored = db.query(Order).order_by(Order.id).all()
+    assert [(o.side.value, o.qty) for o in stored] == [(o["side"], o["qty"]) for o in orders]
+    assert [o.created_at.replace(tzinfo=None) for o in stored] == times
+    # Recorded for the engine's owner, with ids built from virtual time
+    assert {o.user_id for o in stored} == {3}
+    assert [o.ext_id.split("_")[1] for o in stored] == [str(int(ist_aware(t).timestamp())) for t in times]
+    db.close()
@@ -0,0 +1,58 @@
+import asyncio
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from app.brokers.mock import MockBroker
+from app.brokers.simulator import MarketSimulator
+from app.services.clock import VirtualClock
+
+def test_simulated_bars_are_deterministic_and_consistent():
+    """Same seed, same bars whatever the query range; coarser bars aggregate the 1m bars"""
+    sim = MarketSimulator(seed=7)
+    week = sim.bars('^NSEI', datetime(2024, 1, 1), datetime(2024, 1, 6))
+    day = MarketSimulator(seed=7).bars('^NSEI', datetime(2024, 1, 3, 10), datetime(2024, 1, 3, 11))
+    assert len(week) == 5 * 375
+    pd.testing.assert_frame_equal(day, week[(week.timestamp >= '2024-01-03 10:00') & (week.timestamp < '2024-01-03 11:00')].reset_index(drop=True))
+    assert not MarketSimulator(seed=8).bars('^NSEI', datetime(2024, 1, 3, 10), datetime(2024, 1, 3, 11)).equals(day)
+
+    assert (week.high >= week[['open', 'close']].max(axis=1)).all()
+    assert (week.low <= week[['open', 'close']].min(axis=1)).all()
+    assert np.allclose(week.open.iloc[1:375].to_numpy(), week.close.iloc[:374].to_numpy())
+
+    hourly = sim.bars('^NSEI', datetime(2024, 1, 1), datetime(2024, 1, 6), '1h')
+    first_day = week.iloc[:375]
+    assert len(hourly) == 5 * 7 and hourly.timestamp.iloc[6] == pd.Timestamp('2024-01-01 15:15')
+    assert hourly.volume.iloc[:7].sum() == first_day.volume.sum()
+    assert hourly.high.iloc[0] == first_day.high.iloc[:60].max()
+    assert hourly.close.iloc[6] == first_day.close.iloc[-1]
+
+    # Intraday volume is U-shaped: the open and close trade more than midday
+    volume = week.volume.to_numpy().reshape(5, 375)
+    assert volume[:, :30].mean() > 1.5 * volume[:, 170:200].mean()
+
+    # Ticks walk through the same minute bars with cumulative day volume
+    tick = sim.tick('^NSEI', datetime(2024, 1, 1, 9, 20, 59, 999999))
+    assert np.isclose(tick['last'], first_day.close.iloc[5], rtol=1e-6)
+    assert abs(tick['volume'] - first_day.volume.iloc[:6].sum()) <= 1
+    assert sim.tick('^NSEI', datetime(2024, 1, 6, 12))['last'] == week.close.iloc[-1]  # Saturday
+
+def test_mock_broker_replays_at_speed():
+    """The simulated clock runs MOCK_SPEED times faster and history stops at the simulated present"""
+    broker = MockBroker(MarketSimulator(seed=1), VirtualClock(datetime(2024, 1, 2, 9, 15), speed=600))
+
+    async def main():
+        first = await broker.get_tick('^NSEI')
+        await asyncio.sleep(0.2)
+        second = await broker.get_tick('^NSEI')
+        history = await broker.get_history('^NSEI', '1m', datetime(2024, 1, 2), datetime(2024, 1, 3))
+        order = await broker.place_order('^NSEI', 'buy', 'market', 1)
+        return first, second, history, order
+
+    first, second, history, order = asyncio.run(main())
+    elapsed = (second['timestamp'] - first['timestamp']).total_seconds()
+    assert 100 <= elapsed <= 600  # ~0.2s of wall time at 600x
+    assert second['volume'] > first['volume']
+    assert 1 <= len(history) <= 10
+    assert order['status'] == 'filled' and order['avg_price'] > 0
@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.model_selection import TimeSeriesSplit
+
+pytest.importorskip("mlflow")
+pytest.importorskip("xgboost")
+
+from app.ml import train
+from app.ml.registry import model_registry
+
+def make_frame(n=600, seed=2):
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame(rng.standard_normal((n, 4)), columns=['rsi', 'macd', 'atr', 'obv'],
+                     index=pd.date_range('2023-01-02 09:15', periods=n, freq='1min'))
+    logit = 1.5 * X['rsi'] - X['macd'] + 0.5 * rng.standard_normal(n)
+    return X.assign(label_binary=(logit > 0).astype(int), returns=rng.standard_normal(n) * 1e-3)
+
+@pytest.mark.parametrize("learner", ["gbm", "hist"])
+def test_parallel_cv_matches_serial_fits(learner, tmp_path, monkeypatch):
+    """Pooled folds score like one-thread serial fits, and the returned model is the full-data fit"""
+    monkeypatch.chdir(tmp_path)  # model.pkl and mlruns
+    monkeypatch.setattr(train, "prepare_features", lambda df: df)
+    registered = {}
+    monkeypatch.setattr(model_registry, "register",
+                        lambda name, model, feature_cols, params=None, metrics=None:
+                        registered.update(metrics=metrics) or {'name': name, 'version': '1'})
+
+    df = make_frame()
+    trainer = train.ModelTrainer(learner=learner, max_workers=3)
+    model, avg_acc = trainer.train_random_forest(df)
+
+    X, y = df[trainer.feature_cols], df['label_binary']
+    assert trainer.feature_cols == ['rsi', 'macd', 'atr', 'obv']
+    expected_scores, fold_models = [], []
+    for train_idx, val_idx in TimeSeriesSplit(n_splits=5).split(X):
+        fold_model = train.make_model(learner, n_jobs=1).fit(X.iloc[train_idx], y.iloc[train_idx])
+        acc, _ = train.high_confidence_accuracy(y.iloc[val_idx], fold_model.predict_proba(X.iloc[val_idx])[:, 1])
+        expected_scores.append(acc)
+        fold_models.append(fold_model)
+
+    assert trainer.fold_scores == pytest.approx(expected_scores)
+    assert avg_acc == pytest.approx(np.mean(expected_scores))
+    assert registered['metrics'] == {'high_conf_accuracy': pytest.approx(avg_acc)}
+
+    serial = train.make_model(learner, n_jobs=1).fit(X, y)
+    np.testing.assert_allclose(model.predict_proba(X), serial.predict_proba(X))
+    for fold_model in fold_models:
+        assert not np.allclose(model.predict_proba(X), fold_model.predict_proba(X))
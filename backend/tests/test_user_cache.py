@@ -0,0 +1,79 @@
+import asyncio
+import threading
+import time
+
+from sqlalchemy import update
+
+from app.core.user_cache import Principal, UserCache, user_cache
+from app.models.user import User, UserRole
+
+def test_tokens_and_users_expire_and_invalidate():
+    """Cached users come back without the password hash, expire with the token and drop on change"""
+    cache = UserCache(ttl=60, max_entries=2, redis_url="")
+    user = User(id=7, email="a@b.c", name="A", hashed_password="secret", role=UserRole.TRADER)
+
+    async def main():
+        await cache.put_token("tok", 7, expires_at=time.time() + 0.05)
+        await cache.put_token("expired", 7, expires_at=time.time() - 1)
+        await cache.put_user(user)
+        cached = await cache.get_user(7)
+        hit = await cache.token_user_id("tok")
+        await asyncio.sleep(0.06)
+        return cached, hit, await cache.token_user_id("tok"), await cache.token_user_id("expired")
+
+    cached, hit, after_exp, expired = asyncio.run(main())
+    assert isinstance(cached, Principal) and not hasattr(cached, "hashed_password")
+    assert (cached.id, cached.email, cached.role) == (7, "a@b.c", UserRole.TRADER)
+    assert (hit, after_exp, expired) == (7, None, None)
+
+    cache.invalidate([7])
+    assert asyncio.run(cache.get_user(7)) is None
+    assert asyncio.run(UserCache(ttl=0, redis_url="").get_user(7)) is None
+
+def test_role_change_invalidates_shared_cache(db_session):
+    db = db_session
+    user = User(email="a@b.c", name="A", hashed_password="x", role=UserRole.TRADER)
+    db.add(user)
+    db.commit()
+
+    asyncio.run(user_cache.put_user(user))
+    assert asyncio.run(user_cache.get_user(user.id)).role == UserRole.TRADER
+    user.role = UserRole.ADMIN
+    db.commit()
+    assert asyncio.run(user_cache.get_user(user.id)) is None
+
+def test_bulk_update_invalidates_after_commit(db_session):
+    """update(User) statements bypass mapper events but still drop cached users on commit"""
+    db = db_session
+    user = User(email="a@b.c", name="A", hashed_password="x", role=UserRole.TRADER)
+    db.add(user)
+    db.commit()
+
+    asyncio.run(user_cache.put_user(user))
+    db.execute(update(User).where(User.id == user.id).values(role=UserRole.VIEWER))
+    assert asyncio.run(user_cache.get_user(user.id)) is not None  # Not before the commit
+    db.commit()
+    assert asyncio.run(user_cache.get_user(user.id)) is None
+
+def test_shared_cache_invalidation_is_queued():
+    """With Redis, deletes run on the invalidation thread rather than in the caller"""
+    deleted = []
+    caller = threading.current_thread().name
+
+    class FakeRedis:
+        def delete(self, *keys):
+            deleted.append((threading.current_thread().name, keys))
+
+        def scan_iter(self, match):
+            return iter([b"auth:user:1", b"auth:user:2"])
+
+    cache = UserCache(ttl=60, redis_url="")
+    cache._redis_sync = FakeRedis()
+    cache.invalidate([7])
+    cache.invalidate()
+    deadline = time.time() + 2
+    while len(deleted) < 2 and time.time() < deadline:
+        time.sleep(0.01)
+
+    assert [keys for _, keys in deleted] == [("auth:user:7",), (b"auth:user:1", b"auth:user:2")]
+    assert all(name != caller for name, _ in deleted)
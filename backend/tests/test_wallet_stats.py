@@ -0,0 +1,41 @@
+from sqlalchemy import select
+
+from app.models import Ledger, WalletStats
+from app.models.wallet import LedgerType, add_to_wallet_stats
+from app.services.wallet_stats import rebuild_wallet_stats
+
+def test_ledger_inserts_maintain_wallet_stats(db_session):
+    """Totals follow every ledger insert, roll back with it and match a rebuild from history"""
+    db = db_session
+
+    entries = [(LedgerType.DEPOSIT, 5000.0), (LedgerType.TRADE, -120.0), (LedgerType.FEE, -20.0),
+               (LedgerType.DEPOSIT, 1000.0), (LedgerType.WITHDRAW, -300.0), (LedgerType.TRADE, 80.0)]
+    for type, amount in entries:
+        db.add(Ledger(wallet_id=1, type=type, amount=amount, balance_after=0.0))
+        db.commit()
+    db.add(Ledger(wallet_id=2, type=LedgerType.DEPOSIT, amount=10.0, balance_after=10.0))
+    db.add(Ledger(wallet_id=1, type=LedgerType.DEPOSIT, amount=1e6, balance_after=0.0))
+    db.rollback()
+
+    def stats():
+        return {(s.wallet_id, s.type): (s.total_amount, s.entry_count) for s in db.scalars(select(WalletStats))}
+
+    assert stats() == {
+        (1, LedgerType.DEPOSIT): (6000.0, 2), (1, LedgerType.TRADE): (-40.0, 2),
+        (1, LedgerType.FEE): (-20.0, 1), (1, LedgerType.WITHDRAW): (-300.0, 1)
+    }
+
+    maintained = stats()
+    db.execute(WalletStats.__table__.update().values(total_amount=0.0))  # Drifted
+    db.commit()
+    assert rebuild_wallet_stats(db, wallet_id=1) == 4
+    assert stats() == maintained
+
+def test_wallet_stats_fallback_without_upsert(db_engine):
+    """Dialects without ON CONFLICT go through select-then-update"""
+    db_engine.dialect.name = "other"
+    with db_engine.begin() as connection:
+        add_to_wallet_stats(connection, 1, LedgerType.FEE, -5.0)
+        add_to_wallet_stats(connection, 1, LedgerType.FEE, -2.5)
+        rows = connection.execute(select(WalletStats.total_amount, WalletStats.entry_count)).all()
+    assert rows == [(-7.5, 2)]
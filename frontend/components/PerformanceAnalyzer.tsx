@@ -11,6 +11,8 @@ interface PerformanceMetrics {
     profit_factor: number | string;
     max_drawdown: number;
     balance_curve: number[];
+    balance_curve_offset?: number;  // Trade number of the first point when the curve is truncated
+    balance_curve_truncated?: boolean;
 }
 
 export default function PerformanceAnalyzer() {
@@ -37,7 +39,7 @@ export default function PerformanceAnalyzer() {
     if (!metrics) return <div className="text-gray-400 text-sm">Loading analytics...</div>;
 
     const chartData = metrics.balance_curve.map((val, idx) => ({
-        trade: idx,
+        trade: (metrics.balance_curve_offset ?? 0) + idx,
         balance: val
     }));
 